@@ -15,7 +15,7 @@ class DepartmentAdmin(admin.ModelAdmin):
 
 @admin.register(Program)
 class ProgramAdmin(admin.ModelAdmin):
-    list_display = ['name', 'code', 'level', 'department', 'is_active']
+    list_display = ['name', 'code', 'level', 'department', 'students_count', 'is_active']
     list_filter = ['level', 'department', 'is_active']
     search_fields = ['name', 'code', 'description']
     readonly_fields = ['code', 'created_at', 'updated_at']
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:48
+
+import re
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+def normalize_equipment(equipment):
+    # Same rules as Room.normalize_equipment at the time of this migration
+    tags = []
+    for item in re.split(r'[,;\n]', equipment or ''):
+        tag = ' '.join(item.strip(' -*•\t\r').lower().split())[:100]
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def populate_equipment_tags(apps, schema_editor):
+    Room = apps.get_model('academic', 'Room')
+
+    rooms = list(Room.objects.exclude(equipment='').only('id', 'equipment'))
+    for room in rooms:
+        room.equipment_tags = normalize_equipment(room.equipment)
+    Room.objects.bulk_update(rooms, ['equipment_tags'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0002_department_head'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='equipment_tags',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=100), blank=True, default=list, editable=False, help_text='Équipements normalisés, déduits de la liste des équipements', size=None),
+        ),
+        migrations.RunPython(populate_equipment_tags, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='room',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['equipment_tags'], name='rooms_equipme_977542_gin'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_students_count(apps, schema_editor):
+    Program = apps.get_model('academic', 'Program')
+    Student = apps.get_model('users', 'Student')
+
+    enrolled = (
+        Student.objects.filter(program=OuterRef('pk'), is_active=True)
+        .order_by()
+        .values('program')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    Program.objects.update(students_count=Coalesce(Subquery(enrolled), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0003_room_equipment_tags'),
+        ('users', '0002_student_program'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='program',
+            name='students_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="Nombre d'étudiants actifs inscrits dans la filière"),
+        ),
+        migrations.RunPython(populate_students_count, migrations.RunPython.noop),
+    ]
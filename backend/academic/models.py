@@ -1,8 +1,15 @@
 """
 Academic models for departments, programs, subjects, and rooms.
 """
+import re
+
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
 from django.conf import settings
+from django.core.cache import cache
 from core.models import BaseModel, AuditModel
 from core.utils import generate_unique_code
 
@@ -58,6 +65,11 @@ class Program(AuditModel):
     duration_years = models.PositiveIntegerField(default=3)
     department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='programs')
     max_students = models.PositiveIntegerField(default=50)
+    students_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Nombre d'étudiants actifs inscrits dans la filière"
+    )
     description = models.TextField(blank=True)
     
     class Meta:
@@ -77,9 +89,80 @@ class Program(AuditModel):
     
     @property
     def current_students_count(self):
-        """Count of currently enrolled students."""
+        """Count of currently enrolled students, kept by Student.save and deletions."""
+        return self.students_count
+    
+    @classmethod
+    def shift_students_count(cls, program_id, delta):
+        """
+        Move a program's students_count by ``delta`` with a single UPDATE,
+        leaving the program's save signals alone. The count stops at zero
+        rather than failing the save it follows; ``refresh_students_counts``
+        repairs any drift every night.
+        """
+        if program_id:
+            cls.objects.filter(pk=program_id).update(
+                students_count=Greatest(F('students_count') + delta, 0)
+            )
+    
+    @classmethod
+    def refresh_students_counts(cls, programs=None):
+        """
+        Recompute students_count, for all programs by default, with a single
+        grouped query. Needed after bulk changes to students that bypass
+        Student.save, such as queryset updates.
+        """
         from users.models import Student
-        return Student.objects.filter(program=self, is_active=True).count()
+        
+        programs = cls.objects.all() if programs is None else programs
+        enrolled = (
+            Student.objects.filter(program=OuterRef('pk'), is_active=True)
+            .order_by()
+            .values('program')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        program_ids = list(programs.values_list('id', flat=True))
+        cls.objects.filter(id__in=program_ids).update(
+            students_count=Coalesce(Subquery(enrolled), 0)
+        )
+        cls.invalidate_enrollment_counts(program_ids)
+    
+    ENROLLMENT_CACHE_KEY = 'program_enrollment:{}'
+    ENROLLMENT_CACHE_TIMEOUT = 60 * 60
+    
+    @classmethod
+    def enrollment_counts(cls, program_ids):
+        """
+        Map program ids to their active student counts.
+        
+        Counts are cached per program; missing ones are read from their
+        students_count with a single query.
+        """
+        keys = {cls.ENROLLMENT_CACHE_KEY.format(program_id): program_id for program_id in program_ids}
+        counts = {keys[key]: count for key, count in cache.get_many(keys).items()}
+        
+        missing = [program_id for program_id in keys.values() if program_id not in counts]
+        if missing:
+            fetched = dict.fromkeys(missing, 0)
+            fetched.update(
+                cls.objects.filter(id__in=missing).values_list('id', 'students_count')
+            )
+            cache.set_many(
+                {cls.ENROLLMENT_CACHE_KEY.format(program_id): count for program_id, count in fetched.items()},
+                cls.ENROLLMENT_CACHE_TIMEOUT
+            )
+            counts.update(fetched)
+        
+        return counts
+    
+    @classmethod
+    def invalidate_enrollment_counts(cls, program_ids):
+        """Drop cached enrollment counts after students join or leave."""
+        cache.delete_many([
+            cls.ENROLLMENT_CACHE_KEY.format(program_id)
+            for program_id in set(program_ids) if program_id
+        ])
 
 
 class Subject(AuditModel):
@@ -137,6 +220,13 @@ class Room(AuditModel):
     building = models.CharField(max_length=100)
     floor = models.CharField(max_length=10)
     equipment = models.TextField(blank=True, help_text="Liste des équipements disponibles")
+    equipment_tags = ArrayField(
+        models.CharField(max_length=100),
+        default=list,
+        blank=True,
+        editable=False,
+        help_text="Équipements normalisés, déduits de la liste des équipements"
+    )
     department = models.ForeignKey(
         Department, 
         on_delete=models.SET_NULL, 
@@ -152,6 +242,9 @@ class Room(AuditModel):
         verbose_name = 'Salle'
         verbose_name_plural = 'Salles'
         ordering = ['building', 'floor', 'name']
+        indexes = [
+            GinIndex(fields=['equipment_tags']),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.building}"
@@ -159,7 +252,22 @@ class Room(AuditModel):
     def save(self, *args, **kwargs):
         if not self.code:
             self.code = generate_unique_code("ROOM", 6)
+        self.equipment_tags = self.normalize_equipment(self.equipment)
         super().save(*args, **kwargs)
+    
+    @staticmethod
+    def normalize_equipment(equipment):
+        """
+        Split a free-text equipment list (comma, semicolon or line separated)
+        into unique lowercase tags, e.g. "Projecteur, 30 PCs" gives
+        ["projecteur", "30 pcs"].
+        """
+        tags = []
+        for item in re.split(r'[,;\n]', equipment or ''):
+            tag = ' '.join(item.strip(' -*•\t\r').lower().split())[:100]
+            if tag and tag not in tags:
+                tags.append(tag)
+        return tags
 
 
 class AcademicYear(BaseModel):
@@ -2,6 +2,7 @@
 Serializers for academic models.
 """
 from rest_framework import serializers
+from django.db.models import Count, Prefetch
 from .models import Department, Program, Subject, Room, SubjectTeacher, ProgramSubject, AcademicYear
 
 
@@ -9,8 +10,8 @@ class DepartmentSerializer(serializers.ModelSerializer):
     """
     Serializer for Department model.
     """
-    head_name = serializers.CharField(source='head.user.get_full_name', read_only=True)
-    programs_count = serializers.IntegerField(source='programs.count', read_only=True)
+    head_name = serializers.CharField(source='head.get_full_name', read_only=True)
+    programs_count = serializers.SerializerMethodField()
     teachers_count = serializers.SerializerMethodField()
     
     class Meta:
@@ -19,9 +20,30 @@ class DepartmentSerializer(serializers.ModelSerializer):
                  'programs_count', 'teachers_count', 'is_active', 'created_at']
         read_only_fields = ['id', 'code', 'created_at']
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load the head and annotate the counts, so that listing any number of
+        departments costs a single query.
+        """
+        return queryset.select_related('head').annotate(
+            programs_total=Count('programs', distinct=True),
+            teachers_total=Count('subjects__teacher_assignments__teacher', distinct=True)
+        )
+    
+    def get_programs_count(self, obj):
+        """Count programs in department."""
+        if hasattr(obj, 'programs_total'):
+            return obj.programs_total
+        return obj.programs.count()
+    
     def get_teachers_count(self, obj):
         """Count teachers in department through subject assignments."""
-        return obj.subjects.values('teacher_assignments__teacher').distinct().count()
+        if hasattr(obj, 'teachers_total'):
+            return obj.teachers_total
+        return obj.subjects.filter(
+            teacher_assignments__isnull=False
+        ).values('teacher_assignments__teacher').distinct().count()
 
 
 class ProgramSerializer(serializers.ModelSerializer):
@@ -29,16 +51,23 @@ class ProgramSerializer(serializers.ModelSerializer):
     Serializer for Program model.
     """
     department_name = serializers.CharField(source='department.name', read_only=True)
-    head_name = serializers.CharField(source='head.user.get_full_name', read_only=True)
     level_display = serializers.CharField(source='get_level_display', read_only=True)
     current_students_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Program
         fields = ['id', 'name', 'code', 'level', 'level_display', 'duration_years',
-                 'department', 'department_name', 'head', 'head_name', 'max_students',
+                 'department', 'department_name', 'max_students',
                  'current_students_count', 'description', 'is_active', 'created_at']
         read_only_fields = ['id', 'code', 'created_at']
+    
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load the department with each program; enrollment counts are read
+        from the programs' own students_count.
+        """
+        return queryset.select_related('department')
 
 
 class SubjectSerializer(serializers.ModelSerializer):
@@ -57,9 +86,29 @@ class SubjectSerializer(serializers.ModelSerializer):
                  'is_active', 'created_at']
         read_only_fields = ['id', 'code', 'created_at']
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Prefetch the active teacher assignments with their users, so that
+        listing any number of subjects costs a fixed number of queries.
+        """
+        return queryset.select_related('department').prefetch_related(
+            Prefetch(
+                'teacher_assignments',
+                queryset=SubjectTeacher.objects.filter(is_active=True).select_related('teacher__user'),
+                to_attr='active_teacher_assignments'
+            )
+        )
+    
+    def active_teacher_assignments(self, obj):
+        """Active teacher assignments, prefetched by the views."""
+        if hasattr(obj, 'active_teacher_assignments'):
+            return obj.active_teacher_assignments
+        return obj.teacher_assignments.filter(is_active=True).select_related('teacher__user')
+    
     def get_assigned_teachers(self, obj):
         """Get list of assigned teachers."""
-        assignments = obj.teacher_assignments.filter(is_active=True)
+        assignments = self.active_teacher_assignments(obj)
         return [
             {
                 'id': assignment.teacher.id,
@@ -80,9 +129,9 @@ class RoomSerializer(serializers.ModelSerializer):
     class Meta:
         model = Room
         fields = ['id', 'name', 'code', 'room_type', 'room_type_display',
-                 'capacity', 'building', 'floor', 'equipment', 'department',
-                 'department_name', 'is_available', 'is_active', 'created_at']
-        read_only_fields = ['id', 'code', 'created_at']
+                 'capacity', 'building', 'floor', 'equipment', 'equipment_tags',
+                 'department', 'department_name', 'is_available', 'is_active', 'created_at']
+        read_only_fields = ['id', 'code', 'equipment_tags', 'created_at']
 
 
 class SubjectTeacherSerializer(serializers.ModelSerializer):
@@ -144,9 +193,25 @@ class SubjectDetailSerializer(SubjectSerializer):
     class Meta(SubjectSerializer.Meta):
         fields = SubjectSerializer.Meta.fields + ['programs', 'teachers']
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Also prefetch the active program assignments with their programs.
+        """
+        return SubjectSerializer.setup_eager_loading(queryset).prefetch_related(
+            Prefetch(
+                'program_assignments',
+                queryset=ProgramSubject.objects.filter(is_active=True).select_related('program'),
+                to_attr='active_program_assignments'
+            )
+        )
+    
     def get_programs(self, obj):
         """Get programs where this subject is taught."""
-        assignments = obj.program_assignments.filter(is_active=True)
+        if hasattr(obj, 'active_program_assignments'):
+            assignments = obj.active_program_assignments
+        else:
+            assignments = obj.program_assignments.filter(is_active=True).select_related('program')
         return [
             {
                 'id': assignment.program.id,
@@ -160,7 +225,7 @@ class SubjectDetailSerializer(SubjectSerializer):
     
     def get_teachers(self, obj):
         """Get teachers assigned to this subject."""
-        assignments = obj.teacher_assignments.filter(is_active=True)
+        assignments = self.active_teacher_assignments(obj)
         return [
             {
                 'id': assignment.teacher.id,
@@ -0,0 +1,16 @@
+"""
+Celery tasks for academic data.
+"""
+from celery import shared_task
+from .models import Program
+
+
+@shared_task
+def refresh_students_counts():
+    """
+    Recompute every program's students_count, catching up with student
+    changes that bypassed Student.save.
+    """
+    Program.refresh_students_counts()
+    
+    return "Effectifs des filières mis à jour."
@@ -0,0 +1,60 @@
+"""
+Tests for the department views.
+"""
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from academic.models import SubjectTeacher
+from core.tests.base import TimetableTestCase
+
+
+class DepartmentCountsTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.head = self.make_user(role='DEPT_HEAD')
+        self.department = self.make_department(head=self.head)
+        self.fill(self.department)
+        self.client = APIClient()
+        self.client.force_authenticate(self.make_user(role='ADMIN'))
+
+    def fill(self, department):
+        """
+        Two programs and two teachers, one of them teaching two subjects, and
+        a subject nobody teaches.
+        """
+        teachers = [self.make_teacher(), self.make_teacher()]
+        for teacher in (teachers[0], teachers[0], teachers[1]):
+            SubjectTeacher.objects.create(
+                subject=self.make_subject(department=department), teacher=teacher, academic_year='2030-2031'
+            )
+        self.make_subject(department=department)
+        self.make_program(department=department)
+        self.make_program(department=department)
+
+    def test_detail_counts_distinct_programs_and_teachers(self):
+        response = self.client.get(reverse('academic:department-detail', args=[self.department.pk]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['programs_count'], 2)
+        self.assertEqual(response.data['teachers_count'], 2)
+        self.assertEqual(response.data['head_name'], self.head.get_full_name())
+
+    def test_list_query_count_does_not_grow_with_departments(self):
+        url = reverse('academic:department-list')
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+        for _ in range(3):
+            self.fill(self.make_department(head=self.make_user(role='DEPT_HEAD')))
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertEqual({row['teachers_count'] for row in response.data['results']}, {2})
+
+    def test_created_department_counts_without_annotation(self):
+        response = self.client.post(reverse('academic:department-list'), {'name': 'Physique', 'code': 'PHY'})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['programs_count'], 0)
+        self.assertEqual(response.data['teachers_count'], 0)
@@ -0,0 +1,168 @@
+"""
+Tests for the room availability searches.
+"""
+from datetime import timedelta
+
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from academic.models import Room
+from scheduling.models import MakeupSession
+from scheduling.tasks import refresh_room_utilization
+from core.tests.base import TimetableTestCase
+
+
+
+class RoomEquipmentTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.projector = self.make_room(equipment="Vidéoprojecteur;  Tableau blanc\n- 30 PCs")
+        self.whiteboard = self.make_room(equipment="tableau blanc")
+        self.client = APIClient()
+        self.client.force_authenticate(self.make_user(role='ADMIN'))
+
+    def test_tags_are_derived_on_save(self):
+        self.assertEqual(self.projector.equipment_tags, ['vidéoprojecteur', 'tableau blanc', '30 pcs'])
+
+        self.whiteboard.equipment = "Tableau blanc, tableau  BLANC, Micro"
+        self.whiteboard.save()
+        self.whiteboard.refresh_from_db()
+        self.assertEqual(self.whiteboard.equipment_tags, ['tableau blanc', 'micro'])
+
+    def test_filter_requires_every_tag(self):
+        rooms = Room.objects.filter(equipment_tags__contains=Room.normalize_equipment("Tableau Blanc"))
+        self.assertCountEqual(rooms, [self.projector, self.whiteboard])
+
+        rooms = Room.objects.filter(equipment_tags__contains=Room.normalize_equipment("tableau blanc, 30 pcs"))
+        self.assertCountEqual(rooms, [self.projector])
+
+    def test_room_list_filters_by_equipment(self):
+        response = self.client.get(reverse('academic:room-list'), {'equipment': 'vidéoprojecteur,tableau blanc'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([room['id'] for room in response.data['results']], [self.projector.pk])
+
+class AvailableRoomsTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.busy = self.make_room(capacity=20)
+        self.free = self.make_room(capacity=40)
+        self.small = self.make_room(capacity=25)
+        self.make_schedule(room=self.busy, time_slot=self.make_time_slot(0, (8, 0), (10, 0)))
+        self.client = APIClient()
+        self.client.force_authenticate(self.make_user(role='ADMIN'))
+        self.url = reverse('academic:available-rooms')
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [room['id'] for room in response.data]
+
+    def test_rooms_ranked_by_capacity_fit(self):
+        self.assertEqual(self.search(capacity=20), [self.busy.pk, self.small.pk, self.free.pk])
+
+    def test_room_busy_at_overlapping_time_is_excluded(self):
+        rooms = self.search(date=self.MONDAY.isoformat(), start_time='09:00', end_time='11:00')
+
+        self.assertEqual(rooms, [self.small.pk, self.free.pk])
+
+    def test_room_free_on_adjacent_time_and_other_days(self):
+        self.assertIn(self.busy.pk, self.search(date=self.MONDAY.isoformat(), start_time='10:00', end_time='12:00'))
+        self.assertIn(self.busy.pk, self.search(date=(self.MONDAY + timedelta(days=1)).isoformat()))
+
+    def test_approved_makeup_session_books_the_room(self):
+        MakeupSession.objects.create(
+            original_schedule=self.make_schedule(time_slot=self.make_time_slot(1)),
+            proposed_date=self.MONDAY + timedelta(days=2),
+            proposed_time_slot=self.make_time_slot(2, (14, 0), (16, 0)),
+            proposed_room=self.small,
+            status='APPROVED',
+            reason="Grève"
+        )
+
+        rooms = self.search(date=(self.MONDAY + timedelta(days=2)).isoformat(), start_time='15:00', end_time='17:00')
+        self.assertNotIn(self.small.pk, rooms)
+
+    def test_times_without_date_are_rejected(self):
+        response = self.client.get(self.url, {'start_time': '09:00', 'end_time': '11:00'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class RecurringAvailableRoomsTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.room = self.make_room()
+        # Mondays 08:00-09:50 over the first four weeks
+        self.make_schedule(room=self.room, time_slot=self.make_time_slot(0, (8, 0), (9, 50)))
+        self.client = APIClient()
+        self.client.force_authenticate(self.make_user(role='ADMIN'))
+        self.url = reverse('academic:recurring-available-rooms')
+
+    def search(self, start_time, end_time, **params):
+        response = self.client.get(self.url, {
+            'day_of_week': 0,
+            'start_time': start_time,
+            'end_time': end_time,
+            'start_date': self.MONDAY.isoformat(),
+            'end_date': (self.MONDAY + timedelta(weeks=6)).isoformat(),
+            **params
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_adjacent_off_quarter_pattern_is_free(self):
+        data = self.search('09:50', '11:20')
+
+        self.assertEqual(data['occurrences'], 7)
+        self.assertIn(self.room.pk, [room['id'] for room in data['free_rooms']])
+
+    def test_overlapping_pattern_lists_busy_dates(self):
+        data = self.search('09:30', '11:00', max_busy=4)
+
+        partial, = [entry for entry in data['partially_free_rooms'] if entry['room']['id'] == self.room.pk]
+        self.assertEqual(partial['busy_count'], 4)
+        self.assertEqual(partial['busy_dates'], [self.MONDAY + timedelta(weeks=week) for week in range(4)])
+
+
+class RoomUtilizationTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.room = self.make_room(building='B')
+        # Mondays 08:00-10:00 over the first four weeks, plus a makeup in week two
+        self.make_schedule(room=self.room, time_slot=self.make_time_slot(0, (8, 0), (10, 0)))
+        MakeupSession.objects.create(
+            original_schedule=self.make_schedule(time_slot=self.make_time_slot(1, (14, 0), (16, 0))),
+            proposed_date=self.MONDAY + timedelta(weeks=1, days=1),
+            proposed_time_slot=self.make_time_slot(1, (14, 0), (15, 30)),
+            proposed_room=self.room,
+            status='APPROVED',
+            reason="Grève"
+        )
+        refresh_room_utilization()
+        self.client = APIClient()
+        self.client.force_authenticate(self.make_user(role='ADMIN'))
+
+    def test_weekly_booked_minutes_and_rates(self):
+        response = self.client.get(reverse('academic:room-utilization'), {
+            'start_date': self.MONDAY.isoformat(),
+            'end_date': (self.MONDAY + timedelta(weeks=1)).isoformat(),
+            'building': 'B',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        # Mondays 08:00-10:00 and Tuesdays 14:00-16:00
+        self.assertEqual(response.data['weekly_opening_minutes'], 240)
+        room, = response.data['rooms']
+        self.assertEqual(
+            [(week['week_start'], week['booked_minutes'], week['sessions']) for week in room['weeks']],
+            [(self.MONDAY, 120, 1), (self.MONDAY + timedelta(weeks=1), 210, 2)]
+        )
+        self.assertEqual(room['occupancy_rate'], 68.8)
+        self.assertEqual(response.data['buildings'], [
+            {'building': 'B', 'rooms': 1, 'booked_minutes': 330, 'occupancy_rate': 68.8}
+        ])
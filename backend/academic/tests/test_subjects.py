@@ -0,0 +1,53 @@
+"""
+Tests for the subject views.
+"""
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from academic.models import SubjectTeacher, ProgramSubject
+from core.tests.base import TimetableTestCase
+
+
+class SubjectAssignmentsTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.subject = self.assign(self.make_subject())
+        self.client = APIClient()
+        self.client.force_authenticate(self.make_user(role='ADMIN'))
+
+    def assign(self, subject):
+        """
+        Give the subject an active and an inactive teacher and program.
+        """
+        for is_active in (True, False):
+            SubjectTeacher.objects.create(
+                subject=subject, teacher=self.make_teacher(), academic_year='2030-2031', is_active=is_active
+            )
+            ProgramSubject.objects.create(
+                subject=subject, program=self.make_program(), semester=1, is_active=is_active
+            )
+        return subject
+
+    def test_detail_lists_active_assignments_only(self):
+        teacher = self.subject.teacher_assignments.get(is_active=True).teacher
+        program = self.subject.program_assignments.get(is_active=True).program
+
+        response = self.client.get(reverse('academic:subject-detail', args=[self.subject.pk]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['assigned_teachers']], [teacher.pk])
+        self.assertEqual([row['id'] for row in response.data['teachers']], [teacher.pk])
+        self.assertEqual([row['id'] for row in response.data['programs']], [program.pk])
+
+    def test_list_query_count_does_not_grow_with_subjects(self):
+        url = reverse('academic:subject-list')
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+        for _ in range(3):
+            self.assign(self.make_subject())
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertEqual({len(row['assigned_teachers']) for row in response.data['results']}, {1})
@@ -24,6 +24,9 @@ urlpatterns = [
     path('rooms/', views.RoomListCreateView.as_view(), name='room-list'),
     path('rooms/<int:pk>/', views.RoomDetailView.as_view(), name='room-detail'),
     path('rooms/available/', views.available_rooms, name='available-rooms'),
+    path('rooms/available/recurring/', views.recurring_available_rooms, name='recurring-available-rooms'),
+    path('rooms/free-slots/', views.room_free_slots, name='room-free-slots'),
+    path('rooms/utilization/', views.room_utilization, name='room-utilization'),
     
     # Academic Years
     path('academic-years/', views.AcademicYearListCreateView.as_view(), name='academic-year-list'),
@@ -1,9 +1,13 @@
 """
 Views for academic management.
 """
+from datetime import datetime, timedelta
 from rest_framework import generics, status, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from core.permissions import IsPedagogicalAdmin, IsDepartmentHead, CanManageDepartment
 
@@ -27,6 +31,9 @@ class DepartmentListCreateView(generics.ListCreateAPIView):
     ordering_fields = ['name', 'code', 'created_at']
     ordering = ['name']
     
+    def get_queryset(self):
+        return DepartmentSerializer.setup_eager_loading(Department.objects.filter(is_active=True))
+    
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
@@ -39,6 +46,9 @@ class DepartmentDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = DepartmentSerializer
     permission_classes = [CanManageDepartment]
     
+    def get_queryset(self):
+        return DepartmentSerializer.setup_eager_loading(Department.objects.filter(is_active=True))
+    
     def perform_update(self, serializer):
         serializer.save(updated_by=self.request.user)
     
@@ -73,7 +83,7 @@ class ProgramListCreateView(generics.ListCreateAPIView):
             except:
                 queryset = queryset.none()
         
-        return queryset
+        return ProgramSerializer.setup_eager_loading(queryset)
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -98,7 +108,7 @@ class ProgramDetailView(generics.RetrieveUpdateDestroyAPIView):
             except:
                 queryset = queryset.none()
         
-        return queryset
+        return ProgramSerializer.setup_eager_loading(queryset)
     
     def perform_update(self, serializer):
         serializer.save(updated_by=self.request.user)
@@ -132,7 +142,7 @@ class SubjectListCreateView(generics.ListCreateAPIView):
             except:
                 queryset = queryset.none()
         
-        return queryset
+        return SubjectSerializer.setup_eager_loading(queryset)
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -157,7 +167,7 @@ class SubjectDetailView(generics.RetrieveUpdateDestroyAPIView):
             except:
                 queryset = queryset.none()
         
-        return queryset
+        return SubjectDetailSerializer.setup_eager_loading(queryset)
     
     def perform_update(self, serializer):
         serializer.save(updated_by=self.request.user)
@@ -180,6 +190,16 @@ class RoomListCreateView(generics.ListCreateAPIView):
     ordering_fields = ['name', 'capacity', 'building', 'created_at']
     ordering = ['building', 'floor', 'name']
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # Rooms having all of the requested equipment, e.g. ?equipment=projecteur,30 pcs
+        equipment = self.request.query_params.get('equipment')
+        if equipment:
+            queryset = queryset.filter(equipment_tags__contains=Room.normalize_equipment(equipment))
+        
+        return queryset
+    
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
@@ -235,10 +255,9 @@ def department_statistics(request, department_id):
             'programs_count': department.programs.filter(is_active=True).count(),
             'subjects_count': department.subjects.filter(is_active=True).count(),
             'rooms_count': department.rooms.filter(is_active=True).count(),
-            'students_count': sum(
-                program.current_students_count 
-                for program in department.programs.filter(is_active=True)
-            ),
+            'students_count': department.programs.filter(is_active=True).aggregate(
+                total=Coalesce(Sum('students_count'), 0)
+            )['total'],
         }
         
         return Response(stats)
@@ -254,19 +273,325 @@ def department_statistics(request, department_id):
 @permission_classes([IsDepartmentHead])
 def available_rooms(request):
     """
-    Get list of available rooms with optional filtering by capacity and date/time.
+    Get list of available rooms with optional filtering by capacity, room
+    type, building, equipment and date/time.
+    
+    Rooms are ranked by capacity fit: the smallest rooms that are large
+    enough come first.
     """
+    from scheduling.availability import free_rooms
+    
     capacity = request.GET.get('capacity')
+    room_type = request.GET.get('room_type')
+    building = request.GET.get('building')
+    equipment = request.GET.get('equipment')
     date = request.GET.get('date')
     start_time = request.GET.get('start_time')
     end_time = request.GET.get('end_time')
     
-    queryset = Room.objects.filter(is_active=True, is_available=True)
+    queryset = Room.objects.filter(is_active=True, is_available=True).select_related('department')
     
     if capacity:
         queryset = queryset.filter(capacity__gte=capacity)
     
-    # TODO: Add time-based availability checking when we have the scheduling models
+    if room_type:
+        queryset = queryset.filter(room_type=room_type)
+    
+    if building:
+        queryset = queryset.filter(building__iexact=building)
+    
+    if equipment:
+        # Comma-separated list, every item is required
+        queryset = queryset.filter(equipment_tags__contains=Room.normalize_equipment(equipment))
+    
+    if date:
+        try:
+            date = datetime.strptime(date, '%Y-%m-%d').date()
+        except ValueError:
+            return Response(
+                {'error': 'Date invalide. Format attendu: AAAA-MM-JJ'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if start_time or end_time:
+            try:
+                start_time = datetime.strptime(start_time, '%H:%M').time()
+                end_time = datetime.strptime(end_time, '%H:%M').time()
+            except (ValueError, TypeError):
+                return Response(
+                    {'error': 'Heures invalides. Format attendu: HH:MM'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            if start_time >= end_time:
+                return Response(
+                    {'error': "L'heure de début doit être antérieure à l'heure de fin."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            start_time = end_time = None
+        
+        queryset = free_rooms(queryset, date, start_time, end_time)
+    
+    elif start_time or end_time:
+        return Response(
+            {'error': 'La date est requise pour vérifier la disponibilité sur un créneau'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    queryset = queryset.order_by('capacity', 'building', 'name')
     
     serializer = RoomSerializer(queryset, many=True)
-    return Response(serializer.data)
\ No newline at end of file
+    return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([IsDepartmentHead])
+def room_free_slots(request):
+    """
+    Get the free windows of at least ``duration`` minutes (default 120) of
+    each room during a week, within the opening hours given by the time
+    slots of each day. Rooms can be filtered by capacity, room type,
+    building and equipment.
+    """
+    from scheduling.models import TimeSlot
+    from scheduling.occupancy import RoomOccupancy, week_start
+    
+    try:
+        if request.GET.get('week_start'):
+            monday = week_start(datetime.strptime(request.GET['week_start'], '%Y-%m-%d').date())
+        else:
+            monday = week_start(timezone.now().date())
+        duration = int(request.GET.get('duration', 120))
+    except ValueError:
+        return Response(
+            {'error': 'Paramètres invalides. Format attendu: week_start=AAAA-MM-JJ, duration en minutes'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if duration <= 0:
+        return Response(
+            {'error': 'La durée doit être positive'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    rooms = Room.objects.filter(is_active=True, is_available=True)
+    if request.GET.get('capacity'):
+        rooms = rooms.filter(capacity__gte=request.GET['capacity'])
+    if request.GET.get('room_type'):
+        rooms = rooms.filter(room_type=request.GET['room_type'])
+    if request.GET.get('building'):
+        rooms = rooms.filter(building__iexact=request.GET['building'])
+    if request.GET.get('equipment'):
+        rooms = rooms.filter(equipment_tags__contains=Room.normalize_equipment(request.GET['equipment']))
+    rooms = rooms.order_by('capacity', 'building', 'name')
+    
+    opening_hours = TimeSlot.opening_hours()
+    
+    occupancy = RoomOccupancy.build(monday, monday + timedelta(days=6))
+    
+    results = []
+    for room in rooms:
+        free_slots = []
+        for day_of_week, (opening, closing) in sorted(opening_hours.items()):
+            day = monday + timedelta(days=day_of_week)
+            for start_time, end_time in occupancy.free_windows(room.id, day, opening, closing, duration):
+                free_slots.append({'date': day, 'start_time': start_time, 'end_time': end_time})
+        
+        if free_slots:
+            results.append({
+                'room': room.id,
+                'room_name': room.name,
+                'building': room.building,
+                'capacity': room.capacity,
+                'free_slots': free_slots,
+            })
+    
+    return Response({
+        'week_start': monday,
+        'duration': duration,
+        'rooms': results,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsDepartmentHead])
+def recurring_available_rooms(request):
+    """
+    Find rooms for a weekly course: rooms free on every occurrence of a
+    weekday/time pattern between two dates, plus rooms busy on at most
+    ``max_busy`` occurrences (default 1).
+    
+    Expected parameters: day_of_week (0 = lundi), start_time, end_time
+    (HH:MM), start_date, end_date (AAAA-MM-JJ) and optionally capacity,
+    room_type and equipment.
+    """
+    from core.utils import occurrence_bounds
+    from scheduling.occupancy import RoomOccupancy
+    
+    try:
+        day_of_week = int(request.GET['day_of_week'])
+        start_time = datetime.strptime(request.GET['start_time'], '%H:%M').time()
+        end_time = datetime.strptime(request.GET['end_time'], '%H:%M').time()
+        start_date = datetime.strptime(request.GET['start_date'], '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.GET['end_date'], '%Y-%m-%d').date()
+        max_busy = int(request.GET.get('max_busy', 1))
+    except (KeyError, ValueError):
+        return Response(
+            {'error': 'Paramètres invalides. Requis: day_of_week (0-6), start_time et end_time (HH:MM), '
+                      'start_date et end_date (AAAA-MM-JJ)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if not 0 <= day_of_week <= 6 or max_busy < 0:
+        return Response(
+            {'error': 'Paramètres invalides. Requis: day_of_week (0-6), max_busy positif'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if start_time >= end_time:
+        return Response(
+            {'error': "L'heure de début doit être antérieure à l'heure de fin."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if end_date < start_date:
+        return Response(
+            {'error': 'La date de fin doit être postérieure à la date de début.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    rooms = Room.objects.filter(is_active=True, is_available=True)
+    if request.GET.get('capacity'):
+        rooms = rooms.filter(capacity__gte=request.GET['capacity'])
+    if request.GET.get('room_type'):
+        rooms = rooms.filter(room_type=request.GET['room_type'])
+    if request.GET.get('equipment'):
+        rooms = rooms.filter(equipment_tags__contains=Room.normalize_equipment(request.GET['equipment']))
+    rooms = list(rooms.select_related('department').order_by('capacity', 'building', 'name'))
+    
+    bounds = occurrence_bounds(day_of_week, start_date, end_date)
+    occurrences = (bounds[1] - bounds[0]).days // 7 + 1 if bounds else 0
+    
+    busy = RoomOccupancy.build(start_date, end_date).busy_dates(
+        [room.id for room in rooms], day_of_week, start_time, end_time, start_date, end_date
+    )
+    
+    free_rooms = [room for room in rooms if not busy[room.id]]
+    partially_free = sorted(
+        (room for room in rooms if 0 < len(busy[room.id]) <= max_busy),
+        key=lambda room: len(busy[room.id])
+    )
+    
+    return Response({
+        'occurrences': occurrences,
+        'free_rooms': RoomSerializer(free_rooms, many=True).data,
+        'partially_free_rooms': [
+            {
+                'room': RoomSerializer(room).data,
+                'busy_count': len(busy[room.id]),
+                'busy_dates': busy[room.id],
+            }
+            for room in partially_free
+        ],
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsDepartmentHead])
+def room_utilization(request):
+    """
+    Get room occupancy rates per room, building and ISO week between two
+    dates (default: the four weeks starting this week), with optional
+    department, building and room_type filters.
+    
+    Rates compare booked minutes to the weekly opening hours given by the
+    time slots. Figures come from the room utilization materialized view,
+    refreshed hourly.
+    """
+    from scheduling.models import TimeSlot, RoomUtilization
+    from scheduling.occupancy import week_start
+    
+    try:
+        if request.GET.get('start_date'):
+            start_week = week_start(datetime.strptime(request.GET['start_date'], '%Y-%m-%d').date())
+        else:
+            start_week = week_start(timezone.now().date())
+        if request.GET.get('end_date'):
+            end_week = week_start(datetime.strptime(request.GET['end_date'], '%Y-%m-%d').date())
+        else:
+            end_week = start_week + timedelta(weeks=3)
+    except ValueError:
+        return Response(
+            {'error': 'Dates invalides. Format attendu: AAAA-MM-JJ'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if end_week < start_week:
+        return Response(
+            {'error': 'La date de fin doit être postérieure à la date de début.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    rooms = Room.objects.filter(is_active=True)
+    if request.GET.get('department'):
+        rooms = rooms.filter(department_id=request.GET['department'])
+    if request.GET.get('building'):
+        rooms = rooms.filter(building__iexact=request.GET['building'])
+    if request.GET.get('room_type'):
+        rooms = rooms.filter(room_type=request.GET['room_type'])
+    rooms = list(rooms.order_by('building', 'floor', 'name'))
+    
+    weeks_count = (end_week - start_week).days // 7 + 1
+    weekly_minutes = sum(
+        (closing.hour * 60 + closing.minute) - (opening.hour * 60 + opening.minute)
+        for opening, closing in TimeSlot.opening_hours().values()
+    )
+    
+    def rate(booked_minutes, weeks=1):
+        if not weekly_minutes:
+            return None
+        return round(100 * booked_minutes / (weekly_minutes * weeks), 1)
+    
+    weeks_by_room = {}
+    for room_id, week, booked_minutes, sessions in RoomUtilization.objects.filter(
+        room__in=rooms,
+        week_start__range=(start_week, end_week)
+    ).order_by('week_start').values_list('room_id', 'week_start', 'booked_minutes', 'sessions'):
+        weeks_by_room.setdefault(room_id, []).append({
+            'week_start': week,
+            'booked_minutes': booked_minutes,
+            'sessions': sessions,
+            'occupancy_rate': rate(booked_minutes),
+        })
+    
+    room_stats = []
+    buildings = {}
+    for room in rooms:
+        weeks = weeks_by_room.get(room.id, [])
+        booked_minutes = sum(week['booked_minutes'] for week in weeks)
+        room_stats.append({
+            'room': room.id,
+            'room_name': room.name,
+            'building': room.building,
+            'room_type': room.room_type,
+            'department': room.department_id,
+            'booked_minutes': booked_minutes,
+            'occupancy_rate': rate(booked_minutes, weeks_count),
+            'weeks': weeks,
+        })
+        
+        building = buildings.setdefault(room.building, {'building': room.building, 'rooms': 0, 'booked_minutes': 0})
+        building['rooms'] += 1
+        building['booked_minutes'] += booked_minutes
+    
+    for building in buildings.values():
+        building['occupancy_rate'] = rate(building['booked_minutes'], weeks_count * building['rooms'])
+    
+    return Response({
+        'start_week': start_week,
+        'end_week': end_week,
+        'weekly_opening_minutes': weekly_minutes,
+        'rooms': room_stats,
+        'buildings': list(buildings.values()),
+    })
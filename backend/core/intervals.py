@@ -0,0 +1,262 @@
+"""
+In-memory interval indexes used for fast scheduling conflict lookups.
+"""
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from core.utils import occurrence_bounds
+
+
+IntervalEntry = namedtuple(
+    'IntervalEntry',
+    ['start', 'end', 'start_date', 'end_date', 'item_id', 'payload']
+)
+
+
+def time_to_minutes(value):
+    """
+    Convert a time object to minutes since midnight.
+    """
+    return value.hour * 60 + value.minute
+
+
+class IntervalIndex:
+    """
+    Index of daily time intervals grouped by key.
+
+    Each bucket keeps its entries sorted by start minute together with the
+    longest interval span it has seen, so an overlap query only bisects the
+    window ``(start - max_span, end)`` instead of scanning the whole bucket.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._locations = {}
+
+    def __len__(self):
+        return len(self._locations)
+
+    def add(self, key, start, end, start_date, end_date, item_id, payload=None):
+        """
+        Add an interval for ``item_id`` under ``key``.
+
+        An item may be stored under several keys (e.g. one per program);
+        ``remove`` drops all of them.
+        """
+        bucket = self._buckets.setdefault(key, {'starts': [], 'entries': [], 'max_span': 0})
+        entry = IntervalEntry(start, end, start_date, end_date, item_id, payload)
+
+        position = bisect_right(bucket['starts'], start)
+        bucket['starts'].insert(position, start)
+        bucket['entries'].insert(position, entry)
+        bucket['max_span'] = max(bucket['max_span'], end - start)
+        self._locations.setdefault(item_id, set()).add(key)
+
+    def remove(self, item_id):
+        """
+        Remove every interval stored for ``item_id``.
+        """
+        for key in self._locations.pop(item_id, ()):
+            bucket = self._buckets[key]
+            for position, entry in enumerate(bucket['entries']):
+                if entry.item_id == item_id:
+                    del bucket['entries'][position]
+                    del bucket['starts'][position]
+                    break
+
+    def keys_for(self, item_id):
+        """
+        Return the keys ``item_id`` is currently stored under.
+        """
+        return set(self._locations.get(item_id, ()))
+
+    def overlapping(self, key, start, end, start_date, end_date, exclude=None):
+        """
+        Return entries under ``key`` overlapping both the time and date ranges.
+        """
+        bucket = self._buckets.get(key)
+        if not bucket:
+            return []
+
+        low = bisect_right(bucket['starts'], start - bucket['max_span'])
+        high = bisect_left(bucket['starts'], end)
+
+        return [
+            entry for entry in bucket['entries'][low:high]
+            if entry.end > start
+            and entry.start_date <= end_date
+            and entry.end_date >= start_date
+            and entry.item_id != exclude
+        ]
+
+
+_active_schedule_index = ContextVar('active_schedule_index', default=None)
+
+
+def get_active_schedule_index():
+    """
+    Return the schedule index activated for the current request/task, if any.
+    """
+    return _active_schedule_index.get()
+
+
+class ScheduleIndex:
+    """
+    Room, teacher and program interval indexes over active, non-cancelled
+    schedules.
+
+    Build it once per request or task with ``ScheduleIndex.build()`` and
+    activate it with ``with index.activate():`` so that ``ConflictChecker``
+    and ``Schedule.save()`` use and maintain it instead of querying.
+    """
+
+    def __init__(self):
+        self.rooms = IntervalIndex()
+        self.teachers = IntervalIndex()
+        self.programs = IntervalIndex()
+
+    def __len__(self):
+        return len(self.rooms)
+
+    @classmethod
+    def build(cls, queryset=None, with_programs=False):
+        """
+        Build the index from a schedule queryset in a single query.
+
+        ``with_programs`` also indexes each schedule under its programs,
+        at the cost of one extra query.
+        """
+        from scheduling.models import Schedule, ScheduleProgram
+
+        if queryset is None:
+            queryset = Schedule.objects.all()
+        queryset = queryset.filter(is_active=True, is_cancelled=False)
+
+        rows = queryset.values(
+            'id', 'title', 'room_id', 'teacher_id', 'start_date', 'end_date',
+            'time_slot__day_of_week', 'time_slot__start_time', 'time_slot__end_time'
+        )
+
+        program_ids = {}
+        if with_programs:
+            for schedule_id, program_id in ScheduleProgram.objects.filter(
+                schedule__in=queryset.values('id'),
+                is_active=True
+            ).values_list('schedule_id', 'program_id'):
+                program_ids.setdefault(schedule_id, []).append(program_id)
+
+        index = cls()
+        for row in rows:
+            index.add_entry({
+                'id': row['id'],
+                'title': row['title'],
+                'room': row['room_id'],
+                'teacher': row['teacher_id'],
+                'programs': program_ids.get(row['id'], []),
+                'day_of_week': row['time_slot__day_of_week'],
+                'start_time': row['time_slot__start_time'],
+                'end_time': row['time_slot__end_time'],
+                'start_date': row['start_date'],
+                'end_date': row['end_date'],
+            })
+        return index
+
+    def add_entry(self, payload):
+        """
+        Index a placement described by a payload dictionary.
+
+        The payload needs ``id``, ``room``, ``teacher``, ``day_of_week``,
+        ``start_time``, ``end_time``, ``start_date`` and ``end_date`` and may
+        list ``programs``; it is returned as-is by the lookup methods.
+        """
+        item_id = payload['id']
+        self.discard(item_id)
+
+        # Index the span of actual occurrences so that two placements only
+        # overlap if they share a date
+        day = payload['day_of_week']
+        dates = occurrence_bounds(day, payload['start_date'], payload['end_date'])
+        if dates is None:
+            return
+
+        start = time_to_minutes(payload['start_time'])
+        end = time_to_minutes(payload['end_time'])
+
+        self.rooms.add((payload['room'], day), start, end, *dates, item_id, payload)
+        self.teachers.add((payload['teacher'], day), start, end, *dates, item_id, payload)
+        for program_id in payload.get('programs', ()):
+            self.programs.add((program_id, day), start, end, *dates, item_id, payload)
+
+    def update(self, schedule):
+        """
+        Refresh the entries of a saved schedule.
+        """
+        if not schedule.is_active or schedule.is_cancelled:
+            self.discard(schedule.pk)
+            return
+
+        time_slot = schedule.time_slot
+        self.add_entry({
+            'id': schedule.pk,
+            'title': schedule.title,
+            'room': schedule.room_id,
+            'teacher': schedule.teacher_id,
+            'programs': [
+                program_id for (program_id, _day) in self.programs.keys_for(schedule.pk)
+            ],
+            'day_of_week': time_slot.day_of_week,
+            'start_time': time_slot.start_time,
+            'end_time': time_slot.end_time,
+            'start_date': schedule.start_date,
+            'end_date': schedule.end_date,
+        })
+
+    def discard(self, schedule_id):
+        """
+        Drop a schedule from the index.
+        """
+        self.rooms.remove(schedule_id)
+        self.teachers.remove(schedule_id)
+        self.programs.remove(schedule_id)
+
+    def _conflicts(self, intervals, key_id, time_slot, start_date, end_date, exclude_id):
+        dates = occurrence_bounds(time_slot.day_of_week, start_date, end_date)
+        if dates is None:
+            return []
+
+        return intervals.overlapping(
+            (key_id, time_slot.day_of_week),
+            time_to_minutes(time_slot.start_time), time_to_minutes(time_slot.end_time),
+            *dates, exclude=exclude_id
+        )
+
+    def room_conflicts(self, room_id, time_slot, start_date, end_date, exclude_id=None):
+        """
+        Entries booking ``room_id`` during ``time_slot`` between the two dates.
+        """
+        return self._conflicts(self.rooms, room_id, time_slot, start_date, end_date, exclude_id)
+
+    def teacher_conflicts(self, teacher_id, time_slot, start_date, end_date, exclude_id=None):
+        """
+        Entries booking ``teacher_id`` during ``time_slot`` between the two dates.
+        """
+        return self._conflicts(self.teachers, teacher_id, time_slot, start_date, end_date, exclude_id)
+
+    def program_conflicts(self, program_id, time_slot, start_date, end_date, exclude_id=None):
+        """
+        Entries booking ``program_id`` during ``time_slot`` between the two dates.
+        """
+        return self._conflicts(self.programs, program_id, time_slot, start_date, end_date, exclude_id)
+
+    @contextmanager
+    def activate(self):
+        """
+        Make this index the active one for the current context.
+        """
+        token = _active_schedule_index.set(self)
+        try:
+            yield self
+        finally:
+            _active_schedule_index.reset(token)
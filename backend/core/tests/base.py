@@ -0,0 +1,149 @@
+"""
+Shared fixtures for the test suites of the apps.
+"""
+from datetime import date, time, timedelta
+from itertools import count
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+
+# Tests must not depend on (or leak into) a shared Redis instance
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TimetableTestCase(TestCase):
+    """
+    Test case running on a private in-memory cache, with helpers building
+    the departments, teachers, rooms and schedules of a small timetable.
+    """
+    # First Monday of the term used by the fixtures
+    MONDAY = date(2030, 9, 2)
+
+    _sequence = count(1)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    @classmethod
+    def next_number(cls):
+        return next(cls._sequence)
+
+    @classmethod
+    def make_department(cls, **fields):
+        from academic.models import Department
+
+        number = cls.next_number()
+        return Department.objects.create(**{'name': f'Département {number}', 'code': f'D{number}', **fields})
+
+    @classmethod
+    def make_user(cls, role='ADMIN', **fields):
+        from users.models import User
+
+        number = cls.next_number()
+        return User.objects.create(**{
+            'username': f'user{number}',
+            'email': f'user{number}@example.com',
+            'first_name': 'Prénom',
+            'last_name': f'Nom{number}',
+            'role': role,
+            **fields
+        })
+
+    @classmethod
+    def make_teacher(cls, **fields):
+        from users.models import Teacher
+
+        user = cls.make_user(role='TEACHER')
+        return Teacher.objects.create(**{'user': user, 'employee_id': f'EMP{user.pk}', **fields})
+
+    @classmethod
+    def make_program(cls, department=None, **fields):
+        from academic.models import Program
+
+        number = cls.next_number()
+        return Program.objects.create(**{
+            'name': f'Filière {number}',
+            'code': f'P{number}',
+            'level': 'L1',
+            'department': department or cls.make_department(),
+            **fields
+        })
+
+    @classmethod
+    def make_student(cls, program=None, **fields):
+        from users.models import Student
+
+        user = cls.make_user(role='STUDENT')
+        return Student.objects.create(**{
+            'user': user,
+            'student_id': f'ETU{user.pk}',
+            'program': program,
+            'enrollment_year': 2030,
+            **fields
+        })
+
+    @classmethod
+    def make_room(cls, **fields):
+        from academic.models import Room
+
+        number = cls.next_number()
+        return Room.objects.create(**{
+            'name': f'Salle {number}',
+            'code': f'R{number}',
+            'capacity': 30,
+            'building': 'A',
+            'floor': '1',
+            **fields
+        })
+
+    @classmethod
+    def make_subject(cls, department=None, **fields):
+        from academic.models import Subject
+
+        number = cls.next_number()
+        return Subject.objects.create(**{
+            'name': f'Matière {number}',
+            'code': f'S{number}',
+            'department': department or cls.make_department(),
+            **fields
+        })
+
+    @staticmethod
+    def make_time_slot(day_of_week=0, start=(8, 0), end=(10, 0)):
+        from scheduling.models import TimeSlot
+
+        time_slot, created = TimeSlot.objects.get_or_create(
+            day_of_week=day_of_week, start_time=time(*start), end_time=time(*end)
+        )
+        return time_slot
+
+    @classmethod
+    def make_schedule(cls, programs=(), **fields):
+        """
+        Weekly schedule over the first four weeks of the term, with new
+        subject, teacher, room and time slot unless given.
+        """
+        from scheduling.models import Schedule, ScheduleProgram
+
+        fields.setdefault('start_date', cls.MONDAY)
+        fields.setdefault('end_date', cls.MONDAY + timedelta(days=27))
+        if 'subject' not in fields:
+            fields['subject'] = cls.make_subject()
+        if 'teacher' not in fields:
+            fields['teacher'] = cls.make_teacher()
+        if 'room' not in fields:
+            fields['room'] = cls.make_room()
+        if 'time_slot' not in fields:
+            fields['time_slot'] = cls.make_time_slot()
+
+        schedule = Schedule.objects.create(**fields)
+        for program in programs:
+            ScheduleProgram.objects.create(schedule=schedule, program=program)
+        return schedule
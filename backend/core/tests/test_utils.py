@@ -0,0 +1,103 @@
+"""
+Tests for the conflict checks of core.utils.
+"""
+from datetime import timedelta
+
+from core.intervals import ScheduleIndex
+from core.utils import ConflictChecker, occurrence_bounds
+from .base import TimetableTestCase
+
+
+class ConflictCheckerTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.schedule = self.make_schedule(time_slot=self.make_time_slot(0, (8, 0), (10, 0)))
+
+    def test_room_busy_on_overlapping_slot(self):
+        available, message = ConflictChecker.check_room_conflict(
+            self.schedule.room, self.make_time_slot(0, (9, 0), (11, 0)), self.MONDAY
+        )
+
+        self.assertFalse(available)
+        self.assertEqual(message, f"Salle {self.schedule.room.name} déjà occupée de 08:00:00 à 10:00:00")
+
+    def test_room_free_on_adjacent_slot(self):
+        available, message = ConflictChecker.check_room_conflict(
+            self.schedule.room, self.make_time_slot(0, (10, 0), (12, 0)), self.MONDAY
+        )
+
+        self.assertTrue(available)
+        self.assertEqual(message, "Salle disponible")
+
+    def test_room_free_outside_schedule_dates(self):
+        available, message = ConflictChecker.check_room_conflict(
+            self.schedule.room, self.schedule.time_slot, self.MONDAY + timedelta(weeks=6)
+        )
+
+        self.assertTrue(available)
+
+    def test_own_schedule_is_excluded(self):
+        available, message = ConflictChecker.check_teacher_conflict(
+            self.schedule.teacher, self.schedule.time_slot, self.MONDAY,
+            exclude_schedule=self.schedule, end_date=self.schedule.end_date
+        )
+
+        self.assertTrue(available)
+        self.assertEqual(message, "Enseignant disponible")
+
+    def test_teacher_busy_answered_from_active_index(self):
+        time_slot = self.make_time_slot(0, (9, 30), (10, 30))
+
+        with ScheduleIndex.build().activate(), self.assertNumQueries(0):
+            available, message = ConflictChecker.check_teacher_conflict(
+                self.schedule.teacher, time_slot, self.MONDAY
+            )
+
+        self.assertFalse(available)
+        self.assertTrue(message.startswith("Enseignant "))
+
+
+class DateRangeConflictTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Starts in the third week of the term
+        self.schedule = self.make_schedule(
+            time_slot=self.make_time_slot(0, (8, 0), (10, 0)),
+            start_date=self.MONDAY + timedelta(weeks=2)
+        )
+        self.time_slot = self.make_time_slot(0, (9, 0), (11, 0))
+
+    def test_occurrence_bounds(self):
+        self.assertEqual(
+            occurrence_bounds(2, self.MONDAY, self.MONDAY + timedelta(days=20)),
+            (self.MONDAY + timedelta(days=2), self.MONDAY + timedelta(days=16))
+        )
+        self.assertIsNone(occurrence_bounds(5, self.MONDAY, self.MONDAY + timedelta(days=4)))
+
+    def test_later_overlap_found_over_whole_range(self):
+        available, message = ConflictChecker.check_room_conflict(
+            self.schedule.room, self.time_slot, self.MONDAY, end_date=self.MONDAY + timedelta(days=27)
+        )
+
+        self.assertFalse(available)
+
+    def test_range_ending_before_first_occurrence_is_free(self):
+        available, message = ConflictChecker.check_room_conflict(
+            self.schedule.room, self.time_slot, self.MONDAY, end_date=self.MONDAY + timedelta(days=13)
+        )
+
+        self.assertTrue(available)
+
+    def test_active_index_checks_whole_range(self):
+        with ScheduleIndex.build().activate():
+            busy, message = ConflictChecker.check_teacher_conflict(
+                self.schedule.teacher, self.time_slot, self.MONDAY, end_date=self.MONDAY + timedelta(days=27)
+            )
+            free, message = ConflictChecker.check_teacher_conflict(
+                self.schedule.teacher, self.time_slot, self.MONDAY, end_date=self.MONDAY + timedelta(days=13)
+            )
+
+        self.assertFalse(busy)
+        self.assertTrue(free)
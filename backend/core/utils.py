@@ -50,6 +50,21 @@ def get_week_dates(date=None):
     return start_of_week, end_of_week
 
 
+def occurrence_bounds(day_of_week, start_date, end_date):
+    """
+    Get the first and last dates falling on a weekday within a date range.
+    
+    Returns None when the range contains no such weekday.
+    """
+    first = start_date + timedelta(days=(day_of_week - start_date.weekday()) % 7)
+    last = end_date - timedelta(days=(end_date.weekday() - day_of_week) % 7)
+    
+    if first > last:
+        return None
+    
+    return first, last
+
+
 def check_time_conflict(start_time1, end_time1, start_time2, end_time2):
     """
     Check if two time periods conflict.
@@ -60,64 +75,76 @@ def check_time_conflict(start_time1, end_time1, start_time2, end_time2):
 class ConflictChecker:
     """
     Utility class for checking scheduling conflicts.
+
+    When a ``ScheduleIndex`` is active (see ``core.intervals``), lookups are
+    answered from memory instead of querying the schedules table.
     """
     
     @staticmethod
-    def check_room_conflict(room, time_slot, date, exclude_schedule=None):
+    def _conflicting_slots(field, value, time_slot, start_date, end_date, exclude_schedule=None):
         """
-        Check if a room is available at a specific time slot and date.
+        Return (start_time, end_time) pairs of schedules overlapping the slot
+        on at least one of its occurrences between the two dates.
         """
+        from core.intervals import get_active_schedule_index
         from scheduling.models import Schedule
         
+        exclude_id = exclude_schedule.id if exclude_schedule else None
+        
+        index = get_active_schedule_index()
+        if index is not None:
+            lookup = index.room_conflicts if field == 'room' else index.teacher_conflicts
+            entries = lookup(value.id, time_slot, start_date, end_date, exclude_id=exclude_id)
+            return [(entry.payload['start_time'], entry.payload['end_time']) for entry in entries]
+        
+        occurrences = time_slot.occurrence_range(start_date, end_date)
+        if occurrences.isempty:
+            return []
+        
+        # Range overlap on the indexed weekly time and occurrence date spans
         conflicting_schedules = Schedule.objects.filter(
-            room=room,
-            time_slot__day_of_week=date.weekday(),
-            start_date__lte=date,
-            end_date__gte=date,
+            **{field: value},
+            weekly_time_range__overlap=time_slot.weekly_range(),
+            date_range__overlap=occurrences,
             is_active=True,
             is_cancelled=False
         )
         
-        if exclude_schedule:
-            conflicting_schedules = conflicting_schedules.exclude(id=exclude_schedule.id)
+        if exclude_id:
+            conflicting_schedules = conflicting_schedules.exclude(id=exclude_id)
         
-        for schedule in conflicting_schedules:
-            if check_time_conflict(
-                time_slot.start_time, 
-                time_slot.end_time,
-                schedule.time_slot.start_time,
-                schedule.time_slot.end_time
-            ):
-                return False, f"Salle {room.name} déjà occupée de {schedule.time_slot.start_time} à {schedule.time_slot.end_time}"
+        return list(conflicting_schedules.values_list('time_slot__start_time', 'time_slot__end_time'))
+    
+    @staticmethod
+    def check_room_conflict(room, time_slot, date, exclude_schedule=None, end_date=None):
+        """
+        Check if a room is available at a specific time slot, either on
+        ``date`` or on every occurrence from ``date`` to ``end_date``.
+        """
+        conflicts = ConflictChecker._conflicting_slots(
+            'room', room, time_slot, date, end_date or date, exclude_schedule
+        )
+        
+        first = next(iter(conflicts), None)
+        if first:
+            start_time, end_time = first
+            return False, f"Salle {room.name} déjà occupée de {start_time} à {end_time}"
         
         return True, "Salle disponible"
     
     @staticmethod
-    def check_teacher_conflict(teacher, time_slot, date, exclude_schedule=None):
+    def check_teacher_conflict(teacher, time_slot, date, exclude_schedule=None, end_date=None):
         """
-        Check if a teacher is available at a specific time slot and date.
+        Check if a teacher is available at a specific time slot, either on
+        ``date`` or on every occurrence from ``date`` to ``end_date``.
         """
-        from scheduling.models import Schedule
-        
-        conflicting_schedules = Schedule.objects.filter(
-            teacher=teacher,
-            time_slot__day_of_week=date.weekday(),
-            start_date__lte=date,
-            end_date__gte=date,
-            is_active=True,
-            is_cancelled=False
+        conflicts = ConflictChecker._conflicting_slots(
+            'teacher', teacher, time_slot, date, end_date or date, exclude_schedule
         )
         
-        if exclude_schedule:
-            conflicting_schedules = conflicting_schedules.exclude(id=exclude_schedule.id)
-        
-        for schedule in conflicting_schedules:
-            if check_time_conflict(
-                time_slot.start_time,
-                time_slot.end_time,
-                schedule.time_slot.start_time,
-                schedule.time_slot.end_time
-            ):
-                return False, f"Enseignant {teacher.user.get_full_name()} déjà occupé de {schedule.time_slot.start_time} à {schedule.time_slot.end_time}"
+        first = next(iter(conflicts), None)
+        if first:
+            start_time, end_time = first
+            return False, f"Enseignant {teacher.user.get_full_name()} déjà occupé de {start_time} à {end_time}"
         
-        return True, "Enseignant disponible"
\ No newline at end of file
+        return True, "Enseignant disponible"
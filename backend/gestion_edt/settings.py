@@ -21,6 +21,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 THIRD_PARTY_APPS = [
@@ -171,6 +172,26 @@ CORS_ALLOW_CREDENTIALS = True
 # Celery Configuration
 CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
+CELERY_TASK_ROUTES = {
+    'scheduling.tasks.recompute_schedule_conflicts': {'queue': 'conflicts'},
+}
+CELERY_BEAT_SCHEDULE = {
+    'refresh-room-utilization': {
+        'task': 'scheduling.tasks.refresh_room_utilization',
+        'schedule': 60 * 60,
+    },
+    'refresh-students-counts': {
+        'task': 'academic.tasks.refresh_students_counts',
+        'schedule': 24 * 60 * 60,
+    },
+}
+
+# Scheduling
+# Rely on the PostgreSQL exclusion constraints to reject room/teacher double
+# bookings instead of pre-checking them with queries on every save.
+SCHEDULE_DB_CONSTRAINTS = config('SCHEDULE_DB_CONSTRAINTS', default=True, cast=bool)
+# Seconds to wait for further edits before recomputing the affected conflicts
+SCHEDULE_CONFLICT_DEBOUNCE = config('SCHEDULE_CONFLICT_DEBOUNCE', default=10, cast=int)
 
 # API Documentation
 SPECTACULAR_SETTINGS = {
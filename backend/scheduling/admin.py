@@ -2,7 +2,10 @@
 Admin configuration for scheduling models.
 """
 from django.contrib import admin
-from .models import TimeSlot, Schedule, TeacherUnavailability, MakeupSession, ScheduleConflict, TimetableGeneration
+from .models import (
+    TimeSlot, Schedule, ScheduleOccurrence, TeacherUnavailability, MakeupSession,
+    ScheduleConflict, TimetableGeneration
+)
 
 
 @admin.register(TimeSlot)
@@ -21,6 +24,14 @@ class ScheduleAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at']
 
 
+@admin.register(ScheduleOccurrence)
+class ScheduleOccurrenceAdmin(admin.ModelAdmin):
+    list_display = ['schedule', 'date', 'start_datetime', 'end_datetime', 'room', 'teacher', 'status']
+    list_filter = ['status', 'date']
+    search_fields = ['schedule__title', 'schedule__subject__name']
+    raw_id_fields = ['schedule', 'room', 'teacher']
+
+
 @admin.register(TeacherUnavailability)
 class TeacherUnavailabilityAdmin(admin.ModelAdmin):
     list_display = ['teacher', 'start_date', 'end_date', 'unavailability_type', 'is_all_day']
@@ -37,8 +48,8 @@ class MakeupSessionAdmin(admin.ModelAdmin):
 
 @admin.register(ScheduleConflict)
 class ScheduleConflictAdmin(admin.ModelAdmin):
-    list_display = ['schedule1', 'conflict_type', 'severity', 'is_resolved', 'resolved_by']
-    list_filter = ['conflict_type', 'severity', 'is_resolved']
+    list_display = ['schedule1', 'conflict_type', 'severity', 'is_auto_detected', 'is_resolved', 'resolved_by']
+    list_filter = ['conflict_type', 'severity', 'is_auto_detected', 'is_resolved']
     search_fields = ['description']
 
 
@@ -0,0 +1,12 @@
+"""
+Scheduling application configuration.
+"""
+from django.apps import AppConfig
+
+
+class SchedulingConfig(AppConfig):
+    name = 'scheduling'
+    
+    def ready(self):
+        # Register the cache invalidation handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,55 @@
+"""
+Room availability searches.
+"""
+from django.db.backends.postgresql.psycopg_any import NumericRange
+from django.db.models import Exists, OuterRef
+
+from core.intervals import time_to_minutes
+from .models import Schedule, MakeupSession
+
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def free_rooms(rooms, date, start_time=None, end_time=None):
+    """
+    Restrict a Room queryset to the rooms free on ``date`` between
+    ``start_time`` and ``end_time`` (the whole day if no times are given).
+
+    A room is busy if an active schedule occurs in it that day at
+    overlapping times, or if an approved makeup session is planned there.
+    Both are excluded with ``NOT EXISTS`` subqueries so the search stays a
+    single query; the schedule side is served by the room/time-range GiST
+    index of the exclusion constraint.
+    """
+    day_offset = date.weekday() * MINUTES_PER_DAY
+    if start_time is None:
+        weekly_range = NumericRange(day_offset, day_offset + MINUTES_PER_DAY, bounds='[)')
+    else:
+        weekly_range = NumericRange(
+            day_offset + time_to_minutes(start_time),
+            day_offset + time_to_minutes(end_time),
+            bounds='[)'
+        )
+
+    schedules = Schedule.objects.filter(
+        room=OuterRef('pk'),
+        is_active=True,
+        is_cancelled=False,
+        weekly_time_range__overlap=weekly_range,
+        date_range__contains=date
+    )
+
+    makeups = MakeupSession.objects.filter(
+        proposed_room=OuterRef('pk'),
+        is_active=True,
+        status='APPROVED',
+        proposed_date=date
+    )
+    if start_time is not None:
+        makeups = makeups.filter(
+            proposed_time_slot__start_time__lt=end_time,
+            proposed_time_slot__end_time__gt=start_time
+        )
+
+    return rooms.filter(~Exists(schedules), ~Exists(makeups))
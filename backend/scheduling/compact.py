@@ -0,0 +1,126 @@
+"""
+Dictionary-encoded ("compact") schedule payloads, selected with
+``?format=compact``.
+
+Subjects, teachers, rooms, time slots and programs are listed once in
+tables mapping their ids to their labels, and each schedule or session is
+encoded as a row of plain values and ids whose layout is given by a
+``columns`` list.
+"""
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+
+SCHEDULE_COLUMNS = [
+    'id', 'title', 'subject', 'teacher', 'room', 'time_slot', 'programs',
+    'start_date', 'end_date', 'student_count', 'is_cancelled',
+]
+
+OCCURRENCE_COLUMNS = [
+    'id', 'schedule', 'date', 'start_datetime', 'end_datetime', 'status',
+    'subject', 'teacher', 'room', 'time_slot', 'programs',
+]
+
+# ScheduleOccurrence fields read for OCCURRENCE_COLUMNS
+OCCURRENCE_FIELDS = [
+    'id', 'schedule_id', 'date', 'start_datetime', 'end_datetime', 'status',
+    'schedule__subject_id', 'teacher_id', 'room_id', 'schedule__time_slot_id', 'program_ids',
+]
+
+
+class CompactJSONRenderer(JSONRenderer):
+    """
+    JSON renderer registered under the ``compact`` format, so that views can
+    switch to the compact encoding when ``request.accepted_renderer`` is one.
+    """
+    format = 'compact'
+
+
+# Renderers of the views offering the compact format
+COMPACT_RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, CompactJSONRenderer]
+
+
+def is_compact(request):
+    return request.accepted_renderer.format == CompactJSONRenderer.format
+
+
+class CompactTables:
+    """
+    Entity tables of a compact payload.
+    """
+    NAMES = ('subjects', 'teachers', 'rooms', 'time_slots', 'programs')
+
+    def __init__(self):
+        self.tables = {name: {} for name in self.NAMES}
+
+    def schedule_row(self, data):
+        """
+        Encode a ``ScheduleSerializer`` representation as a row of
+        ``SCHEDULE_COLUMNS``, recording the labels it carries.
+        """
+        self.tables['subjects'][data['subject']] = data['subject_name']
+        self.tables['teachers'][data['teacher']] = data['teacher_name']
+        self.tables['rooms'][data['room']] = data['room_name']
+        self.tables['time_slots'][data['time_slot']] = data['time_slot_display']
+
+        programs = []
+        for link in data['programs_list']:
+            self.tables['programs'][link['program']] = link['program_name']
+            programs.append(link['program'])
+
+        return [
+            data['id'], data['title'], data['subject'], data['teacher'], data['room'],
+            data['time_slot'], programs, data['start_date'], data['end_date'],
+            data['student_count'], data['is_cancelled'],
+        ]
+
+    def occurrence_row(self, values):
+        """
+        Encode ``OCCURRENCE_FIELDS`` values as a row of ``OCCURRENCE_COLUMNS``,
+        recording the ids whose labels ``resolve`` must fetch.
+        """
+        for name, entity_id in zip(('subjects', 'teachers', 'rooms', 'time_slots'), values[6:10]):
+            self.tables[name].setdefault(entity_id, None)
+        for program_id in values[10]:
+            self.tables['programs'].setdefault(program_id, None)
+
+        # Same local times as the regular representation
+        row = list(values)
+        row[3], row[4] = timezone.localtime(row[3]), timezone.localtime(row[4])
+        return row
+
+    def resolve(self):
+        """
+        Fetch the labels of the entities only known by id, one query per table.
+        """
+        from academic.models import Subject, Room, Program
+        from users.models import Teacher
+        from .models import TimeSlot
+
+        def missing(name):
+            return [entity_id for entity_id, label in self.tables[name].items() if label is None]
+
+        if missing('subjects'):
+            self.tables['subjects'].update(
+                Subject.objects.filter(id__in=missing('subjects')).values_list('id', 'name')
+            )
+        if missing('rooms'):
+            self.tables['rooms'].update(
+                Room.objects.filter(id__in=missing('rooms')).values_list('id', 'name')
+            )
+        if missing('programs'):
+            self.tables['programs'].update(
+                Program.objects.filter(id__in=missing('programs')).values_list('id', 'name')
+            )
+        if missing('teachers'):
+            self.tables['teachers'].update(
+                (teacher.pk, teacher.user.get_full_name())
+                for teacher in Teacher.objects.filter(id__in=missing('teachers')).select_related('user')
+            )
+        if missing('time_slots'):
+            self.tables['time_slots'].update(
+                (time_slot.pk, str(time_slot))
+                for time_slot in TimeSlot.objects.filter(id__in=missing('time_slots'))
+            )
+        return self.tables
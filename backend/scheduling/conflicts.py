@@ -0,0 +1,619 @@
+"""
+Conflict detection: set-based sweeps and batched placement checks.
+"""
+from django.db import connection
+from django.db.backends.postgresql.psycopg_any import DateRange
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from core.intervals import ScheduleIndex
+from .models import (
+    Schedule, TimeSlot, ScheduleProgram, ScheduleConflict, TeacherUnavailability, MakeupSession
+)
+
+
+# (shared column, conflict type, severity) for each double-booking sweep
+DOUBLE_BOOKING_SWEEPS = [
+    ('room_id', 'ROOM_DOUBLE_BOOKING', 'HIGH'),
+    ('teacher_id', 'TEACHER_DOUBLE_BOOKING', 'CRITICAL'),
+]
+
+# (index lookup, candidate field, conflict type, message) for placement checks
+PLACEMENT_CHECKS = [
+    ('room_conflicts', 'room', 'ROOM_CONFLICT', "Salle déjà occupée pendant ce créneau"),
+    ('teacher_conflicts', 'teacher', 'TEACHER_CONFLICT', "Enseignant déjà occupé pendant ce créneau"),
+    ('program_conflicts', 'programs', 'PROGRAM_CONFLICT', "Filière déjà en cours pendant ce créneau"),
+]
+
+OVERLAPPING_PAIRS_SQL = """
+    SELECT s1.id, s2.id, s1.{column}, t2.start_time, t2.end_time
+    FROM {schedules} s1
+    JOIN {schedules} s2 ON s2.{column} = s1.{column} AND s2.id > s1.id
+    JOIN {time_slots} t2 ON t2.id = s2.time_slot_id
+    WHERE s2.weekly_time_range && s1.weekly_time_range
+      AND s2.date_range && s1.date_range
+      AND s1.date_range * s2.date_range && daterange(%s, %s, '[]')
+      AND s1.is_active AND NOT s1.is_cancelled
+      AND s2.is_active AND NOT s2.is_cancelled
+      {extra}
+"""
+
+# Approved makeup sessions booking the room or teacher of another schedule.
+# The conflict is recorded against the makeup's original schedule.
+MAKEUP_OVERLAPS_SQL = """
+    SELECT m.original_schedule_id, s.id, s.{column}, pt.start_time, pt.end_time
+    FROM {makeups} m
+    JOIN {schedules} o ON o.id = m.original_schedule_id
+    JOIN {time_slots} pt ON pt.id = m.proposed_time_slot_id
+    JOIN {schedules} s ON s.{column} = {makeup_column} AND s.id <> m.original_schedule_id
+    JOIN {time_slots} t ON t.id = s.time_slot_id
+    WHERE m.is_active AND m.status = 'APPROVED'
+      AND daterange(%s, %s, '[]') @> m.proposed_date
+      AND s.is_active AND NOT s.is_cancelled
+      AND s.date_range @> m.proposed_date
+      AND t.day_of_week = EXTRACT(ISODOW FROM m.proposed_date)::int - 1
+      AND t.start_time < pt.end_time AND t.end_time > pt.start_time
+      {extra}
+"""
+
+# Column of a makeup session holding the shared room/teacher
+MAKEUP_COLUMNS = {
+    'room_id': 'm.proposed_room_id',
+    'teacher_id': 'o.teacher_id',
+}
+
+AUTO_RESOLUTION_NOTES = "Résolu automatiquement: le conflit n'existe plus"
+
+UNAVAILABLE_TEACHER_SQL = """
+    SELECT s.id, u.start_date, u.end_date, u.unavailability_type
+    FROM {unavailabilities} u
+    JOIN {schedules} s ON s.teacher_id = u.teacher_id
+    JOIN {time_slots} t ON t.id = s.time_slot_id
+    CROSS JOIN LATERAL (
+        SELECT GREATEST(lower(s.date_range), u.start_date, %(start_date)s::date) AS first_day,
+               LEAST(upper(s.date_range) - 1, u.end_date, %(end_date)s::date) AS last_day
+    ) span
+    WHERE u.is_active
+      AND daterange(u.start_date, u.end_date, '[]') && daterange(%(start_date)s, %(end_date)s, '[]')
+      AND s.is_active AND NOT s.is_cancelled
+      AND s.date_range && daterange(u.start_date, u.end_date, '[]')
+      AND (u.is_all_day OR (u.start_time < t.end_time AND u.end_time > t.start_time))
+      AND span.first_day
+          + (t.day_of_week - EXTRACT(ISODOW FROM span.first_day)::int + 8) %% 7
+          <= span.last_day
+      {extra}
+"""
+
+
+def find_overlapping_pairs(column, start_date, end_date, schedule_ids=None):
+    """
+    Return every pair of schedules sharing ``column`` whose occurrences overlap.
+
+    Pairs are found with a single self-join on schedules x time_slots using
+    the denormalized range columns: overlapping weekly time ranges (same
+    weekday, overlapping times) and overlapping occurrence date ranges,
+    restricted to shared occurrences between ``start_date`` and ``end_date``. Each row is
+    ``(schedule1_id, schedule2_id, shared_id, start_time, end_time)`` with
+    ``schedule1_id < schedule2_id`` and the times of the second schedule.
+
+    Either date may be ``None`` for an unbounded period, and ``schedule_ids``
+    restricts the result to pairs involving one of those schedules.
+    """
+    if column not in ('room_id', 'teacher_id'):
+        raise ValueError(f"Colonne de conflit invalide: {column}")
+
+    params = [start_date, end_date]
+    extra = ''
+    if schedule_ids is not None:
+        extra = 'AND (s1.id = ANY(%s) OR s2.id = ANY(%s))'
+        params += [list(schedule_ids), list(schedule_ids)]
+
+    sql = OVERLAPPING_PAIRS_SQL.format(
+        column=column,
+        schedules=Schedule._meta.db_table,
+        time_slots=TimeSlot._meta.db_table,
+        extra=extra,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def find_makeup_overlaps(column, start_date, end_date, schedule_ids=None):
+    """
+    Return schedules sharing ``column`` with an approved makeup session.
+
+    A schedule collides with a makeup when it occurs on the proposed date
+    at overlapping times. Rows have the shape of ``find_overlapping_pairs``
+    with the makeup's original schedule first and the makeup's times.
+    """
+    if column not in MAKEUP_COLUMNS:
+        raise ValueError(f"Colonne de conflit invalide: {column}")
+
+    params = [start_date, end_date]
+    extra = ''
+    if schedule_ids is not None:
+        extra = 'AND (m.original_schedule_id = ANY(%s) OR s.id = ANY(%s))'
+        params += [list(schedule_ids), list(schedule_ids)]
+
+    sql = MAKEUP_OVERLAPS_SQL.format(
+        column=column,
+        makeup_column=MAKEUP_COLUMNS[column],
+        makeups=MakeupSession._meta.db_table,
+        schedules=Schedule._meta.db_table,
+        time_slots=TimeSlot._meta.db_table,
+        extra=extra,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _describe_pairs(column, pairs):
+    """
+    Build the French conflict descriptions for a list of pairs.
+    """
+    from academic.models import Room
+    from users.models import Teacher
+
+    shared_ids = {pair[2] for pair in pairs}
+
+    if column == 'room_id':
+        names = dict(Room.objects.filter(id__in=shared_ids).values_list('id', 'name'))
+        template = "Salle {name} déjà occupée de {start} à {end}"
+    else:
+        names = {
+            teacher.id: teacher.user.get_full_name()
+            for teacher in Teacher.objects.filter(id__in=shared_ids).select_related('user')
+        }
+        template = "Enseignant {name} déjà occupé de {start} à {end}"
+
+    return {
+        (min(schedule1_id, schedule2_id), max(schedule1_id, schedule2_id)): template.format(
+            name=names.get(shared_id, ''), start=start_time, end=end_time
+        )
+        for schedule1_id, schedule2_id, shared_id, start_time, end_time in pairs
+    }
+
+
+def _normalize_descriptions(descriptions):
+    return {
+        ScheduleConflict.pair_key(*key): description
+        for key, description in descriptions.items()
+    }
+
+
+def _build_conflicts(conflict_type, severity, descriptions):
+    return [
+        ScheduleConflict(
+            schedule1_id=schedule1_id,
+            schedule2_id=schedule2_id,
+            conflict_type=conflict_type,
+            severity=severity,
+            description=description,
+            is_auto_detected=True
+        )
+        for (schedule1_id, schedule2_id), description in descriptions.items()
+    ]
+
+
+def record_pair_conflicts(conflict_type, severity, descriptions):
+    """
+    Record conflicts between schedule pairs that are not already known.
+
+    ``descriptions`` maps ``(schedule1_id, schedule2_id)`` pairs, in either
+    order, to a description. Pairs with an open conflict of the same type
+    are skipped by the database's unique index in a single insert.
+    """
+    ScheduleConflict.objects.bulk_create(
+        _build_conflicts(conflict_type, severity, _normalize_descriptions(descriptions)),
+        ignore_conflicts=True
+    )
+
+
+def record_schedule_conflicts(conflict_type, severity, descriptions):
+    """
+    Record single-schedule conflicts that are not already known.
+
+    ``descriptions`` maps schedule ids to a description.
+    """
+    record_pair_conflicts(conflict_type, severity, {
+        (schedule_id, None): description for schedule_id, description in descriptions.items()
+    })
+
+
+def reconcile_conflicts(conflict_type, severity, descriptions, schedule_ids=None, period=None):
+    """
+    Make the open conflicts of a type match the result of a detection run.
+
+    ``descriptions`` maps the ``(schedule1_id, schedule2_id)`` pairs found,
+    with ``schedule2_id`` set to ``None`` for single-schedule conflicts, to
+    their description. Pairs not known yet are inserted, open conflicts
+    that were not found any more are resolved and the others are left
+    untouched.
+
+    Only conflicts recorded by a detector are resolved, and only those the
+    run examined: when it only looked at some schedules, ``schedule_ids``
+    limits the reconciliation to the conflicts involving them, and when it
+    only looked at a ``(start_date, end_date)`` period, ``period`` limits it
+    to the conflicts whose schedules all occur during that period.
+
+    Returns ``(created, resolved)`` counts.
+    """
+    descriptions = _normalize_descriptions(descriptions)
+
+    known = ScheduleConflict.objects.filter(conflict_type=conflict_type, is_resolved=False)
+    if schedule_ids is not None:
+        known = known.filter(Q(schedule1_id__in=schedule_ids) | Q(schedule2_id__in=schedule_ids))
+    if period is not None:
+        dates = DateRange(*period, bounds='[]')
+        known = known.filter(
+            Q(schedule2__isnull=True) | Q(schedule2__date_range__overlap=dates),
+            schedule1__date_range__overlap=dates
+        )
+    known = {
+        (schedule1_id, schedule2_id): (conflict_id, is_auto_detected)
+        for conflict_id, schedule1_id, schedule2_id, is_auto_detected in known.values_list(
+            'id', 'schedule1_id', 'schedule2_id', 'is_auto_detected'
+        )
+    }
+
+    resolved = 0
+    vanished = [
+        conflict_id for key, (conflict_id, is_auto_detected) in known.items()
+        if is_auto_detected and key not in descriptions
+    ]
+    if vanished:
+        resolved = ScheduleConflict.objects.filter(id__in=vanished).update(
+            is_resolved=True,
+            resolved_at=timezone.now(),
+            resolution_notes=AUTO_RESOLUTION_NOTES
+        )
+
+    new = {key: description for key, description in descriptions.items() if key not in known}
+    ScheduleConflict.objects.bulk_create(
+        _build_conflicts(conflict_type, severity, new),
+        ignore_conflicts=True
+    )
+
+    return len(new), resolved
+
+
+def sweep_double_bookings(start_date, end_date=None):
+    """
+    Detect room and teacher double bookings and reconcile them in bulk.
+
+    Runs one self-join per conflict type, plus one join against approved
+    makeup sessions. Open conflicts that are not found any more are
+    resolved, so the period should cover every occurrence still to come.
+    Returns the number of conflicting pairs found.
+    """
+    conflicts_found = 0
+
+    for column, conflict_type, severity in DOUBLE_BOOKING_SWEEPS:
+        descriptions = _describe_pairs(
+            column,
+            find_overlapping_pairs(column, start_date, end_date)
+            + find_makeup_overlaps(column, start_date, end_date)
+        )
+        conflicts_found += len(descriptions)
+        reconcile_conflicts(conflict_type, severity, descriptions, period=(start_date, end_date))
+
+    return conflicts_found
+
+
+def _describe_capacity_conflict(room_name, capacity, enrolled):
+    return f"Salle {room_name} ({capacity} places) insuffisante pour {enrolled} étudiants inscrits"
+
+
+def _describe_overbooked_schedules(schedules):
+    """
+    Capacity conflict descriptions for the schedules of a queryset whose
+    programs enroll more students than the room holds.
+
+    Attendance is the number of active students across the schedule's
+    active programs, computed for every schedule in one grouped query.
+    """
+    overbooked = schedules.filter(
+        is_active=True,
+        is_cancelled=False
+    ).annotate(
+        enrolled=Count(
+            'scheduleprogram__program__students',
+            filter=Q(
+                scheduleprogram__is_active=True,
+                scheduleprogram__program__students__is_active=True
+            ),
+            distinct=True
+        )
+    ).filter(
+        enrolled__gt=F('room__capacity')
+    ).values_list('id', 'room__name', 'room__capacity', 'enrolled')
+
+    return {
+        schedule_id: _describe_capacity_conflict(room_name, capacity, enrolled)
+        for schedule_id, room_name, capacity, enrolled in overbooked
+    }
+
+
+def sweep_capacity_conflicts(start_date, end_date=None):
+    """
+    Detect schedules whose programs enroll more students than the room holds.
+
+    Returns the number of schedules over capacity.
+    """
+    descriptions = _describe_overbooked_schedules(
+        Schedule.objects.filter(date_range__overlap=DateRange(start_date, end_date, bounds='[]'))
+    )
+
+    reconcile_conflicts('CAPACITY_EXCEEDED', 'MEDIUM', {
+        (schedule_id, None): description for schedule_id, description in descriptions.items()
+    }, period=(start_date, end_date))
+    return len(descriptions)
+
+
+def find_unavailable_teacher_schedules(start_date, end_date, unavailability_id=None, schedule_ids=None):
+    """
+    Return schedules with an occurrence during one of their teacher's
+    unavailabilities, between ``start_date`` and ``end_date``.
+
+    Unavailabilities are joined to the schedules of the same teacher in a
+    single query backed by the teacher/date-range GiST index of schedules:
+    the occurrence date ranges must intersect, the intersection must contain
+    the schedule's weekday and, for partial unavailabilities, the times must
+    overlap. Each row is ``(schedule_id, start_date, end_date, type)``.
+    """
+    extra = []
+    if unavailability_id:
+        extra.append('AND u.id = %(unavailability_id)s')
+    if schedule_ids is not None:
+        extra.append('AND s.id = ANY(%(schedule_ids)s)')
+
+    sql = UNAVAILABLE_TEACHER_SQL.format(
+        unavailabilities=TeacherUnavailability._meta.db_table,
+        schedules=Schedule._meta.db_table,
+        time_slots=TimeSlot._meta.db_table,
+        extra='\n      '.join(extra),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {
+            'start_date': start_date,
+            'end_date': end_date,
+            'unavailability_id': unavailability_id,
+            'schedule_ids': list(schedule_ids or ()),
+        })
+        return cursor.fetchall()
+
+
+def _describe_unavailable_teachers(rows):
+    type_labels = dict(TeacherUnavailability.UNAVAILABILITY_TYPE_CHOICES)
+
+    descriptions = {}
+    for schedule_id, start_date, end_date, unavailability_type in rows:
+        descriptions.setdefault(
+            schedule_id,
+            f"Enseignant indisponible du {start_date:%d/%m/%Y} au {end_date:%d/%m/%Y} "
+            f"({type_labels.get(unavailability_type, unavailability_type)})"
+        )
+    return descriptions
+
+
+def sweep_unavailable_teachers(start_date, end_date=None):
+    """
+    Detect schedules given while their teacher is unavailable.
+
+    Returns the number of affected schedules.
+    """
+    descriptions = _describe_unavailable_teachers(
+        find_unavailable_teacher_schedules(start_date, end_date)
+    )
+
+    reconcile_conflicts('TEACHER_UNAVAILABLE', 'HIGH', {
+        (schedule_id, None): description for schedule_id, description in descriptions.items()
+    }, period=(start_date, end_date))
+    return len(descriptions)
+
+
+def _describe_program_conflict(program_name):
+    return f"Filière {program_name} programmée sur deux cours simultanés"
+
+
+def sweep_program_conflicts(start_date, end_date=None):
+    """
+    Detect student-group conflicts from per-program occupancy bitmaps.
+
+    Returns the number of conflicting pairs found.
+    """
+    from .occupancy import ProgramOccupancy
+
+    occupancy = ProgramOccupancy.build(start_date, end_date)
+
+    descriptions = {}
+    for program_id, schedule1_id, schedule2_id in occupancy.conflicting_pairs(start_date, end_date):
+        descriptions.setdefault(
+            (schedule1_id, schedule2_id),
+            _describe_program_conflict(occupancy.names[program_id])
+        )
+
+    reconcile_conflicts('STUDENT_GROUP_CONFLICT', 'HIGH', descriptions, period=(start_date, end_date))
+    return len(descriptions)
+
+
+def recompute_conflicts(schedule_ids):
+    """
+    Recompute every conflict involving the given schedules.
+
+    Only the neighbourhoods of the schedules are examined: the schedules
+    sharing their room or teacher (including approved makeup sessions),
+    the other placements of their programs and their teachers'
+    unavailabilities. The conflicts involving the schedules are then
+    reconciled with ``reconcile_conflicts``.
+
+    Returns ``(recorded, resolved)`` counts of new and resolved conflicts.
+    """
+    from .occupancy import ProgramOccupancy
+
+    schedule_ids = set(Schedule.objects.filter(id__in=schedule_ids).values_list('id', flat=True))
+    if not schedule_ids:
+        return 0, 0
+
+    # conflict type -> (severity, {(schedule1_id, schedule2_id): description})
+    found = {}
+
+    for column, conflict_type, severity in DOUBLE_BOOKING_SWEEPS:
+        found[conflict_type] = (severity, _describe_pairs(
+            column,
+            find_overlapping_pairs(column, None, None, schedule_ids)
+            + find_makeup_overlaps(column, None, None, schedule_ids)
+        ))
+
+    program_ids = set(ScheduleProgram.objects.filter(
+        schedule_id__in=schedule_ids,
+        is_active=True
+    ).values_list('program_id', flat=True))
+    occupancy = ProgramOccupancy.build(program_ids=program_ids)
+    program_conflicts = {}
+    for program_id, schedule1_id, schedule2_id in occupancy.conflicting_pairs():
+        if schedule1_id in schedule_ids or schedule2_id in schedule_ids:
+            program_conflicts.setdefault(
+                (schedule1_id, schedule2_id),
+                _describe_program_conflict(occupancy.names[program_id])
+            )
+    found['STUDENT_GROUP_CONFLICT'] = ('HIGH', program_conflicts)
+
+    for conflict_type, severity, descriptions in [
+        ('CAPACITY_EXCEEDED', 'MEDIUM', _describe_overbooked_schedules(
+            Schedule.objects.filter(id__in=schedule_ids)
+        )),
+        ('TEACHER_UNAVAILABLE', 'HIGH', _describe_unavailable_teachers(
+            find_unavailable_teacher_schedules(None, None, schedule_ids=schedule_ids)
+        )),
+    ]:
+        found[conflict_type] = (severity, {
+            (schedule_id, None): description for schedule_id, description in descriptions.items()
+        })
+
+    recorded = resolved = 0
+    for conflict_type, (severity, descriptions) in found.items():
+        created, closed = reconcile_conflicts(conflict_type, severity, descriptions, schedule_ids)
+        recorded += created
+        resolved += closed
+
+    return recorded, resolved
+
+
+def _placement_summary(payload):
+    """
+    Compact description of an indexed placement for API responses.
+    """
+    summary = {
+        'room': payload['room'],
+        'teacher': payload['teacher'],
+        'programs': payload.get('programs', []),
+        'day_of_week': payload['day_of_week'],
+        'start_time': payload['start_time'],
+        'end_time': payload['end_time'],
+        'start_date': payload['start_date'],
+        'end_date': payload['end_date'],
+    }
+    if 'candidate' in payload:
+        summary['candidate'] = payload['candidate']
+    else:
+        summary['id'] = payload['id']
+        summary['title'] = payload['title']
+    return summary
+
+
+def check_placements(candidates):
+    """
+    Check candidate placements against existing schedules and each other.
+
+    Each candidate is a dict with ``room``, ``teacher``, ``time_slot``,
+    ``start_date``, ``end_date`` and optionally ``programs`` and ``id`` (the
+    schedule being moved, whose current placement is ignored). Conflicts are
+    overlap-based: same weekday, overlapping times and overlapping date
+    ranges. Three queries are issued whatever the number of candidates.
+
+    Returns one result dict per candidate, in input order.
+    """
+    if not candidates:
+        return []
+
+    time_slots = TimeSlot.objects.in_bulk({candidate['time_slot'] for candidate in candidates})
+
+    rooms = {candidate['room'] for candidate in candidates}
+    teachers = {candidate['teacher'] for candidate in candidates}
+    programs = {program for candidate in candidates for program in candidate.get('programs', [])}
+    moved_ids = {candidate['id'] for candidate in candidates if candidate.get('id')}
+
+    existing = Schedule.objects.filter(
+        start_date__lte=max(candidate['end_date'] for candidate in candidates),
+        end_date__gte=min(candidate['start_date'] for candidate in candidates),
+        time_slot__day_of_week__in={slot.day_of_week for slot in time_slots.values()},
+    ).filter(
+        Q(room_id__in=rooms)
+        | Q(teacher_id__in=teachers)
+        | Q(id__in=ScheduleProgram.objects.filter(
+            program_id__in=programs, is_active=True
+        ).values('schedule_id'))
+    ).exclude(id__in=moved_ids)
+
+    index = ScheduleIndex.build(existing, with_programs=True)
+
+    # Candidates are indexed too so that a session's placements are
+    # checked against each other.
+    for position, candidate in enumerate(candidates):
+        time_slot = time_slots.get(candidate['time_slot'])
+        if time_slot is not None:
+            index.add_entry({
+                'id': ('candidate', position),
+                'candidate': position,
+                'room': candidate['room'],
+                'teacher': candidate['teacher'],
+                'programs': candidate.get('programs', []),
+                'day_of_week': time_slot.day_of_week,
+                'start_time': time_slot.start_time,
+                'end_time': time_slot.end_time,
+                'start_date': candidate['start_date'],
+                'end_date': candidate['end_date'],
+            })
+
+    results = []
+    for position, candidate in enumerate(candidates):
+        time_slot = time_slots.get(candidate['time_slot'])
+        if time_slot is None:
+            results.append({
+                'candidate': position,
+                'has_conflicts': False,
+                'error': 'Créneau horaire non trouvé',
+                'conflicts': [],
+            })
+            continue
+
+        conflicts = []
+        for lookup, field, conflict_type, message in PLACEMENT_CHECKS:
+            values = candidate.get(field, []) if field == 'programs' else [candidate[field]]
+            matches = {}
+            for value in values:
+                for entry in getattr(index, lookup)(
+                    value, time_slot, candidate['start_date'], candidate['end_date'],
+                    exclude_id=('candidate', position)
+                ):
+                    matches[entry.item_id] = entry.payload
+
+            if matches:
+                conflicts.append({
+                    'type': conflict_type,
+                    'message': message,
+                    'conflicting_schedules': [
+                        _placement_summary(payload) for payload in matches.values()
+                    ],
+                })
+
+        results.append({
+            'candidate': position,
+            'has_conflicts': bool(conflicts),
+            'conflicts': conflicts,
+        })
+
+    return results
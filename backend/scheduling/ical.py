@@ -0,0 +1,217 @@
+"""
+iCalendar subscription feeds.
+
+Each schedule is written as a single weekly VEVENT with an RRULE, its
+cancelled sessions as EXDATEs, and each approved makeup session as a
+one-off VEVENT. Feeds are served on signed URLs so that calendar apps can
+poll them without credentials; a user revokes the URLs handed out to them
+by resetting their feed key.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils import timezone
+
+from core.utils import occurrence_bounds
+from .models import Schedule, ScheduleOccurrence, MakeupSession
+
+
+FEED_TOKEN_SALT = 'scheduling.ical.feed'
+FEED_CACHE_KEY = 'ical:{}:{}:{}'
+FEED_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Lookups selecting the schedules, and the makeup sessions, of each scope
+SCHEDULE_LOOKUPS = {
+    'program': 'programs',
+    'teacher': 'teacher_id',
+    'room': 'room_id',
+}
+MAKEUP_LOOKUPS = {
+    'program': 'original_schedule__programs',
+    'teacher': 'original_schedule__teacher_id',
+    'room': 'proposed_room_id',
+}
+
+
+def feed_token(user, scope, object_id):
+    """
+    Signed token identifying a feed handed out to ``user``. The ``user``
+    scope follows a student's program or a teacher's own schedule.
+
+    The token embeds the user's current feed key, so that resetting it
+    revokes every token handed out before.
+    """
+    return signing.dumps(
+        [scope, object_id, user.pk, user.calendar_feed_key.hex],
+        salt=FEED_TOKEN_SALT, compress=True
+    )
+
+
+def read_feed_token(token):
+    """
+    ``(scope, object_id, user)`` of a feed token, or None if it was
+    tampered with or revoked, or if its user was deactivated.
+    """
+    from users.models import User
+
+    try:
+        scope, object_id, user_id, key = signing.loads(token, salt=FEED_TOKEN_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    if scope not in SCHEDULE_LOOKUPS and scope != 'user':
+        return None
+
+    user = User.objects.filter(pk=user_id, is_active=True).first()
+    if user is None or user.calendar_feed_key.hex != key:
+        return None
+    return scope, object_id, user
+
+
+def _escape(text):
+    return (str(text).replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """
+    Split a content line into 75-octet chunks (RFC 5545, 3.1).
+    """
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+
+    chunks = []
+    while encoded:
+        size = 75 if not chunks else 74
+        # Never cut a multi-byte character in two
+        while size < len(encoded) and (encoded[size] & 0xC0) == 0x80:
+            size -= 1
+        chunks.append(encoded[:size].decode('utf-8'))
+        encoded = encoded[size:]
+    return '\r\n '.join(chunks)
+
+
+def _local(day, time_of_day):
+    return datetime.combine(day, time_of_day).strftime('%Y%m%dT%H%M%S')
+
+
+def _utc(moment):
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def feed_name(scope, object_id):
+    """
+    Calendar name shown by subscribing apps.
+    """
+    from academic.models import Program, Room
+    from users.models import Teacher
+
+    if scope == 'program':
+        program = Program.objects.filter(pk=object_id).first()
+        return f"Emploi du temps - {program.name if program else object_id}"
+    if scope == 'teacher':
+        teacher = Teacher.objects.select_related('user').filter(pk=object_id).first()
+        return f"Emploi du temps - {teacher.user.get_full_name() if teacher else object_id}"
+    room = Room.objects.filter(pk=object_id).first()
+    return f"Salle {room.name if room else object_id}"
+
+
+def build_feed(scope, object_id):
+    """
+    iCalendar document of the schedules and approved makeup sessions of a
+    program, teacher or room.
+
+    Times are given in the local time zone by TZID so that weekly events
+    keep their local time across daylight saving changes.
+    """
+    tz = timezone.get_default_timezone()
+    tzid = settings.TIME_ZONE
+    stamp = _utc(timezone.now())
+
+    schedules = Schedule.objects.filter(
+        is_active=True,
+        is_cancelled=False,
+        **{SCHEDULE_LOOKUPS[scope]: object_id}
+    ).select_related('subject', 'teacher__user', 'room', 'time_slot')
+
+    cancelled = {}
+    for schedule_id, day in ScheduleOccurrence.objects.filter(
+        schedule__in=schedules.values('id'),
+        status='CANCELLED'
+    ).values_list('schedule_id', 'date'):
+        cancelled.setdefault(schedule_id, []).append(day)
+
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//GestionEDT//Emplois du temps//FR',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(feed_name(scope, object_id))}',
+        f'X-WR-TIMEZONE:{tzid}',
+    ]
+
+    for schedule in schedules:
+        time_slot = schedule.time_slot
+        bounds = occurrence_bounds(time_slot.day_of_week, schedule.start_date, schedule.end_date)
+        if bounds is None:
+            continue
+
+        first, last = bounds
+        until = timezone.make_aware(datetime.combine(last, time_slot.start_time), tz)
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:schedule-{schedule.pk}@gestion-edt',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART;TZID={tzid}:{_local(first, time_slot.start_time)}',
+            f'DTEND;TZID={tzid}:{_local(first, time_slot.end_time)}',
+            f'RRULE:FREQ=WEEKLY;UNTIL={_utc(until)}',
+            f'SUMMARY:{_escape(schedule.subject.name)}',
+            f'LOCATION:{_escape(schedule.room.name)}',
+            f'DESCRIPTION:{_escape(schedule.teacher.user.get_full_name())}',
+        ]
+        if schedule.pk in cancelled:
+            days = ','.join(_local(day, time_slot.start_time) for day in sorted(cancelled[schedule.pk]))
+            lines.append(f'EXDATE;TZID={tzid}:{days}')
+        lines.append('END:VEVENT')
+
+    makeups = MakeupSession.objects.filter(
+        is_active=True,
+        status='APPROVED',
+        **{MAKEUP_LOOKUPS[scope]: object_id}
+    ).select_related(
+        'original_schedule__subject', 'original_schedule__teacher__user',
+        'proposed_room', 'proposed_time_slot'
+    ).distinct()
+
+    for makeup in makeups:
+        time_slot = makeup.proposed_time_slot
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:makeup-{makeup.pk}@gestion-edt',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART;TZID={tzid}:{_local(makeup.proposed_date, time_slot.start_time)}',
+            f'DTEND;TZID={tzid}:{_local(makeup.proposed_date, time_slot.end_time)}',
+            f'SUMMARY:{_escape(f"Rattrapage: {makeup.original_schedule.subject.name}")}',
+            f'LOCATION:{_escape(makeup.proposed_room.name)}',
+            f'DESCRIPTION:{_escape(makeup.original_schedule.teacher.user.get_full_name())}',
+            'END:VEVENT',
+        ]
+
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
+
+
+def cached_feed(scope, object_id, version):
+    """
+    Feed of a scope, built at most once per version of the scope (see
+    ``TimetableSnapshot.version``).
+    """
+    key = FEED_CACHE_KEY.format(scope, object_id, version)
+    body = cache.get(key)
+    if body is None:
+        body = build_feed(scope, object_id)
+        cache.set(key, body, FEED_CACHE_TIMEOUT)
+    return body
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:33
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0001_initial'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name='schedule',
+            name='date_range',
+            field=django.contrib.postgres.fields.ranges.DateRangeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='weekly_time_range',
+            field=django.contrib.postgres.fields.ranges.IntegerRangeField(editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE schedules
+                SET date_range = daterange(schedules.start_date, schedules.end_date, '[]'),
+                    weekly_time_range = int4range(
+                        time_slots.day_of_week * 1440
+                            + EXTRACT(HOUR FROM time_slots.start_time)::int * 60
+                            + EXTRACT(MINUTE FROM time_slots.start_time)::int,
+                        time_slots.day_of_week * 1440
+                            + EXTRACT(HOUR FROM time_slots.end_time)::int * 60
+                            + EXTRACT(MINUTE FROM time_slots.end_time)::int
+                    )
+                FROM time_slots
+                WHERE time_slots.id = schedules.time_slot_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('is_active', True), ('is_cancelled', False)), expressions=[('room', '='), ('weekly_time_range', '&&'), ('date_range', '&&')], name='schedules_exclude_room_overlap', violation_error_message='Conflit de salle: salle déjà occupée sur ce créneau'),
+        ),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('is_active', True), ('is_cancelled', False)), expressions=[('teacher', '='), ('weekly_time_range', '&&'), ('date_range', '&&')], name='schedules_exclude_teacher_overlap', violation_error_message="Conflit d'enseignant: enseignant déjà occupé sur ce créneau"),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0002_schedule_exclusion_constraints'),
+    ]
+
+    operations = [
+        # Narrow date_range to the first and last actual occurrences so that
+        # overlapping ranges always share at least one class date.
+        migrations.RunSQL(
+            sql="""
+                UPDATE schedules
+                SET date_range = CASE
+                    WHEN occurrences.first_date <= occurrences.last_date
+                        THEN daterange(occurrences.first_date, occurrences.last_date, '[]')
+                    ELSE 'empty'::daterange
+                END
+                FROM (
+                    SELECT schedules.id,
+                           schedules.start_date
+                               + (time_slots.day_of_week
+                                  - EXTRACT(ISODOW FROM schedules.start_date)::int + 8) % 7
+                               AS first_date,
+                           schedules.end_date
+                               - (EXTRACT(ISODOW FROM schedules.end_date)::int - 1
+                                  - time_slots.day_of_week + 7) % 7
+                               AS last_date
+                    FROM schedules
+                    JOIN time_slots ON time_slots.id = schedules.time_slot_id
+                ) AS occurrences
+                WHERE occurrences.id = schedules.id
+            """,
+            reverse_sql="""
+                UPDATE schedules
+                SET date_range = daterange(start_date, end_date, '[]')
+            """,
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0003_schedule_occurrence_date_range'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='teacherunavailability',
+            index=models.Index(fields=['teacher', 'start_date', 'end_date'], name='teacher_una_teacher_70d929_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:44
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0004_teacher_unavailability_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                UPDATE schedule_conflicts
+                SET schedule2_id = NULL
+                WHERE schedule2_id = schedule1_id;
+
+                UPDATE schedule_conflicts
+                SET schedule1_id = schedule2_id, schedule2_id = schedule1_id
+                WHERE schedule2_id < schedule1_id;
+
+                UPDATE schedule_conflicts AS duplicate
+                SET is_resolved = true,
+                    resolved_at = now(),
+                    resolution_notes = 'Doublon d''un conflit existant'
+                WHERE NOT duplicate.is_resolved
+                  AND EXISTS (
+                      SELECT 1 FROM schedule_conflicts AS original
+                      WHERE NOT original.is_resolved
+                        AND original.conflict_type = duplicate.conflict_type
+                        AND original.schedule1_id = duplicate.schedule1_id
+                        AND original.schedule2_id IS NOT DISTINCT FROM duplicate.schedule2_id
+                        AND original.id < duplicate.id
+                  );
+
+                -- Run the deferred foreign key checks before altering the table
+                SET CONSTRAINTS ALL IMMEDIATE;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='scheduleconflict',
+            constraint=models.CheckConstraint(check=models.Q(('schedule2__isnull', True), ('schedule1__lt', models.F('schedule2')), _connector='OR'), name='schedule_conflicts_ordered_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='scheduleconflict',
+            constraint=models.UniqueConstraint(models.F('conflict_type'), models.F('schedule1'), django.db.models.functions.comparison.Coalesce(models.F('schedule2'), 0), condition=models.Q(('is_resolved', False)), name='schedule_conflicts_unique_open_pair'),
+        ),
+    ]
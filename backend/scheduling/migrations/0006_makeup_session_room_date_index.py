@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0005_schedule_conflict_pair_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='makeupsession',
+            index=models.Index(fields=['proposed_room', 'proposed_date'], name='makeup_sess_propose_d0dfc2_idx'),
+        ),
+    ]
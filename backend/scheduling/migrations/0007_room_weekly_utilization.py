@@ -0,0 +1,73 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0003_room_equipment_tags'),
+        ('scheduling', '0006_makeup_session_room_date_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE MATERIALIZED VIEW room_weekly_utilization AS
+                SELECT concat(bookings.room_id, '-', bookings.week_start) AS id,
+                       bookings.room_id,
+                       bookings.week_start,
+                       SUM(bookings.minutes)::integer AS booked_minutes,
+                       COUNT(*)::integer AS sessions
+                FROM (
+                    SELECT schedules.room_id,
+                           date_trunc('week', occurrence.day)::date AS week_start,
+                           time_slots.duration_minutes AS minutes
+                    FROM schedules
+                    JOIN time_slots ON time_slots.id = schedules.time_slot_id
+                    CROSS JOIN LATERAL generate_series(
+                        lower(schedules.date_range), upper(schedules.date_range) - 1, interval '7 days'
+                    ) AS occurrence(day)
+                    WHERE schedules.is_active
+                      AND NOT schedules.is_cancelled
+                      AND NOT isempty(schedules.date_range)
+
+                    UNION ALL
+
+                    SELECT makeup_sessions.proposed_room_id,
+                           date_trunc('week', makeup_sessions.proposed_date)::date,
+                           time_slots.duration_minutes
+                    FROM makeup_sessions
+                    JOIN time_slots ON time_slots.id = makeup_sessions.proposed_time_slot_id
+                    WHERE makeup_sessions.is_active
+                      AND makeup_sessions.status = 'APPROVED'
+                ) AS bookings
+                GROUP BY bookings.room_id, bookings.week_start;
+
+                -- Required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+                CREATE UNIQUE INDEX room_weekly_utilization_room_week
+                    ON room_weekly_utilization (room_id, week_start);
+                CREATE INDEX room_weekly_utilization_week
+                    ON room_weekly_utilization (week_start);
+            """,
+            reverse_sql="DROP MATERIALIZED VIEW IF EXISTS room_weekly_utilization;",
+        ),
+        migrations.CreateModel(
+            name='RoomUtilization',
+            fields=[
+                ('id', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('week_start', models.DateField()),
+                ('booked_minutes', models.PositiveIntegerField()),
+                ('sessions', models.PositiveIntegerField()),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='weekly_utilization', to='academic.room')),
+            ],
+            options={
+                'verbose_name': 'Occupation hebdomadaire de salle',
+                'verbose_name_plural': 'Occupations hebdomadaires des salles',
+                'db_table': 'room_weekly_utilization',
+                'ordering': ['week_start', 'room'],
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:55
+
+from django.conf import settings
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import BtreeGinExtension
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0003_room_equipment_tags'),
+        ('users', '0002_student_program'),
+        ('scheduling', '0007_room_weekly_utilization'),
+    ]
+
+    operations = [
+        BtreeGinExtension(),
+        migrations.CreateModel(
+            name='ScheduleOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_datetime', models.DateTimeField()),
+                ('end_datetime', models.DateTimeField()),
+                ('program_ids', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, size=None)),
+                ('status', models.CharField(choices=[('SCHEDULED', 'Prévue'), ('CANCELLED', 'Annulée')], default='SCHEDULED', max_length=20)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='academic.room')),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='scheduling.schedule')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='users.teacher')),
+            ],
+            options={
+                'verbose_name': 'Séance',
+                'verbose_name_plural': 'Séances',
+                'db_table': 'schedule_occurrences',
+                'ordering': ['start_datetime'],
+                'indexes': [models.Index(fields=['date', 'room'], name='schedule_oc_date_9460e5_idx'), models.Index(fields=['date', 'teacher'], name='schedule_oc_date_d922a6_idx'), django.contrib.postgres.indexes.GinIndex(fields=['date', 'program_ids'], name='schedule_oc_date_78e6da_gin')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='scheduleoccurrence',
+            constraint=models.UniqueConstraint(fields=('schedule', 'date'), name='schedule_occurrences_unique_date'),
+        ),
+        migrations.RunSQL(
+            sql=[(
+                """
+                INSERT INTO schedule_occurrences
+                    (schedule_id, date, start_datetime, end_datetime, room_id, teacher_id, program_ids, status)
+                SELECT schedules.id,
+                       occurrence.day::date,
+                       (occurrence.day::date + time_slots.start_time) AT TIME ZONE %s,
+                       (occurrence.day::date + time_slots.end_time) AT TIME ZONE %s,
+                       schedules.room_id,
+                       schedules.teacher_id,
+                       COALESCE(programs.ids, '{}'),
+                       CASE WHEN schedules.is_cancelled THEN 'CANCELLED' ELSE 'SCHEDULED' END
+                FROM schedules
+                JOIN time_slots ON time_slots.id = schedules.time_slot_id
+                CROSS JOIN LATERAL generate_series(
+                    lower(schedules.date_range), upper(schedules.date_range) - 1, interval '7 days'
+                ) AS occurrence(day)
+                LEFT JOIN LATERAL (
+                    SELECT array_agg(schedule_programs.program_id ORDER BY schedule_programs.program_id) AS ids
+                    FROM schedule_programs
+                    WHERE schedule_programs.schedule_id = schedules.id
+                      AND schedule_programs.is_active
+                ) AS programs ON true
+                WHERE schedules.is_active
+                  AND NOT isempty(schedules.date_range);
+                """,
+                [settings.TIME_ZONE, settings.TIME_ZONE],
+            )],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.7 on 2026-10-17 09:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0008_schedule_occurrences'),
+    ]
+
+    operations = [
+        # Compute the ranges backing the exclusion constraints in the database,
+        # so that rows written without Schedule.save() (bulk_create, queryset
+        # updates, raw SQL) are checked like the others. Same rules as
+        # TimeSlot.occurrence_range and TimeSlot.weekly_range.
+        migrations.RunSQL(
+            sql="""
+                CREATE FUNCTION schedules_set_ranges() RETURNS trigger AS $$
+                DECLARE
+                    slot time_slots%ROWTYPE;
+                    first_date date;
+                    last_date date;
+                BEGIN
+                    SELECT * INTO slot FROM time_slots WHERE id = NEW.time_slot_id;
+
+                    first_date := NEW.start_date
+                        + (slot.day_of_week - EXTRACT(ISODOW FROM NEW.start_date)::int + 8) % 7;
+                    last_date := NEW.end_date
+                        - (EXTRACT(ISODOW FROM NEW.end_date)::int - 1 - slot.day_of_week + 7) % 7;
+
+                    NEW.date_range := CASE
+                        WHEN first_date <= last_date THEN daterange(first_date, last_date, '[]')
+                        ELSE 'empty'::daterange
+                    END;
+                    NEW.weekly_time_range := int4range(
+                        slot.day_of_week * 1440
+                            + EXTRACT(HOUR FROM slot.start_time)::int * 60
+                            + EXTRACT(MINUTE FROM slot.start_time)::int,
+                        slot.day_of_week * 1440
+                            + EXTRACT(HOUR FROM slot.end_time)::int * 60
+                            + EXTRACT(MINUTE FROM slot.end_time)::int
+                    );
+                    RETURN NEW;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER schedules_set_ranges
+                BEFORE INSERT OR UPDATE OF start_date, end_date, time_slot_id, date_range, weekly_time_range
+                ON schedules
+                FOR EACH ROW EXECUTE FUNCTION schedules_set_ranges();
+
+                CREATE FUNCTION time_slots_refresh_schedule_ranges() RETURNS trigger AS $$
+                BEGIN
+                    UPDATE schedules SET time_slot_id = NEW.id WHERE time_slot_id = NEW.id;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER time_slots_refresh_schedule_ranges
+                AFTER UPDATE OF day_of_week, start_time, end_time
+                ON time_slots
+                FOR EACH ROW
+                WHEN ((OLD.day_of_week, OLD.start_time, OLD.end_time)
+                      IS DISTINCT FROM (NEW.day_of_week, NEW.start_time, NEW.end_time))
+                EXECUTE FUNCTION time_slots_refresh_schedule_ranges();
+
+                -- Fill the ranges of rows written without them
+                UPDATE schedules SET time_slot_id = time_slot_id;
+            """,
+            reverse_sql="""
+                DROP TRIGGER time_slots_refresh_schedule_ranges ON time_slots;
+                DROP FUNCTION time_slots_refresh_schedule_ranges();
+                DROP TRIGGER schedules_set_ranges ON schedules;
+                DROP FUNCTION schedules_set_ranges();
+            """,
+        ),
+    ]
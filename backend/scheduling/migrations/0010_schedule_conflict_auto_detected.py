@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0009_schedule_range_triggers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduleconflict',
+            name='is_auto_detected',
+            field=models.BooleanField(default=False),
+        ),
+    ]
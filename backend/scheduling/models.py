@@ -1,10 +1,19 @@
 """
 Models for scheduling and timetable management.
 """
-from django.db import models
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import ArrayField, DateRangeField, IntegerRangeField, RangeOperators
+from django.contrib.postgres.indexes import GinIndex
+from django.db import models, transaction, IntegrityError
+from django.db.models.functions import Coalesce
+from django.db.backends.postgresql.psycopg_any import DateRange, NumericRange
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from core.models import BaseModel, AuditModel
-from core.utils import validate_time_slot, calculate_duration, ConflictChecker
+from core.utils import validate_time_slot, calculate_duration, occurrence_bounds, ConflictChecker
+from core.intervals import get_active_schedule_index
 
 
 class TimeSlot(BaseModel):
@@ -45,7 +54,64 @@ class TimeSlot(BaseModel):
         self.full_clean()
         if not self.duration_minutes:
             self.duration_minutes = calculate_duration(self.start_time, self.end_time)
-        super().save(*args, **kwargs)
+        is_new = self._state.adding
+        
+        # Dependent schedules get their ranges from a database trigger, so
+        # moving the slot onto a busy time violates their constraints
+        schedules = []
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                if not is_new:
+                    schedules = list(self.schedules.all())
+                    ScheduleOccurrence.sync(schedules)
+        except IntegrityError as error:
+            message = Schedule.constraint_violation_message(error)
+            if message is None:
+                raise
+            raise ValidationError(f"Impossible de modifier ce créneau. {message}")
+        
+        if not is_new:
+            from .tasks import queue_conflict_recompute
+            queue_conflict_recompute(
+                [schedule.pk for schedule in schedules]
+                + list(self.makeupsession_set.values_list('original_schedule_id', flat=True))
+            )
+            
+            from .occupancy import RoomOccupancy
+            dates = [schedule.start_date for schedule in schedules] + [schedule.end_date for schedule in schedules]
+            dates += self.makeupsession_set.values_list('proposed_date', flat=True)
+            if dates:
+                RoomOccupancy.invalidate(min(dates), max(dates))
+    
+    @classmethod
+    def opening_hours(cls):
+        """
+        Map each day with active time slots to its (opening, closing) times:
+        the earliest start and the latest end of that day's slots.
+        """
+        return {
+            hours['day_of_week']: (hours['opening'], hours['closing'])
+            for hours in cls.objects.filter(is_active=True)
+            .values('day_of_week')
+            .annotate(opening=models.Min('start_time'), closing=models.Max('end_time'))
+        }
+    
+    def weekly_range(self):
+        """Range of minutes since Monday 00:00 covered by this slot."""
+        day_offset = self.day_of_week * 24 * 60
+        return NumericRange(
+            day_offset + self.start_time.hour * 60 + self.start_time.minute,
+            day_offset + self.end_time.hour * 60 + self.end_time.minute,
+            bounds='[)'
+        )
+    
+    def occurrence_range(self, start_date, end_date):
+        """Dates of the first and last occurrences of this slot in a period."""
+        bounds = occurrence_bounds(self.day_of_week, start_date, end_date)
+        if bounds is None:
+            return DateRange(empty=True)
+        return DateRange(*bounds, bounds='[]')
 
 
 class Schedule(AuditModel):
@@ -68,11 +134,44 @@ class Schedule(AuditModel):
     is_cancelled = models.BooleanField(default=False)
     cancellation_reason = models.CharField(max_length=500, blank=True)
     
+    # Denormalized ranges backing the double-booking exclusion constraints.
+    # date_range spans the first to the last actual occurrence.
+    date_range = DateRangeField(null=True, editable=False)
+    weekly_time_range = IntegerRangeField(null=True, editable=False)
+    
     class Meta:
         db_table = 'schedules'
         verbose_name = 'Emploi du temps'
         verbose_name_plural = 'Emplois du temps'
         ordering = ['start_date', 'time_slot__day_of_week', 'time_slot__start_time']
+        constraints = [
+            ExclusionConstraint(
+                name='schedules_exclude_room_overlap',
+                expressions=[
+                    ('room', RangeOperators.EQUAL),
+                    ('weekly_time_range', RangeOperators.OVERLAPS),
+                    ('date_range', RangeOperators.OVERLAPS),
+                ],
+                condition=models.Q(is_active=True, is_cancelled=False),
+                violation_error_message="Conflit de salle: salle déjà occupée sur ce créneau",
+            ),
+            ExclusionConstraint(
+                name='schedules_exclude_teacher_overlap',
+                expressions=[
+                    ('teacher', RangeOperators.EQUAL),
+                    ('weekly_time_range', RangeOperators.OVERLAPS),
+                    ('date_range', RangeOperators.OVERLAPS),
+                ],
+                condition=models.Q(is_active=True, is_cancelled=False),
+                violation_error_message="Conflit d'enseignant: enseignant déjà occupé sur ce créneau",
+            ),
+        ]
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loaded_period = (self.__dict__.get('start_date'), self.__dict__.get('end_date'))
+        self._loaded_resources = (self.__dict__.get('teacher_id'), self.__dict__.get('room_id'))
+        self._loaded_cancelled = self.__dict__.get('is_cancelled')
     
     def __str__(self):
         return (f"{self.subject.name} - {self.teacher.user.get_full_name()} - "
@@ -82,18 +181,30 @@ class Schedule(AuditModel):
         if self.end_date < self.start_date:
             raise ValidationError("La date de fin doit être postérieure à la date de début.")
         
-        # Check for conflicts
+        # With database constraints enabled, double bookings are rejected by
+        # PostgreSQL on save instead of being pre-checked here.
+        if settings.SCHEDULE_DB_CONSTRAINTS and get_active_schedule_index() is None:
+            return
+        
+        self.check_conflicts()
+    
+    def check_conflicts(self):
+        """
+        Raise a ValidationError if the room or teacher is already booked.
+        """
         if hasattr(self, 'room') and hasattr(self, 'time_slot'):
             # Check room availability
             room_available, room_message = ConflictChecker.check_room_conflict(
-                self.room, self.time_slot, self.start_date, exclude_schedule=self
+                self.room, self.time_slot, self.start_date,
+                exclude_schedule=self, end_date=self.end_date
             )
             if not room_available:
                 raise ValidationError(f"Conflit de salle: {room_message}")
             
             # Check teacher availability
             teacher_available, teacher_message = ConflictChecker.check_teacher_conflict(
-                self.teacher, self.time_slot, self.start_date, exclude_schedule=self
+                self.teacher, self.time_slot, self.start_date,
+                exclude_schedule=self, end_date=self.end_date
             )
             if not teacher_available:
                 raise ValidationError(f"Conflit d'enseignant: {teacher_message}")
@@ -101,8 +212,85 @@ class Schedule(AuditModel):
     def save(self, *args, **kwargs):
         if not self.title:
             self.title = f"{self.subject.name} - {self.time_slot}"
-        self.full_clean()
-        super().save(*args, **kwargs)
+        self.set_ranges(self.time_slot)
+        self.full_clean(validate_constraints=False)
+        
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+        except IntegrityError as error:
+            self._raise_constraint_violation(error)
+            raise
+        
+        # Regenerate the dated sessions; (un)cancelling applies to all of them
+        ScheduleOccurrence.sync([self], reset_status=self.is_cancelled != self._loaded_cancelled)
+        
+        # Keep the request/task conflict index in sync with this change
+        index = get_active_schedule_index()
+        if index is not None:
+            index.update(self)
+        
+        # Recompute the neighbourhood's conflicts, including those this change
+        # (e.g. a cancellation) resolved
+        from .tasks import queue_conflict_recompute
+        queue_conflict_recompute([self.pk])
+        
+        self.invalidate_room_occupancy()
+        self._loaded_period = (self.start_date, self.end_date)
+        self._loaded_resources = (self.teacher_id, self.room_id)
+        self._loaded_cancelled = self.is_cancelled
+    
+    def set_ranges(self, time_slot):
+        """
+        Compute the denormalized ranges used by the exclusion constraints.
+        
+        The ``schedules_set_ranges`` trigger computes the same ranges for
+        rows written without ``save()``.
+        """
+        self.date_range = time_slot.occurrence_range(self.start_date, self.end_date)
+        self.weekly_time_range = time_slot.weekly_range()
+    
+    @classmethod
+    def constraint_violation_message(cls, error):
+        """
+        French message of the exclusion constraint an IntegrityError
+        violated, or None if it is about something else.
+        """
+        violated = getattr(getattr(error.__cause__, 'diag', None), 'constraint_name', None)
+        
+        for constraint in cls._meta.constraints:
+            if constraint.name == violated:
+                return constraint.violation_error_message
+        return None
+    
+    def _raise_constraint_violation(self, error):
+        """
+        Translate an exclusion constraint violation into the French
+        validation message the pre-check would have produced.
+        """
+        message = self.constraint_violation_message(error)
+        if message is not None:
+            # Same message as the pre-check, falling back to the generic one
+            self.check_conflicts()
+            raise ValidationError(message)
+    
+    def delete(self, *args, **kwargs):
+        index = get_active_schedule_index()
+        if index is not None:
+            index.discard(self.pk)
+        # Its conflicts are deleted along with it, nothing to recompute
+        result = super().delete(*args, **kwargs)
+        self.invalidate_room_occupancy()
+        return result
+    
+    def invalidate_room_occupancy(self):
+        """
+        Drop the cached room occupancy of the weeks this schedule spans or spanned.
+        """
+        from .occupancy import RoomOccupancy
+        
+        dates = [day for day in (*self._loaded_period, self.start_date, self.end_date) if day]
+        RoomOccupancy.invalidate(min(dates), max(dates))
     
     @property
     def is_recurring(self):
@@ -124,8 +312,145 @@ class ScheduleProgram(BaseModel):
         verbose_name_plural = 'Programmes d\'emploi du temps'
         unique_together = ['schedule', 'program']
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loaded_program_id = self.__dict__.get('program_id')
+    
     def __str__(self):
         return f"{self.schedule.subject.name} - {self.program.name}"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_program_id = self.program_id
+        self.sync_occurrences()
+        self.queue_conflict_recompute()
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.sync_occurrences()
+        self.queue_conflict_recompute()
+        return result
+    
+    def queue_conflict_recompute(self):
+        """
+        Recompute the student-group and capacity conflicts of the schedule.
+        """
+        from .tasks import queue_conflict_recompute
+        queue_conflict_recompute([self.schedule_id])
+    
+    def sync_occurrences(self):
+        """
+        Refresh the program ids of the schedule's sessions, from the stored
+        schedule rather than a possibly outdated ``self.schedule``.
+        """
+        ScheduleOccurrence.sync(Schedule.objects.select_related('time_slot').filter(pk=self.schedule_id))
+
+
+class ScheduleOccurrence(models.Model):
+    """
+    One actual session of a schedule, on a given date.
+    
+    Rows are generated from the weekly patterns by ``sync`` whenever a
+    schedule, its programs or its time slot change, so that questions about
+    a given date are answered with index lookups instead of re-expanding
+    patterns.
+    """
+    STATUS_CHOICES = [
+        ('SCHEDULED', 'Prévue'),
+        ('CANCELLED', 'Annulée'),
+    ]
+    
+    schedule = models.ForeignKey(Schedule, on_delete=models.CASCADE, related_name='occurrences')
+    date = models.DateField()
+    start_datetime = models.DateTimeField()
+    end_datetime = models.DateTimeField()
+    room = models.ForeignKey('academic.Room', on_delete=models.CASCADE, related_name='occurrences')
+    teacher = models.ForeignKey('users.Teacher', on_delete=models.CASCADE, related_name='occurrences')
+    program_ids = ArrayField(models.IntegerField(), default=list, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='SCHEDULED')
+    
+    class Meta:
+        db_table = 'schedule_occurrences'
+        verbose_name = 'Séance'
+        verbose_name_plural = 'Séances'
+        ordering = ['start_datetime']
+        constraints = [
+            models.UniqueConstraint(fields=['schedule', 'date'], name='schedule_occurrences_unique_date'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'room']),
+            models.Index(fields=['date', 'teacher']),
+            # Multi-column GIN index (btree_gin) for date + program lookups
+            GinIndex(fields=['date', 'program_ids']),
+        ]
+    
+    def __str__(self):
+        return f"{self.schedule_id} - {self.date}"
+    
+    @classmethod
+    def sync(cls, schedules, reset_status=False):
+        """
+        Bring the occurrences of the given schedules in line with their
+        weekly patterns.
+        
+        Missing sessions are created, those no longer planned deleted and the
+        others updated in place. Updated sessions keep their own status, so
+        that single cancelled sessions stay cancelled, unless
+        ``reset_status`` is set or the whole schedule is cancelled.
+        """
+        schedules = {schedule.pk: schedule for schedule in schedules}
+        
+        programs = {}
+        for schedule_id, program_id in ScheduleProgram.objects.filter(
+            schedule_id__in=schedules, is_active=True
+        ).order_by('program_id').values_list('schedule_id', 'program_id'):
+            programs.setdefault(schedule_id, []).append(program_id)
+        
+        existing = {
+            (occurrence.schedule_id, occurrence.date): occurrence
+            for occurrence in cls.objects.filter(schedule_id__in=schedules)
+        }
+        
+        tz = timezone.get_default_timezone()
+        to_create = []
+        to_update = []
+        for schedule in schedules.values():
+            bounds = occurrence_bounds(schedule.time_slot.day_of_week, schedule.start_date, schedule.end_date)
+            if not schedule.is_active or bounds is None:
+                continue
+            
+            status = 'CANCELLED' if schedule.is_cancelled else 'SCHEDULED'
+            day = bounds[0]
+            while day <= bounds[1]:
+                occurrence = existing.pop((schedule.pk, day), None)
+                if occurrence is None:
+                    occurrence = cls(schedule=schedule, date=day, status=status)
+                    to_create.append(occurrence)
+                else:
+                    to_update.append(occurrence)
+                    if reset_status or schedule.is_cancelled:
+                        occurrence.status = status
+                
+                occurrence.start_datetime = timezone.make_aware(
+                    datetime.combine(day, schedule.time_slot.start_time), tz
+                )
+                occurrence.end_datetime = timezone.make_aware(
+                    datetime.combine(day, schedule.time_slot.end_time), tz
+                )
+                occurrence.room_id = schedule.room_id
+                occurrence.teacher_id = schedule.teacher_id
+                occurrence.program_ids = programs.get(schedule.pk, [])
+                day += timedelta(days=7)
+        
+        # Whatever was not matched is no longer planned
+        if existing:
+            cls.objects.filter(id__in=[occurrence.pk for occurrence in existing.values()]).delete()
+        cls.objects.bulk_create(to_create, batch_size=500)
+        cls.objects.bulk_update(
+            to_update,
+            ['start_datetime', 'end_datetime', 'room', 'teacher', 'program_ids', 'status'],
+            batch_size=500
+        )
 
 
 class TeacherUnavailability(AuditModel):
@@ -156,6 +481,9 @@ class TeacherUnavailability(AuditModel):
         verbose_name = 'Indisponibilité enseignant'
         verbose_name_plural = 'Indisponibilités enseignants'
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['teacher', 'start_date', 'end_date']),
+        ]
     
     def __str__(self):
         return f"{self.teacher.user.get_full_name()} - {self.start_date} to {self.end_date}"
@@ -168,6 +496,24 @@ class TeacherUnavailability(AuditModel):
             if not self.start_time or not self.end_time:
                 raise ValidationError("Les heures de début et fin sont requises pour les indisponibilités partielles.")
             validate_time_slot(self.start_time, self.end_time)
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.queue_conflict_recompute()
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.queue_conflict_recompute()
+        return result
+    
+    def queue_conflict_recompute(self):
+        """
+        Recompute the conflicts of this teacher's schedules.
+        """
+        from .tasks import queue_conflict_recompute
+        queue_conflict_recompute(
+            Schedule.objects.filter(teacher_id=self.teacher_id, is_active=True).values_list('id', flat=True)
+        )
 
 
 class MakeupSession(AuditModel):
@@ -209,9 +555,46 @@ class MakeupSession(AuditModel):
         verbose_name = 'Séance de rattrapage'
         verbose_name_plural = 'Séances de rattrapage'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['proposed_room', 'proposed_date']),
+        ]
     
     def __str__(self):
         return f"Rattrapage: {self.original_schedule.subject.name} - {self.proposed_date}"
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loaded_proposed_date = self.__dict__.get('proposed_date')
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        
+        # Approved makeups book a room and a teacher like schedules do
+        from .tasks import queue_conflict_recompute
+        queue_conflict_recompute([self.original_schedule_id])
+        
+        self.invalidate_room_occupancy()
+        self._loaded_proposed_date = self.proposed_date
+    
+    def delete(self, *args, **kwargs):
+        original_schedule_id = self.original_schedule_id
+        result = super().delete(*args, **kwargs)
+        
+        from .tasks import queue_conflict_recompute
+        queue_conflict_recompute([original_schedule_id])
+        
+        self.invalidate_room_occupancy()
+        return result
+    
+    def invalidate_room_occupancy(self):
+        """
+        Drop the cached room occupancy of the proposed date's week.
+        """
+        from .occupancy import RoomOccupancy
+        
+        for day in {self._loaded_proposed_date, self.proposed_date}:
+            if day:
+                RoomOccupancy.invalidate(day, day)
 
 
 class ScheduleConflict(BaseModel):
@@ -245,6 +628,8 @@ class ScheduleConflict(BaseModel):
     conflict_type = models.CharField(max_length=30, choices=CONFLICT_TYPE_CHOICES)
     severity = models.CharField(max_length=10, choices=SEVERITY_CHOICES, default='MEDIUM')
     description = models.TextField()
+    # Recorded by a detector, which may resolve it once it is not found any more
+    is_auto_detected = models.BooleanField(default=False)
     
     is_resolved = models.BooleanField(default=False)
     resolution_notes = models.TextField(blank=True)
@@ -262,9 +647,35 @@ class ScheduleConflict(BaseModel):
         verbose_name = 'Conflit d\'emploi du temps'
         verbose_name_plural = 'Conflits d\'emploi du temps'
         ordering = ['-severity', '-created_at']
+        constraints = [
+            # Pairs are stored with the smallest schedule id first...
+            models.CheckConstraint(
+                check=models.Q(schedule2__isnull=True) | models.Q(schedule1__lt=models.F('schedule2')),
+                name='schedule_conflicts_ordered_pair',
+            ),
+            # ...so that a pair has at most one open conflict of each type
+            models.UniqueConstraint(
+                models.F('conflict_type'), models.F('schedule1'), Coalesce(models.F('schedule2'), 0),
+                condition=models.Q(is_resolved=False),
+                name='schedule_conflicts_unique_open_pair',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.get_conflict_type_display()} - {self.schedule1.subject.name}"
+    
+    @staticmethod
+    def pair_key(schedule1_id, schedule2_id=None):
+        """
+        Normalized ``(schedule1_id, schedule2_id)`` key of a conflict.
+        """
+        if schedule2_id is None:
+            return schedule1_id, None
+        return min(schedule1_id, schedule2_id), max(schedule1_id, schedule2_id)
+    
+    def save(self, *args, **kwargs):
+        self.schedule1_id, self.schedule2_id = self.pair_key(self.schedule1_id, self.schedule2_id)
+        super().save(*args, **kwargs)
 
 
 class TimetableGeneration(AuditModel):
@@ -304,4 +715,29 @@ class TimetableGeneration(AuditModel):
         ordering = ['-start_time']
     
     def __str__(self):
-        return f"Génération {self.academic_year.name} - {self.status}"
\ No newline at end of file
+        return f"Génération {self.academic_year.name} - {self.status}"
+
+
+class RoomUtilization(models.Model):
+    """
+    Booked minutes per room and ISO week, from active schedules and approved
+    makeup sessions.
+    
+    Read-only view of the ``room_weekly_utilization`` materialized view,
+    refreshed by the ``refresh_room_utilization`` task.
+    """
+    id = models.CharField(max_length=40, primary_key=True)
+    room = models.ForeignKey('academic.Room', on_delete=models.DO_NOTHING, related_name='weekly_utilization')
+    week_start = models.DateField()
+    booked_minutes = models.PositiveIntegerField()
+    sessions = models.PositiveIntegerField()
+    
+    class Meta:
+        managed = False
+        db_table = 'room_weekly_utilization'
+        verbose_name = 'Occupation hebdomadaire de salle'
+        verbose_name_plural = 'Occupations hebdomadaires des salles'
+        ordering = ['week_start', 'room']
+    
+    def __str__(self):
+        return f"{self.room_id} - {self.week_start}: {self.booked_minutes} min"
@@ -0,0 +1,331 @@
+"""
+Weekly occupancy bitmaps for fast conflict and free-slot queries.
+
+A week is split into 7 x 96 quarter-hour ticks and every placement is
+encoded as a Python integer with one bit per tick it touches, so two
+placements can only overlap if ``mask_a & mask_b`` is non-zero.
+"""
+from datetime import time, timedelta
+
+from django.core.cache import cache
+
+from core.intervals import time_to_minutes
+from core.utils import occurrence_bounds
+from .models import Schedule, ScheduleProgram, MakeupSession
+
+
+TICK_MINUTES = 15
+TICKS_PER_DAY = 24 * 60 // TICK_MINUTES
+
+
+def slot_mask(day_of_week, start_time, end_time):
+    """
+    Bitmask of the weekly ticks touched by a time slot.
+    """
+    first_tick = time_to_minutes(start_time) // TICK_MINUTES
+    last_tick = -(-time_to_minutes(end_time) // TICK_MINUTES)
+    width = last_tick - first_tick
+    return ((1 << width) - 1) << (day_of_week * TICKS_PER_DAY + first_tick)
+
+
+def weekly_span(day_of_week, start_time, end_time):
+    """
+    ``(start, end)`` minutes of the week of a time slot.
+    """
+    offset = day_of_week * 24 * 60
+    return offset + time_to_minutes(start_time), offset + time_to_minutes(end_time)
+
+
+def tick_to_time(tick):
+    """
+    Time of day at which a tick of the day starts.
+    """
+    minutes = tick * TICK_MINUTES
+    return time(minutes // 60, minutes % 60) if minutes < 24 * 60 else time.max
+
+
+def week_start(day):
+    """
+    Monday of the week containing ``day``.
+    """
+    return day - timedelta(days=day.weekday())
+
+
+def weeks_between(start_date, end_date):
+    """
+    Mondays of the weeks overlapping the period.
+    """
+    monday = week_start(start_date)
+    mondays = []
+    while monday <= end_date:
+        mondays.append(monday)
+        monday += timedelta(days=7)
+    return mondays
+
+
+class Placement:
+    """
+    A schedule occupying a weekly slot over a range of occurrence dates.
+    """
+    __slots__ = ('schedule_id', 'day_of_week', 'start', 'end', 'first_date', 'last_date', 'mask')
+
+    def __init__(self, schedule_id, day_of_week, start_time, end_time, start_date, end_date):
+        self.schedule_id = schedule_id
+        self.day_of_week = day_of_week
+        self.start = time_to_minutes(start_time)
+        self.end = time_to_minutes(end_time)
+        self.first_date, self.last_date = occurrence_bounds(day_of_week, start_date, end_date)
+        self.mask = slot_mask(day_of_week, start_time, end_time)
+
+    def overlaps(self, other, start_date=None, end_date=None):
+        """
+        Whether both placements share an occurrence (within the period if given).
+        """
+        if not self.mask & other.mask:
+            return False
+        if self.start >= other.end or other.start >= self.end:
+            return False
+
+        first = max(self.first_date, other.first_date, start_date or self.first_date)
+        last = min(self.last_date, other.last_date, end_date or self.last_date)
+        return first <= last
+
+
+class ProgramOccupancy:
+    """
+    Per-program weekly occupancy bitmaps built from ScheduleProgram rows.
+    """
+
+    def __init__(self):
+        self.placements = {}
+        self.names = {}
+
+    @classmethod
+    def build(cls, start_date=None, end_date=None, program_ids=None):
+        """
+        Load the placements of active schedules in a single query.
+        """
+        rows = ScheduleProgram.objects.filter(
+            is_active=True,
+            schedule__is_active=True,
+            schedule__is_cancelled=False
+        )
+        if start_date:
+            rows = rows.filter(schedule__end_date__gte=start_date)
+        if end_date:
+            rows = rows.filter(schedule__start_date__lte=end_date)
+        if program_ids is not None:
+            rows = rows.filter(program_id__in=program_ids)
+
+        occupancy = cls()
+        for row in rows.values_list(
+            'program_id', 'program__name', 'schedule_id',
+            'schedule__time_slot__day_of_week', 'schedule__time_slot__start_time',
+            'schedule__time_slot__end_time', 'schedule__start_date', 'schedule__end_date'
+        ):
+            program_id, program_name, schedule_id = row[:3]
+            if occurrence_bounds(row[3], row[6], row[7]) is None:
+                continue
+            occupancy.names[program_id] = program_name
+            occupancy.placements.setdefault(program_id, []).append(Placement(schedule_id, *row[3:]))
+        return occupancy
+
+    def conflicting_pairs(self, start_date=None, end_date=None):
+        """
+        Yield ``(program_id, schedule1_id, schedule2_id)`` for every pair of
+        overlapping placements of the same program.
+
+        Programs whose bitmaps never collide are skipped after one pass of
+        AND/OR operations; only colliding ones are compared pairwise.
+        """
+        for program_id, placements in self.placements.items():
+            seen = collisions = 0
+            for placement in placements:
+                collisions |= seen & placement.mask
+                seen |= placement.mask
+            if not collisions:
+                continue
+
+            candidates = [placement for placement in placements if placement.mask & collisions]
+            for position, first in enumerate(candidates):
+                for second in candidates[position + 1:]:
+                    if first.schedule_id != second.schedule_id and first.overlaps(second, start_date, end_date):
+                        yield (program_id,) + tuple(sorted((first.schedule_id, second.schedule_id)))
+
+
+class RoomOccupancy:
+    """
+    Per-room weekly occupancy bitmaps built from active schedules and
+    approved makeup sessions.
+
+    Bitmaps are computed per ISO week and cached; ``build`` only queries the
+    weeks missing from the cache, and ``invalidate`` drops the weeks touched
+    by a scheduling change so that they are recomputed on next use.
+
+    Ticks round slots outwards, so bitmaps only rule collisions out: when
+    they intersect, the exact minute spans kept next to them decide.
+    """
+    CACHE_KEY = 'room_occupancy:v2:{}'
+    CACHE_TIMEOUT = 24 * 60 * 60
+
+    def __init__(self, weeks=None, spans=None):
+        # Monday -> {room_id: mask}
+        self.weeks = weeks or {}
+        # Monday -> {room_id: [(start, end) minutes of the week]}
+        self.spans = spans or {}
+
+    @classmethod
+    def build(cls, start_date, end_date):
+        """
+        Load the bitmaps of every week overlapping the period.
+
+        Weeks missing from the cache are computed together with one
+        schedule query and one makeup session query.
+        """
+        keys = {cls.CACHE_KEY.format(monday.isoformat()): monday for monday in weeks_between(start_date, end_date)}
+        # Monday -> ({room_id: mask}, {room_id: spans})
+        weeks = {keys[key]: week for key, week in cache.get_many(keys).items()}
+
+        missing = [monday for monday in keys.values() if monday not in weeks]
+        if missing:
+            computed = cls._compute(missing)
+            cache.set_many(
+                {cls.CACHE_KEY.format(monday.isoformat()): week for monday, week in computed.items()},
+                cls.CACHE_TIMEOUT
+            )
+            weeks.update(computed)
+
+        return cls(
+            {monday: masks for monday, (masks, spans) in weeks.items()},
+            {monday: spans for monday, (masks, spans) in weeks.items()}
+        )
+
+    @staticmethod
+    def _compute(mondays):
+        weeks = {monday: ({}, {}) for monday in mondays}
+        first_day = min(mondays)
+        last_day = max(mondays) + timedelta(days=6)
+
+        for room_id, day_of_week, start_time, end_time, start_date, end_date in Schedule.objects.filter(
+            is_active=True,
+            is_cancelled=False,
+            start_date__lte=last_day,
+            end_date__gte=first_day
+        ).values_list(
+            'room_id', 'time_slot__day_of_week', 'time_slot__start_time',
+            'time_slot__end_time', 'start_date', 'end_date'
+        ):
+            bounds = occurrence_bounds(day_of_week, start_date, end_date)
+            if bounds is None:
+                continue
+
+            mask = slot_mask(day_of_week, start_time, end_time)
+            span = weekly_span(day_of_week, start_time, end_time)
+            for monday, (masks, spans) in weeks.items():
+                if bounds[0] <= monday + timedelta(days=day_of_week) <= bounds[1]:
+                    masks[room_id] = masks.get(room_id, 0) | mask
+                    spans.setdefault(room_id, []).append(span)
+
+        for room_id, proposed_date, start_time, end_time in MakeupSession.objects.filter(
+            is_active=True,
+            status='APPROVED',
+            proposed_date__range=(first_day, last_day)
+        ).values_list(
+            'proposed_room_id', 'proposed_date',
+            'proposed_time_slot__start_time', 'proposed_time_slot__end_time'
+        ):
+            week = weeks.get(week_start(proposed_date))
+            if week is not None:
+                masks, spans = week
+                masks[room_id] = masks.get(room_id, 0) | slot_mask(proposed_date.weekday(), start_time, end_time)
+                spans.setdefault(room_id, []).append(weekly_span(proposed_date.weekday(), start_time, end_time))
+
+        return weeks
+
+    @classmethod
+    def invalidate(cls, start_date, end_date):
+        """
+        Drop the cached bitmaps of the weeks overlapping the period.
+        """
+        cache.delete_many([
+            cls.CACHE_KEY.format(monday.isoformat()) for monday in weeks_between(start_date, end_date)
+        ])
+
+    def room_mask(self, room_id, monday):
+        """
+        Occupancy bitmap of a room for the week starting on ``monday``.
+        """
+        return self.weeks[monday].get(room_id, 0)
+
+    def _collides(self, room_id, monday, mask, span):
+        """
+        Whether the room is booked during ``span`` in the week of ``monday``,
+        ``mask`` being the ticks of the span.
+        """
+        if not self.room_mask(room_id, monday) & mask:
+            return False
+
+        start, end = span
+        return any(
+            busy_start < end and start < busy_end
+            for busy_start, busy_end in self.spans[monday].get(room_id, ())
+        )
+
+    def is_free(self, room_id, day, start_time, end_time):
+        """
+        Whether the room is free on ``day`` between the two times.
+        """
+        return not self._collides(
+            room_id, week_start(day),
+            slot_mask(day.weekday(), start_time, end_time),
+            weekly_span(day.weekday(), start_time, end_time)
+        )
+
+    def busy_dates(self, room_ids, day_of_week, start_time, end_time, start_date, end_date):
+        """
+        Map each room to the occurrences of a weekly slot, between the two
+        dates, on which the room is busy.
+        """
+        mask = slot_mask(day_of_week, start_time, end_time)
+        span = weekly_span(day_of_week, start_time, end_time)
+        busy = {room_id: [] for room_id in room_ids}
+
+        bounds = occurrence_bounds(day_of_week, start_date, end_date)
+        if bounds is None:
+            return busy
+
+        day = bounds[0]
+        while day <= bounds[1]:
+            monday = week_start(day)
+            for room_id, dates in busy.items():
+                if self._collides(room_id, monday, mask, span):
+                    dates.append(day)
+            day += timedelta(days=7)
+        return busy
+
+    def free_windows(self, room_id, day, opening_time, closing_time, duration_minutes):
+        """
+        Free ``(start_time, end_time)`` windows of at least
+        ``duration_minutes`` in a room on ``day`` within opening hours.
+
+        Windows are aligned on ticks; a partially used tick counts as busy.
+        """
+        offset = day.weekday() * TICKS_PER_DAY
+        day_mask = self.room_mask(room_id, week_start(day)) >> offset
+
+        first_tick = -(-time_to_minutes(opening_time) // TICK_MINUTES)
+        last_tick = time_to_minutes(closing_time) // TICK_MINUTES
+        min_ticks = -(-duration_minutes // TICK_MINUTES)
+
+        windows = []
+        tick = first_tick
+        while tick < last_tick:
+            if day_mask >> tick & 1:
+                tick += 1
+                continue
+            window_start = tick
+            while tick < last_tick and not day_mask >> tick & 1:
+                tick += 1
+            if tick - window_start >= min_ticks:
+                windows.append((tick_to_time(window_start), tick_to_time(tick)))
+        return windows
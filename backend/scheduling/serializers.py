@@ -2,8 +2,12 @@
 Serializers for scheduling models.
 """
 from rest_framework import serializers
+from django.db.models import Prefetch
 from django.utils import timezone
-from .models import TimeSlot, Schedule, ScheduleProgram, TeacherUnavailability, MakeupSession, ScheduleConflict
+from .models import (
+    TimeSlot, Schedule, ScheduleProgram, ScheduleOccurrence, TeacherUnavailability, MakeupSession,
+    ScheduleConflict
+)
 from academic.serializers import SubjectSerializer, RoomSerializer
 from users.serializers import TeacherProfileSerializer
 
@@ -49,6 +53,45 @@ class ScheduleSerializer(serializers.ModelSerializer):
                  'start_date', 'end_date', 'student_count', 'notes', 'is_cancelled',
                  'cancellation_reason', 'is_active', 'created_at']
         read_only_fields = ['id', 'created_at']
+    
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load the related objects this serializer reads, so that serializing
+        any number of schedules costs two queries.
+        """
+        return queryset.select_related(
+            'subject', 'teacher__user', 'room', 'time_slot'
+        ).prefetch_related(
+            Prefetch('scheduleprogram_set', queryset=ScheduleProgram.objects.select_related('program'))
+        )
+
+
+class ScheduleOccurrenceSerializer(serializers.ModelSerializer):
+    """
+    Serializer for dated sessions, flattening the schedule they belong to.
+    """
+    title = serializers.CharField(source='schedule.title', read_only=True)
+    subject = serializers.IntegerField(source='schedule.subject_id', read_only=True)
+    subject_name = serializers.CharField(source='schedule.subject.name', read_only=True)
+    teacher_name = serializers.CharField(source='teacher.user.get_full_name', read_only=True)
+    room_name = serializers.CharField(source='room.name', read_only=True)
+    time_slot = serializers.IntegerField(source='schedule.time_slot_id', read_only=True)
+    time_slot_display = serializers.CharField(source='schedule.time_slot.__str__', read_only=True)
+    
+    class Meta:
+        model = ScheduleOccurrence
+        fields = ['id', 'schedule', 'date', 'start_datetime', 'end_datetime', 'status', 'title',
+                 'subject', 'subject_name', 'teacher', 'teacher_name', 'room', 'room_name',
+                 'time_slot', 'time_slot_display', 'program_ids']
+        read_only_fields = fields
+    
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load the related objects this serializer reads with the sessions.
+        """
+        return queryset.select_related('schedule__subject', 'schedule__time_slot', 'teacher__user', 'room')
 
 
 class ScheduleDetailSerializer(ScheduleSerializer):
@@ -114,9 +157,9 @@ class ScheduleConflictSerializer(serializers.ModelSerializer):
         model = ScheduleConflict
         fields = ['id', 'schedule1', 'schedule1_title', 'schedule2', 'schedule2_title',
                  'conflict_type', 'conflict_type_display', 'severity', 'severity_display',
-                 'description', 'is_resolved', 'resolution_notes', 'resolved_by',
+                 'description', 'is_auto_detected', 'is_resolved', 'resolution_notes', 'resolved_by',
                  'resolved_by_name', 'resolved_at', 'created_at']
-        read_only_fields = ['id', 'resolved_by', 'resolved_at', 'created_at']
+        read_only_fields = ['id', 'is_auto_detected', 'resolved_by', 'resolved_at', 'created_at']
 
 
 class ScheduleCreateSerializer(serializers.ModelSerializer):
@@ -145,4 +188,26 @@ class ScheduleCreateSerializer(serializers.ModelSerializer):
                 program_id=program_id
             )
         
-        return schedule
\ No newline at end of file
+        return schedule
+
+
+class ConflictCandidateSerializer(serializers.Serializer):
+    """
+    Serializer for a candidate placement checked by the batch conflict API.
+    """
+    id = serializers.IntegerField(required=False, allow_null=True,
+                                  help_text="Emploi du temps déplacé, le cas échéant")
+    room = serializers.IntegerField()
+    teacher = serializers.IntegerField()
+    programs = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    time_slot = serializers.IntegerField()
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    
+    def validate(self, attrs):
+        """Validate that end_date is not before start_date."""
+        if attrs['end_date'] < attrs['start_date']:
+            raise serializers.ValidationError(
+                "La date de fin doit être postérieure à la date de début."
+            )
+        return attrs
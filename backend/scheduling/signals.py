@@ -0,0 +1,107 @@
+"""
+Signal handlers dropping the cached timetable snapshots an edit affects.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from academic.models import Program, Room, Subject
+from .models import (
+    Schedule, ScheduleProgram, ScheduleOccurrence, TimeSlot, TeacherUnavailability, MakeupSession
+)
+from .snapshots import TimetableSnapshot
+
+
+@receiver([post_save, post_delete], sender=Schedule)
+def invalidate_schedule_snapshots(sender, instance, **kwargs):
+    """
+    Drop the snapshots the schedule appears in, before and after the change.
+    """
+    teacher_id, room_id = instance._loaded_resources
+    scopes = [
+        ('teacher', teacher_id), ('room', room_id),
+        ('teacher', instance.teacher_id), ('room', instance.room_id),
+    ]
+    scopes += [
+        ('program', program_id)
+        for program_id in ScheduleProgram.objects.filter(schedule_id=instance.pk).values_list('program_id', flat=True)
+    ]
+    
+    dates = [day for day in (*instance._loaded_period, instance.start_date, instance.end_date) if day]
+    TimetableSnapshot.invalidate(scopes, min(dates), max(dates))
+
+
+@receiver([post_save, post_delete], sender=ScheduleProgram)
+def invalidate_schedule_program_snapshots(sender, instance, **kwargs):
+    """
+    Drop the snapshots listing the schedule's programs, and those of the
+    program it joined or left.
+    """
+    TimetableSnapshot.invalidate_schedules(
+        Schedule.objects.filter(pk=instance.schedule_id),
+        extra_scopes=[('program', instance._loaded_program_id), ('program', instance.program_id)]
+    )
+
+
+@receiver(post_save, sender=TimeSlot)
+@receiver(post_save, sender=Room)
+@receiver(post_save, sender=Subject)
+def invalidate_related_snapshots(sender, instance, created, **kwargs):
+    """
+    Drop the snapshots of the schedules displaying the edited time slot,
+    room or subject. Deletions cascade to the schedules themselves.
+    """
+    if not created:
+        TimetableSnapshot.invalidate_schedules(instance.schedules.all())
+
+
+@receiver(post_save, sender=Program)
+def invalidate_program_snapshots(sender, instance, created, **kwargs):
+    """
+    Drop the snapshots listing the program by name, and move its version
+    forward since its schedule shows its name and level.
+    """
+    if not created:
+        TimetableSnapshot.invalidate_schedules(Schedule.objects.filter(programs=instance))
+        TimetableSnapshot.touch([('program', instance.pk)])
+
+
+@receiver([post_save, post_delete], sender=TeacherUnavailability)
+def touch_teacher_version(sender, instance, **kwargs):
+    """
+    Unavailabilities are part of the teacher's schedule, but not of the
+    cached snapshots: only move the teacher's version forward.
+    """
+    TimetableSnapshot.touch([('teacher', instance.teacher_id)])
+
+
+@receiver([post_save, post_delete], sender=ScheduleOccurrence)
+def touch_occurrence_versions(sender, instance, **kwargs):
+    """
+    Cancelled sessions are EXDATEs of the calendar feeds, not part of the
+    cached snapshots: only move forward the versions of the session's
+    teacher, room and programs. Sessions written in bulk by
+    ``ScheduleOccurrence.sync`` are covered by the schedule's own signals.
+    """
+    scopes = [('teacher', instance.teacher_id), ('room', instance.room_id)]
+    scopes += [('program', program_id) for program_id in instance.program_ids]
+    TimetableSnapshot.touch(scopes)
+
+
+@receiver([post_save, post_delete], sender=MakeupSession)
+def touch_makeup_versions(sender, instance, **kwargs):
+    """
+    Makeup sessions appear in calendar feeds, not in the cached snapshots:
+    only move forward the versions of the scopes of the original schedule
+    and of the proposed room.
+    """
+    scopes = [('room', instance.proposed_room_id)]
+    scopes += [
+        (scope, object_id)
+        for teacher_id, room_id in Schedule.objects.filter(pk=instance.original_schedule_id).values_list('teacher_id', 'room_id')
+        for scope, object_id in (('teacher', teacher_id), ('room', room_id))
+    ]
+    scopes += [
+        ('program', program_id)
+        for program_id in ScheduleProgram.objects.filter(schedule_id=instance.original_schedule_id).values_list('program_id', flat=True)
+    ]
+    TimetableSnapshot.touch(scopes)
@@ -0,0 +1,165 @@
+"""
+Cached weekly timetable snapshots.
+
+The serialized schedules of a program, a teacher or a room for one ISO week
+are cached together, so that the many students of a program loading their
+week cost one cache read. Snapshots are dropped by the handlers of
+``scheduling.signals`` whenever a change touches one of the schedules they
+show, and the version stamp of their scope is moved forward.
+"""
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Schedule, ScheduleProgram
+from .occupancy import week_start, weeks_between
+
+
+# Schedule lookup selecting the schedules of each scope
+SCOPE_LOOKUPS = {
+    'program': 'programs',
+    'teacher': 'teacher_id',
+    'room': 'room_id',
+}
+
+
+class TimetableSnapshot:
+    """
+    Serialized active schedules (cancelled ones included) of a scope for the
+    week starting on a Monday, as ``(day_of_week, data)`` pairs ordered by
+    day and start time.
+    """
+    CACHE_KEY = 'timetable:{}:{}:{}'
+    CACHE_TIMEOUT = 7 * 24 * 60 * 60
+    VERSION_KEY = 'timetable:{}:{}:version'
+
+    @classmethod
+    def get(cls, scope, object_id, monday):
+        """
+        Snapshot of a scope's week, computed and cached if missing.
+        """
+        key = cls.CACHE_KEY.format(scope, object_id, monday.isoformat())
+        rows = cache.get(key)
+        if rows is None:
+            rows = cls._compute(scope, object_id, monday)
+            cache.set(key, rows, cls.CACHE_TIMEOUT)
+        return rows
+
+    @staticmethod
+    def _compute(scope, object_id, monday):
+        from .serializers import ScheduleSerializer
+
+        queryset = Schedule.objects.filter(
+            is_active=True,
+            start_date__lte=monday + timedelta(days=6),
+            end_date__gte=monday,
+            **{SCOPE_LOOKUPS[scope]: object_id}
+        )
+        queryset = ScheduleSerializer.setup_eager_loading(queryset).order_by(
+            'time_slot__day_of_week', 'time_slot__start_time'
+        )
+        return [
+            (schedule.time_slot.day_of_week, dict(data))
+            for schedule, data in zip(queryset, ScheduleSerializer(queryset, many=True).data)
+        ]
+
+    @classmethod
+    def for_period(cls, scope, object_id, start_date, end_date):
+        """
+        Snapshot rows for a period lying within a single week, or None if it
+        spans several weeks.
+        """
+        monday = week_start(start_date)
+        if end_date < start_date or end_date > monday + timedelta(days=6):
+            return None
+
+        start, end = start_date.isoformat(), end_date.isoformat()
+        return [
+            (day, data) for day, data in cls.get(scope, object_id, monday)
+            if data['start_date'] <= end and data['end_date'] >= start
+        ]
+
+    @classmethod
+    def keys(cls, scopes, start_date, end_date):
+        """
+        Cache keys of the given ``(scope, object_id)`` pairs for the weeks
+        overlapping the period.
+        """
+        mondays = [monday.isoformat() for monday in weeks_between(start_date, end_date)]
+        return [
+            cls.CACHE_KEY.format(scope, object_id, monday)
+            for scope, object_id in scopes if object_id
+            for monday in mondays
+        ]
+
+    @classmethod
+    def version(cls, scope, object_id):
+        """
+        Version stamp of a scope: the time, in microseconds, of its last
+        change.
+        
+        A stamp lost from the cache is replaced by the current time, so that
+        it can never match a version handed out before.
+        """
+        key = cls.VERSION_KEY.format(scope, object_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns() // 1000, None)
+            version = cache.get(key)
+        return version
+    
+    @classmethod
+    def touch(cls, scopes):
+        """
+        Move the version stamps of the given ``(scope, object_id)`` pairs
+        forward once the current transaction commits.
+        """
+        keys = sorted({cls.VERSION_KEY.format(scope, object_id) for scope, object_id in scopes if object_id})
+        if keys:
+            transaction.on_commit(lambda: cache.set_many(dict.fromkeys(keys, time.time_ns() // 1000), None))
+    
+    @classmethod
+    def invalidate(cls, scopes, start_date, end_date):
+        """
+        Drop the snapshots of the given scopes for the weeks overlapping the
+        period, and move their version stamps forward.
+        """
+        cls.invalidate_keys(cls.keys(scopes, start_date, end_date))
+        cls.touch(scopes)
+    
+    @staticmethod
+    def invalidate_keys(keys):
+        """
+        Drop the snapshots once the current transaction commits, so that they
+        are not rebuilt from data about to change.
+        """
+        keys = sorted(set(keys))
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
+
+    @classmethod
+    def invalidate_schedules(cls, schedules, extra_scopes=()):
+        """
+        Drop the snapshots of every scope and week showing one of the
+        schedules of a queryset, and those of ``extra_scopes`` over the
+        weeks of these schedules.
+        """
+        programs = {}
+        for schedule_id, program_id in ScheduleProgram.objects.filter(
+            schedule__in=schedules.values('id')
+        ).values_list('schedule_id', 'program_id'):
+            programs.setdefault(schedule_id, []).append(program_id)
+
+        keys = []
+        touched = set()
+        for schedule_id, teacher_id, room_id, start_date, end_date in schedules.values_list(
+            'id', 'teacher_id', 'room_id', 'start_date', 'end_date'
+        ):
+            scopes = [('teacher', teacher_id), ('room', room_id), *extra_scopes]
+            scopes += [('program', program_id) for program_id in programs.get(schedule_id, [])]
+            keys += cls.keys(scopes, start_date, end_date)
+            touched.update(scopes)
+        cls.invalidate_keys(keys)
+        cls.touch(touched)
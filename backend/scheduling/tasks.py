@@ -2,74 +2,195 @@
 Celery tasks for scheduling operations.
 """
 from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
 from django.utils import timezone
 from datetime import timedelta
-from .models import Schedule, ScheduleConflict, TeacherUnavailability
+from .models import Schedule, ScheduleOccurrence, ScheduleConflict, TeacherUnavailability, RoomUtilization
 from notifications.models import Notification
-from core.utils import ConflictChecker
+from core.intervals import ScheduleIndex
+from .conflicts import (
+    sweep_double_bookings, sweep_program_conflicts, sweep_capacity_conflicts,
+    sweep_unavailable_teachers, recompute_conflicts, reconcile_conflicts
+)
+
+
+# Pending recomputations are stored as numbered batches of schedule ids so
+# that concurrent edits never overwrite each other.
+RECOMPUTE_SEQUENCE_KEY = 'scheduling:conflicts:recompute:sequence'
+RECOMPUTE_DONE_KEY = 'scheduling:conflicts:recompute:done'
+RECOMPUTE_BATCH_KEY = 'scheduling:conflicts:recompute:batch:{}'
+RECOMPUTE_SCHEDULED_KEY = 'scheduling:conflicts:recompute:scheduled'
+RECOMPUTE_BATCH_TIMEOUT = 24 * 3600
+# Only one run drains the batches at a time
+RECOMPUTE_LOCK_KEY = 'scheduling:conflicts:recompute:lock'
+RECOMPUTE_LOCK_TIMEOUT = 30 * 60
+# First batch number reserved but not written yet at the end of the last run
+RECOMPUTE_WAITING_KEY = 'scheduling:conflicts:recompute:waiting'
 
 
 @shared_task
-def detect_schedule_conflicts():
+def detect_schedule_conflicts(sweep=True):
     """
     Periodic task to detect scheduling conflicts.
+    
+    By default all overlapping room/teacher pairs are found with set-based
+    self-joins (see ``scheduling.conflicts``). Pass ``sweep=False`` to fall
+    back to per-schedule lookups in the in-memory index.
+    
+    Every upcoming occurrence is examined, so that open conflicts which are
+    not found any more can be resolved.
     """
     conflicts_found = 0
     
-    # Get active schedules for the next 30 days
     start_date = timezone.now().date()
-    end_date = start_date + timedelta(days=30)
+    
+    conflicts_found += sweep_program_conflicts(start_date)
+    conflicts_found += sweep_capacity_conflicts(start_date)
+    conflicts_found += sweep_unavailable_teachers(start_date)
+    
+    if sweep:
+        conflicts_found += sweep_double_bookings(start_date)
+        return f"Détection terminée. {conflicts_found} conflits trouvés."
     
     schedules = Schedule.objects.filter(
         is_active=True,
         is_cancelled=False,
-        start_date__lte=end_date,
         end_date__gte=start_date
-    )
+    ).select_related('room', 'teacher__user', 'time_slot')
+    
+    room_conflicts = {}
+    teacher_conflicts = {}
     
+    # Answer every availability check from one in-memory index
+    index = ScheduleIndex.build()
     for schedule in schedules:
-        # Check room conflicts
-        room_available, room_message = ConflictChecker.check_room_conflict(
-            schedule.room, 
-            schedule.time_slot, 
-            schedule.start_date,
-            exclude_schedule=schedule
-        )
+        period = (max(schedule.start_date, start_date), schedule.end_date)
         
-        if not room_available:
-            # Create conflict record
-            ScheduleConflict.objects.get_or_create(
-                schedule1=schedule,
-                conflict_type='ROOM_DOUBLE_BOOKING',
-                defaults={
-                    'severity': 'HIGH',
-                    'description': room_message
-                }
+        # Check room conflicts
+        for entry in index.room_conflicts(
+            schedule.room_id, schedule.time_slot, *period, exclude_id=schedule.pk
+        ):
+            room_conflicts.setdefault(
+                ScheduleConflict.pair_key(schedule.pk, entry.item_id),
+                f"Salle {schedule.room.name} déjà occupée de "
+                f"{entry.payload['start_time']} à {entry.payload['end_time']}"
             )
-            conflicts_found += 1
         
         # Check teacher conflicts
-        teacher_available, teacher_message = ConflictChecker.check_teacher_conflict(
-            schedule.teacher,
-            schedule.time_slot,
-            schedule.start_date,
-            exclude_schedule=schedule
-        )
-        
-        if not teacher_available:
-            ScheduleConflict.objects.get_or_create(
-                schedule1=schedule,
-                conflict_type='TEACHER_DOUBLE_BOOKING',
-                defaults={
-                    'severity': 'CRITICAL',
-                    'description': teacher_message
-                }
+        for entry in index.teacher_conflicts(
+            schedule.teacher_id, schedule.time_slot, *period, exclude_id=schedule.pk
+        ):
+            teacher_conflicts.setdefault(
+                ScheduleConflict.pair_key(schedule.pk, entry.item_id),
+                f"Enseignant {schedule.teacher.user.get_full_name()} déjà occupé de "
+                f"{entry.payload['start_time']} à {entry.payload['end_time']}"
             )
-            conflicts_found += 1
+    
+    reconcile_conflicts('ROOM_DOUBLE_BOOKING', 'HIGH', room_conflicts, period=(start_date, None))
+    reconcile_conflicts('TEACHER_DOUBLE_BOOKING', 'CRITICAL', teacher_conflicts, period=(start_date, None))
+    conflicts_found += len(room_conflicts) + len(teacher_conflicts)
     
     return f"Détection terminée. {conflicts_found} conflits trouvés."
 
 
+def queue_conflict_recompute(schedule_ids):
+    """
+    Schedule a conflict recomputation for the given schedules.
+
+    The ids are queued once the current transaction commits and a single
+    ``recompute_schedule_conflicts`` run is scheduled per debounce window,
+    so bursts of edits are processed together.
+    """
+    schedule_ids = sorted({schedule_id for schedule_id in schedule_ids if schedule_id})
+    if not schedule_ids:
+        return
+    
+    def enqueue():
+        cache.add(RECOMPUTE_SEQUENCE_KEY, 0, None)
+        batch = cache.incr(RECOMPUTE_SEQUENCE_KEY)
+        cache.set(RECOMPUTE_BATCH_KEY.format(batch), schedule_ids, RECOMPUTE_BATCH_TIMEOUT)
+        schedule_recompute()
+    
+    transaction.on_commit(enqueue)
+
+
+def schedule_recompute():
+    """
+    Schedule a ``recompute_schedule_conflicts`` run unless one is pending.
+    """
+    delay = settings.SCHEDULE_CONFLICT_DEBOUNCE
+    if cache.add(RECOMPUTE_SCHEDULED_KEY, True, delay + 60):
+        recompute_schedule_conflicts.apply_async(countdown=delay)
+
+
+@shared_task
+def recompute_schedule_conflicts():
+    """
+    Recompute the conflicts of every schedule queued since the last run.
+    
+    Batch numbers are reserved before their ids are written, so a run may
+    see a batch that is not written yet. Batches are therefore only marked
+    done up to the first missing one; the following ones are left for the
+    next run. A batch still missing on the next run is skipped, as its
+    writer died or the batch expired.
+    """
+    if not cache.add(RECOMPUTE_LOCK_KEY, True, RECOMPUTE_LOCK_TIMEOUT):
+        # Another run is draining; try again once it is likely over
+        cache.delete(RECOMPUTE_SCHEDULED_KEY)
+        schedule_recompute()
+        return "Recalcul déjà en cours, reporté."
+    
+    try:
+        # Edits made from now on schedule a new run
+        cache.delete(RECOMPUTE_SCHEDULED_KEY)
+        
+        done = cache.get(RECOMPUTE_DONE_KEY, 0)
+        sequence = cache.get(RECOMPUTE_SEQUENCE_KEY, 0)
+        batches = cache.get_many([RECOMPUTE_BATCH_KEY.format(batch) for batch in range(done + 1, sequence + 1)])
+        waiting = cache.get(RECOMPUTE_WAITING_KEY)
+        
+        schedule_ids = set()
+        read = []
+        while done < sequence:
+            key = RECOMPUTE_BATCH_KEY.format(done + 1)
+            if key in batches:
+                schedule_ids.update(batches[key])
+                read.append(key)
+            elif done + 1 != waiting:
+                break
+            done += 1
+        
+        recorded, resolved = recompute_conflicts(schedule_ids)
+        
+        cache.delete_many(read)
+        cache.set(RECOMPUTE_DONE_KEY, done, None)
+        if done < sequence:
+            cache.set(RECOMPUTE_WAITING_KEY, done + 1, None)
+        else:
+            cache.delete(RECOMPUTE_WAITING_KEY)
+    finally:
+        cache.delete(RECOMPUTE_LOCK_KEY)
+    
+    if done < sequence:
+        schedule_recompute()
+    
+    return (f"Recalcul terminé pour {len(schedule_ids)} cours. "
+            f"{recorded} conflits trouvés, {resolved} résolus.")
+
+
+@shared_task
+def refresh_room_utilization():
+    """
+    Refresh the room utilization materialized view without blocking readers.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {RoomUtilization._meta.db_table}')
+    
+    return "Occupation des salles mise à jour."
+
+
 @shared_task
 def send_schedule_reminders():
     """
@@ -77,22 +198,22 @@ def send_schedule_reminders():
     """
     from notifications.utils import NotificationService
     
-    # Get schedules starting in the next hour
+    # Get sessions starting in the next hour
     now = timezone.now()
     one_hour_later = now + timedelta(hours=1)
     
-    # This is a simplified version - in reality, you'd need to calculate
-    # which specific class instances are happening today
-    upcoming_schedules = Schedule.objects.filter(
-        is_active=True,
-        is_cancelled=False,
-        start_date__lte=now.date(),
-        end_date__gte=now.date()
-    )
+    upcoming_occurrences = ScheduleOccurrence.objects.filter(
+        status='SCHEDULED',
+        start_datetime__gte=now,
+        start_datetime__lt=one_hour_later,
+        schedule__is_active=True
+    ).select_related('schedule__subject', 'room')
     
     reminders_sent = 0
     
-    for schedule in upcoming_schedules:
+    for occurrence in upcoming_occurrences:
+        schedule = occurrence.schedule
+        
         # Send to students in the programs
         for program_schedule in schedule.scheduleprogram_set.all():
             students = program_schedule.program.students.filter(is_active=True)
@@ -106,7 +227,7 @@ def send_schedule_reminders():
                         recipient=student.user,
                         notification_type='SCHEDULE_REMINDER',
                         title=f"Rappel: {schedule.subject.name}",
-                        message=f"Cours dans 1 heure - {schedule.room.name}",
+                        message=f"Cours dans 1 heure - {occurrence.room.name}",
                         schedule=schedule
                     )
                     reminders_sent += 1
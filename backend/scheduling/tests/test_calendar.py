@@ -0,0 +1,131 @@
+"""
+Tests for the iCalendar subscription feeds.
+"""
+from datetime import timedelta
+
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from scheduling.models import MakeupSession
+from core.tests.base import TimetableTestCase
+
+
+class CalendarFeedTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.program = self.make_program()
+        self.schedule = self.make_schedule(programs=[self.program])
+        self.student = self.make_student(self.program)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+
+    def subscribe(self, **params):
+        response = self.client.get(reverse('scheduling:calendar-subscription'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['url']
+
+    def fetch(self, url):
+        return self.client.get(url.replace('http://testserver', ''))
+
+    def test_personal_feed_lists_the_program_classes(self):
+        response = self.fetch(self.subscribe())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertIn('BEGIN:VEVENT', response.content.decode())
+        self.assertIn('RRULE:FREQ=WEEKLY', response.content.decode())
+
+    def test_reset_revokes_previous_urls(self):
+        url = self.subscribe()
+
+        response = self.client.post(reverse('scheduling:calendar-subscription-reset'))
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.fetch(url).status_code, 404)
+        self.assertEqual(self.fetch(response.data['url']).status_code, 200)
+
+    def test_staff_feed_is_revoked_with_its_user(self):
+        staff = self.make_user(role='ADMIN')
+        self.client.force_authenticate(staff)
+        url = self.subscribe(room_id=self.schedule.room_id)
+        self.assertEqual(self.fetch(url).status_code, 200)
+
+        staff.is_active = False
+        staff.save()
+        self.assertEqual(self.fetch(url).status_code, 404)
+
+    def test_tampered_token_is_not_found(self):
+        url = self.subscribe()
+
+        self.assertEqual(self.fetch(url.replace('.ics', 'x.ics')).status_code, 404)
+
+
+class CalendarFeedContentTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.program = self.make_program()
+        self.schedule = self.make_schedule(programs=[self.program], time_slot=self.make_time_slot(0, (8, 0), (10, 0)))
+        self.client = APIClient()
+        self.client.force_authenticate(self.make_student(self.program).user)
+        url = self.client.get(reverse('scheduling:calendar-subscription')).data['url']
+        self.url = url.replace('http://testserver', '')
+
+    def feed(self, **headers):
+        response = self.client.get(self.url, **headers)
+        self.assertEqual(response.status_code, 200)
+        return response, response.content.decode().split('\r\n')
+
+    def cancel(self, weeks):
+        occurrence = self.schedule.occurrences.get(date=self.MONDAY + timedelta(weeks=weeks))
+        occurrence.status = 'CANCELLED'
+        with self.captureOnCommitCallbacks(execute=True):
+            occurrence.save()
+
+    def test_schedule_is_one_weekly_event(self):
+        _, lines = self.feed()
+
+        self.assertEqual(lines.count('BEGIN:VEVENT'), 1)
+        self.assertIn('DTSTART;TZID=Europe/Paris:20300902T080000', lines)
+        self.assertIn('DTEND;TZID=Europe/Paris:20300902T100000', lines)
+        # Last Monday of the four weeks, 8:00 in Paris summer time
+        self.assertIn('RRULE:FREQ=WEEKLY;UNTIL=20300923T060000Z', lines)
+        self.assertIn(f'SUMMARY:{self.schedule.subject.name}', lines)
+
+    def test_cancelled_session_is_an_exdate(self):
+        self.cancel(weeks=1)
+        self.cancel(weeks=2)
+
+        _, lines = self.feed()
+        self.assertIn('EXDATE;TZID=Europe/Paris:20300909T080000,20300916T080000', lines)
+
+    def test_approved_makeup_is_a_one_off_event(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            makeup = MakeupSession.objects.create(
+                original_schedule=self.schedule,
+                proposed_date=self.MONDAY + timedelta(days=3),
+                proposed_time_slot=self.make_time_slot(3, (14, 0), (16, 0)),
+                proposed_room=self.make_room(),
+                reason="Grève",
+                status='APPROVED'
+            )
+
+        _, lines = self.feed()
+        self.assertEqual(lines.count('BEGIN:VEVENT'), 2)
+        event = lines[lines.index(f'UID:makeup-{makeup.pk}@gestion-edt') - 1:]
+        event = event[:event.index('END:VEVENT')]
+        self.assertIn('DTSTART;TZID=Europe/Paris:20300905T140000', event)
+        self.assertIn(f'LOCATION:{makeup.proposed_room.name}', event)
+        self.assertFalse(any(line.startswith('RRULE') for line in event))
+
+    def test_cancelling_a_session_changes_the_etag(self):
+        response, _ = self.feed()
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.cancel(weeks=1)
+
+        response, lines = self.feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('EXDATE;TZID=Europe/Paris:20300909T080000', lines)
@@ -0,0 +1,48 @@
+"""
+Tests for the room capacity conflict detection.
+"""
+from scheduling.conflicts import sweep_capacity_conflicts
+from scheduling.models import ScheduleConflict
+from core.tests.base import TimetableTestCase
+
+
+class CapacityConflictTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.room = self.make_room(capacity=2)
+        self.program = self.make_program()
+        self.students = [self.make_student(self.program) for position in range(3)]
+        self.make_student(self.program, is_active=False)
+        self.schedule = self.make_schedule(programs=[self.program], room=self.room)
+
+    def capacity_conflicts(self, **filters):
+        return ScheduleConflict.objects.filter(conflict_type='CAPACITY_EXCEEDED', **filters)
+
+    def test_sweep_counts_active_students(self):
+        self.assertEqual(sweep_capacity_conflicts(self.MONDAY), 1)
+
+        conflict = self.capacity_conflicts().get()
+        self.assertEqual(conflict.schedule1_id, self.schedule.pk)
+        self.assertIsNone(conflict.schedule2_id)
+        self.assertEqual(
+            conflict.description,
+            f"Salle {self.room.name} (2 places) insuffisante pour 3 étudiants inscrits"
+        )
+
+    def test_schedule_with_two_programs_fitting_the_room(self):
+        other = self.make_program()
+        self.make_schedule(programs=[self.program, other], room=self.make_room(capacity=3),
+                           time_slot=self.make_time_slot(1))
+
+        # Only the 2-seat room is over capacity
+        self.assertEqual(sweep_capacity_conflicts(self.MONDAY), 1)
+
+    def test_sweep_resolves_once_enrollment_fits(self):
+        sweep_capacity_conflicts(self.MONDAY)
+
+        self.students[0].is_active = False
+        self.students[0].save()
+        self.assertEqual(sweep_capacity_conflicts(self.MONDAY), 0)
+
+        self.assertTrue(self.capacity_conflicts().get().is_resolved)
@@ -0,0 +1,66 @@
+"""
+Tests for the compact schedule payloads.
+"""
+import json
+from datetime import timedelta
+
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from scheduling.compact import SCHEDULE_COLUMNS, OCCURRENCE_COLUMNS
+from core.tests.base import TimetableTestCase
+
+
+class CompactFormatTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.program = self.make_program()
+        self.schedule = self.make_schedule(programs=[self.program], time_slot=self.make_time_slot(0, (8, 0), (10, 0)))
+        self.other = self.make_schedule(
+            programs=[self.program], subject=self.schedule.subject,
+            time_slot=self.make_time_slot(2, (8, 0), (10, 0))
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.make_user(role='ADMIN'))
+
+    def test_weekly_schedule_lists_entities_once(self):
+        response = self.client.get(reverse('scheduling:weekly-schedule'), {
+            'week_start': self.MONDAY.isoformat(), 'format': 'compact'
+        })
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+
+        self.assertEqual(data['columns'], SCHEDULE_COLUMNS)
+        row = dict(zip(data['columns'], data['schedule']['0']['schedules'][0]))
+        self.assertEqual(row['id'], self.schedule.pk)
+        self.assertEqual(row['programs'], [self.program.pk])
+        self.assertEqual(data['subjects'], {str(self.schedule.subject_id): self.schedule.subject.name})
+        self.assertEqual(data['programs'], {str(self.program.pk): self.program.name})
+        self.assertEqual(data['rooms'][str(row['room'])], self.schedule.room.name)
+
+    def test_regular_format_is_unchanged(self):
+        response = self.client.get(reverse('scheduling:weekly-schedule'), {'week_start': self.MONDAY.isoformat()})
+
+        self.assertNotIn('columns', response.data)
+        self.assertEqual(response.data['schedule'][0]['schedules'][0]['subject_name'], self.schedule.subject.name)
+
+    def test_schedule_range_streams_rows_then_tables(self):
+        response = self.client.get(reverse('scheduling:schedule-range'), {
+            'start_date': self.MONDAY.isoformat(),
+            'end_date': (self.MONDAY + timedelta(days=6)).isoformat(),
+            'program_id': self.program.pk,
+            'format': 'compact'
+        })
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(b''.join(response.streaming_content))
+
+        self.assertEqual(data['columns'], OCCURRENCE_COLUMNS)
+        rows = [dict(zip(data['columns'], values)) for values in data['occurrences']]
+        self.assertEqual(
+            [(row['schedule'], row['date']) for row in rows],
+            [(self.schedule.pk, self.MONDAY.isoformat()), (self.other.pk, (self.MONDAY + timedelta(days=2)).isoformat())]
+        )
+        self.assertEqual(data['subjects'], {str(self.schedule.subject_id): self.schedule.subject.name})
+        self.assertEqual(data['teachers'][str(rows[0]['teacher'])], self.schedule.teacher.user.get_full_name())
+        self.assertEqual(data['time_slots'][str(rows[0]['time_slot'])], str(self.schedule.time_slot))
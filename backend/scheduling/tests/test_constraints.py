@@ -0,0 +1,72 @@
+"""
+Tests for the room/teacher exclusion constraints on schedules.
+"""
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.backends.postgresql.psycopg_any import DateRange, NumericRange
+
+from scheduling.models import Schedule
+from core.tests.base import TimetableTestCase
+
+
+class ExclusionConstraintTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.room = self.make_room()
+        self.schedule = self.make_schedule(room=self.room, time_slot=self.make_time_slot(0, (8, 0), (10, 0)))
+
+    def test_double_booking_rejected_on_save(self):
+        with self.assertRaisesMessage(ValidationError, "Conflit de salle"):
+            self.make_schedule(room=self.room, time_slot=self.make_time_slot(0, (9, 0), (11, 0)))
+
+    def test_adjacent_slots_accepted(self):
+        self.make_schedule(room=self.room, time_slot=self.make_time_slot(0, (10, 0), (12, 0)))
+
+        self.assertEqual(Schedule.objects.filter(room=self.room).count(), 2)
+
+    def test_moving_slot_onto_busy_time_raises_validation_error(self):
+        other = self.make_schedule(room=self.room, time_slot=self.make_time_slot(0, (10, 0), (12, 0)))
+        time_slot = other.time_slot
+
+        time_slot.start_time = time_slot.start_time.replace(hour=9)
+        with self.assertRaisesMessage(ValidationError, "Impossible de modifier ce créneau. Conflit de salle"):
+            time_slot.save()
+
+        # Neither the slot nor the schedule ranges were changed
+        time_slot.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(time_slot.start_time.hour, 10)
+        self.assertEqual(other.weekly_time_range, NumericRange(600, 720))
+
+    def test_moving_slot_updates_schedule_ranges(self):
+        time_slot = self.schedule.time_slot
+        time_slot.day_of_week = 2
+        time_slot.save()
+
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.weekly_time_range, NumericRange(2 * 1440 + 480, 2 * 1440 + 600))
+        self.assertEqual(
+            self.schedule.date_range,
+            DateRange(self.MONDAY + timedelta(days=2), self.MONDAY + timedelta(days=24), '[)')
+        )
+
+    def test_bulk_created_rows_get_ranges_and_are_checked(self):
+        fields = {
+            'subject': self.schedule.subject,
+            'room': self.room,
+            'time_slot': self.make_time_slot(0, (10, 0), (12, 0)),
+            'start_date': self.MONDAY,
+            'end_date': self.MONDAY + timedelta(days=6),
+        }
+        created, = Schedule.objects.bulk_create([Schedule(teacher=self.make_teacher(), **fields)])
+
+        created.refresh_from_db()
+        self.assertEqual(created.weekly_time_range, NumericRange(600, 720))
+        self.assertEqual(created.date_range, DateRange(self.MONDAY, self.MONDAY + timedelta(days=1), '[)'))
+
+        fields['time_slot'] = self.make_time_slot(0, (9, 0), (11, 0))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Schedule.objects.bulk_create([Schedule(teacher=self.make_teacher(), **fields)])
@@ -0,0 +1,76 @@
+"""
+Tests for the cached weekly room occupancy.
+"""
+from datetime import time, timedelta
+
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from scheduling.models import MakeupSession
+from scheduling.occupancy import RoomOccupancy
+from core.tests.base import TimetableTestCase
+
+
+class RoomOccupancyTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.room = self.make_room()
+        # Ends off a quarter hour
+        self.make_schedule(room=self.room, time_slot=self.make_time_slot(0, (8, 0), (9, 50)))
+
+    def occupancy(self):
+        return RoomOccupancy.build(self.MONDAY, self.MONDAY + timedelta(days=6))
+
+    def test_adjacent_off_quarter_slot_is_free(self):
+        self.assertTrue(self.occupancy().is_free(self.room.pk, self.MONDAY, time(9, 50), time(11, 20)))
+
+    def test_overlap_within_a_tick_is_busy(self):
+        self.assertFalse(self.occupancy().is_free(self.room.pk, self.MONDAY, time(9, 40), time(11, 20)))
+
+    def test_exact_spans_survive_the_cache(self):
+        self.occupancy()
+
+        occupancy = self.occupancy()
+        self.assertTrue(occupancy.is_free(self.room.pk, self.MONDAY, time(9, 50), time(11, 20)))
+        self.assertFalse(occupancy.is_free(self.room.pk, self.MONDAY, time(8, 30), time(9, 0)))
+
+    def test_busy_dates_compare_exact_minutes(self):
+        busy = RoomOccupancy.build(self.MONDAY, self.MONDAY + timedelta(days=13)).busy_dates(
+            [self.room.pk], 0, time(9, 50), time(11, 20), self.MONDAY, self.MONDAY + timedelta(days=13)
+        )
+
+        self.assertEqual(busy, {self.room.pk: []})
+
+
+class ApproveMakeupSessionTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.room = self.make_room()
+        self.make_schedule(room=self.room, time_slot=self.make_time_slot(0, (8, 0), (9, 50)))
+        self.client = APIClient()
+        self.client.force_authenticate(self.make_user(role='ADMIN'))
+
+    def approve(self, start, end):
+        makeup = MakeupSession.objects.create(
+            original_schedule=self.make_schedule(time_slot=self.make_time_slot(1)),
+            proposed_date=self.MONDAY + timedelta(weeks=1),
+            proposed_time_slot=self.make_time_slot(0, start, end),
+            proposed_room=self.room,
+            reason="Grève"
+        )
+        url = reverse('scheduling:approve-makeup', args=[makeup.pk])
+        return self.client.post(url, {'action': 'approve'}, format='json')
+
+    def test_adjacent_off_quarter_makeup_is_approved(self):
+        response = self.approve((9, 50), (11, 20))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['makeup_session']['status'], 'APPROVED')
+
+    def test_overlapping_makeup_is_refused(self):
+        response = self.approve((9, 30), (11, 0))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(self.room.name, response.data['error'])
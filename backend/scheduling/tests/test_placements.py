@@ -0,0 +1,67 @@
+"""
+Tests for the batched placement checks.
+"""
+from datetime import timedelta
+
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.tests.base import TimetableTestCase
+
+
+class CheckConflictsBatchTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.program = self.make_program()
+        self.schedule = self.make_schedule(programs=[self.program], time_slot=self.make_time_slot(0, (8, 0), (10, 0)))
+        self.client = APIClient()
+        self.client.force_authenticate(self.make_user(role='ADMIN'))
+        self.url = reverse('scheduling:check-conflicts-batch')
+
+    def candidate(self, time_slot, **fields):
+        return {
+            'room': self.make_room().pk,
+            'teacher': self.make_teacher().pk,
+            'time_slot': time_slot.pk,
+            'start_date': self.MONDAY.isoformat(),
+            'end_date': (self.MONDAY + timedelta(days=6)).isoformat(),
+            **fields
+        }
+
+    def test_reports_conflicts_per_candidate(self):
+        overlapping = self.make_time_slot(0, (9, 0), (10, 0))
+        response = self.client.post(self.url, {'candidates': [
+            self.candidate(overlapping, room=self.schedule.room_id),
+            self.candidate(overlapping, programs=[self.program.pk]),
+            self.candidate(self.make_time_slot(0, (10, 0), (12, 0)), room=self.schedule.room_id),
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([result['has_conflicts'] for result in results], [True, True, False])
+        self.assertEqual(results[0]['conflicts'][0]['type'], 'ROOM_CONFLICT')
+        self.assertEqual(results[1]['conflicts'][0]['type'], 'PROGRAM_CONFLICT')
+
+    def test_candidates_are_checked_against_each_other(self):
+        room = self.make_room().pk
+        time_slot = self.make_time_slot(2, (8, 0), (10, 0))
+        response = self.client.post(self.url, {'candidates': [
+            self.candidate(time_slot, room=room),
+            self.candidate(time_slot, room=room),
+        ]}, format='json')
+
+        self.assertEqual([result['has_conflicts'] for result in response.data['results']], [True, True])
+
+    def test_moved_schedule_ignores_its_own_placement(self):
+        response = self.client.post(self.url, {'candidates': [
+            self.candidate(self.schedule.time_slot, id=self.schedule.pk, room=self.schedule.room_id),
+        ]}, format='json')
+
+        self.assertFalse(response.data['has_conflicts'])
+
+    def test_list_body_is_rejected(self):
+        response = self.client.post(self.url, [self.candidate(self.schedule.time_slot)], format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.data)
@@ -0,0 +1,62 @@
+"""
+Tests for the student-group conflict detection.
+"""
+from unittest import mock
+
+from scheduling.conflicts import sweep_program_conflicts
+from scheduling.models import ScheduleConflict, ScheduleProgram
+from scheduling.tasks import recompute_schedule_conflicts
+from core.tests.base import TimetableTestCase
+
+
+class ProgramConflictTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.program = self.make_program()
+        self.first = self.make_schedule(
+            programs=[self.program], time_slot=self.make_time_slot(0, (8, 0), (10, 0))
+        )
+        self.second = self.make_schedule(time_slot=self.make_time_slot(0, (9, 0), (11, 0)))
+
+    def group_conflicts(self, **filters):
+        return ScheduleConflict.objects.filter(conflict_type='STUDENT_GROUP_CONFLICT', **filters)
+
+    def attach(self, schedule):
+        with mock.patch.object(recompute_schedule_conflicts, 'apply_async') as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            link = ScheduleProgram.objects.create(schedule=schedule, program=self.program)
+        return link, apply_async
+
+    def test_attaching_program_queues_a_recompute(self):
+        link, apply_async = self.attach(self.second)
+
+        # Nothing is detected while saving, the queued run records it
+        self.assertFalse(self.group_conflicts().exists())
+        apply_async.assert_called_once()
+
+        recompute_schedule_conflicts()
+        conflict = self.group_conflicts(is_resolved=False).get()
+        self.assertEqual(
+            (conflict.schedule1_id, conflict.schedule2_id),
+            ScheduleConflict.pair_key(self.first.pk, self.second.pk)
+        )
+        self.assertEqual(conflict.description, f"Filière {self.program.name} programmée sur deux cours simultanés")
+
+    def test_detaching_program_resolves_the_conflict(self):
+        link, apply_async = self.attach(self.second)
+        recompute_schedule_conflicts()
+
+        with mock.patch.object(recompute_schedule_conflicts, 'apply_async'), \
+                self.captureOnCommitCallbacks(execute=True):
+            link.delete()
+        recompute_schedule_conflicts()
+
+        self.assertTrue(self.group_conflicts().get().is_resolved)
+
+    def test_sweep_ignores_adjacent_placements(self):
+        self.make_schedule(programs=[self.program], time_slot=self.make_time_slot(0, (10, 0), (12, 0)))
+
+        self.assertEqual(sweep_program_conflicts(self.MONDAY), 0)
+        self.attach(self.second)
+        self.assertEqual(sweep_program_conflicts(self.MONDAY), 2)
@@ -0,0 +1,95 @@
+"""
+Tests for the queued conflict recomputation.
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+
+from scheduling.models import ScheduleConflict, TeacherUnavailability
+from scheduling.tasks import (
+    RECOMPUTE_BATCH_KEY, RECOMPUTE_DONE_KEY, RECOMPUTE_LOCK_KEY, RECOMPUTE_SEQUENCE_KEY,
+    queue_conflict_recompute, recompute_schedule_conflicts
+)
+from core.tests.base import TimetableTestCase
+
+
+class RecomputeQueueTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(recompute_schedule_conflicts, 'apply_async')
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.schedule = self.make_schedule()
+        self.recompute = mock.patch('scheduling.tasks.recompute_conflicts', return_value=(0, 0))
+
+    def queue(self, schedule_ids):
+        with self.captureOnCommitCallbacks(execute=True):
+            queue_conflict_recompute(schedule_ids)
+
+    def reserve_batch(self):
+        """
+        Take a batch number the way an enqueue does, without writing it yet.
+        """
+        cache.add(RECOMPUTE_SEQUENCE_KEY, 0, None)
+        return cache.incr(RECOMPUTE_SEQUENCE_KEY)
+
+    def run_recompute(self):
+        with self.recompute as recompute_conflicts:
+            recompute_schedule_conflicts()
+        return recompute_conflicts.call_args.args[0] if recompute_conflicts.called else None
+
+    def test_queued_ids_are_recomputed_once(self):
+        self.queue([self.schedule.pk])
+
+        self.assertEqual(self.run_recompute(), {self.schedule.pk})
+        self.assertEqual(self.run_recompute(), set())
+        self.assertEqual(cache.get(RECOMPUTE_DONE_KEY), 1)
+
+    def test_batch_written_during_a_run_is_not_lost(self):
+        batch = self.reserve_batch()
+        self.queue([2])
+
+        # Batch 1 is reserved but not written: batch 2 waits behind it
+        self.assertEqual(self.run_recompute(), set())
+        self.assertEqual(cache.get(RECOMPUTE_DONE_KEY), 0)
+
+        cache.set(RECOMPUTE_BATCH_KEY.format(batch), [1])
+        self.assertEqual(self.run_recompute(), {1, 2})
+        self.assertEqual(cache.get(RECOMPUTE_DONE_KEY), 2)
+
+    def test_batch_never_written_is_skipped_on_next_run(self):
+        self.reserve_batch()
+        self.queue([2])
+
+        self.run_recompute()
+        self.assertEqual(self.run_recompute(), {2})
+        self.assertEqual(cache.get(RECOMPUTE_DONE_KEY), 2)
+
+    def test_concurrent_run_is_postponed(self):
+        self.queue([self.schedule.pk])
+        self.apply_async.reset_mock()
+        cache.add(RECOMPUTE_LOCK_KEY, True)
+
+        self.assertIsNone(self.run_recompute())
+        self.apply_async.assert_called_once()
+
+        cache.delete(RECOMPUTE_LOCK_KEY)
+        self.assertEqual(self.run_recompute(), {self.schedule.pk})
+
+    def test_unavailability_conflict_recorded_by_the_queued_run(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            TeacherUnavailability.objects.create(
+                teacher=self.schedule.teacher,
+                start_date=self.MONDAY,
+                end_date=self.MONDAY + timedelta(days=6),
+                unavailability_type='SICK_LEAVE',
+                reason="Grippe"
+            )
+        conflicts = ScheduleConflict.objects.filter(conflict_type='TEACHER_UNAVAILABLE')
+        self.assertFalse(conflicts.exists())
+
+        recompute_schedule_conflicts()
+        self.assertEqual(conflicts.get().schedule1_id, self.schedule.pk)
@@ -0,0 +1,66 @@
+"""
+Tests for the streamed schedule range endpoint.
+"""
+import json
+from datetime import timedelta
+
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.tests.base import TimetableTestCase
+
+
+class ScheduleRangeTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.program = self.make_program()
+        self.schedule = self.make_schedule(programs=[self.program], time_slot=self.make_time_slot(2, (8, 0), (10, 0)))
+        self.make_schedule(time_slot=self.make_time_slot(2, (10, 0), (12, 0)))
+        self.client = APIClient()
+        self.url = reverse('scheduling:schedule-range')
+
+    def get_range(self, user, **params):
+        self.client.force_authenticate(user)
+        return self.client.get(self.url, {
+            'start_date': self.MONDAY.isoformat(),
+            'end_date': (self.MONDAY + timedelta(days=20)).isoformat(),
+            **params
+        })
+
+    def streamed(self, response):
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_streams_the_sessions_of_a_program(self):
+        data = self.streamed(self.get_range(self.make_user(role='ADMIN'), program_id=self.program.pk))
+
+        self.assertEqual(data['scope'], {'type': 'program', 'id': self.program.pk})
+        self.assertEqual(
+            [(session['schedule'], session['date']) for session in data['occurrences']],
+            [(self.schedule.pk, (self.MONDAY + timedelta(days=days)).isoformat()) for days in (2, 9, 16)]
+        )
+        self.assertEqual(data['occurrences'][0]['program_ids'], [self.program.pk])
+
+    def test_student_gets_their_program_by_default(self):
+        student = self.make_student(self.program)
+
+        data = self.streamed(self.get_range(student.user))
+        self.assertEqual(data['scope'], {'type': 'program', 'id': self.program.pk})
+        self.assertEqual(len(data['occurrences']), 3)
+
+        response = self.get_range(student.user, room_id=self.schedule.room_id)
+        self.assertEqual(response.status_code, 403)
+
+    def test_staff_must_name_one_scope(self):
+        response = self.get_range(self.make_user(role='ADMIN'))
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_period_is_limited(self):
+        response = self.get_range(
+            self.make_user(role='ADMIN'), program_id=self.program.pk,
+            end_date=(self.MONDAY + timedelta(days=400)).isoformat()
+        )
+
+        self.assertEqual(response.status_code, 400)
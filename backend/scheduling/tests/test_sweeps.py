@@ -0,0 +1,107 @@
+"""
+Tests for the set-based conflict sweeps.
+"""
+from datetime import timedelta
+
+from scheduling.conflicts import AUTO_RESOLUTION_NOTES, reconcile_conflicts, sweep_double_bookings
+from scheduling.models import MakeupSession, ScheduleConflict
+from scheduling.tasks import detect_schedule_conflicts
+from core.tests.base import TimetableTestCase
+
+
+class DoubleBookingSweepTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.room = self.make_room()
+        self.booked = self.make_schedule(room=self.room, time_slot=self.make_time_slot(0, (8, 0), (10, 0)))
+        self.moved = self.make_schedule(time_slot=self.make_time_slot(1, (8, 0), (10, 0)))
+
+        # The second class is made up on a Monday, in the first one's room
+        self.makeup = MakeupSession.objects.create(
+            original_schedule=self.moved,
+            proposed_date=self.MONDAY + timedelta(weeks=1),
+            proposed_time_slot=self.make_time_slot(0, (9, 0), (11, 0)),
+            proposed_room=self.room,
+            status='APPROVED',
+            reason="Grève"
+        )
+
+    def room_conflicts(self, **filters):
+        return ScheduleConflict.objects.filter(conflict_type='ROOM_DOUBLE_BOOKING', **filters)
+
+    def test_sweep_records_makeup_double_booking(self):
+        found = sweep_double_bookings(self.MONDAY)
+
+        self.assertEqual(found, 1)
+        conflict = self.room_conflicts().get()
+        self.assertEqual(
+            (conflict.schedule1_id, conflict.schedule2_id),
+            ScheduleConflict.pair_key(self.booked.pk, self.moved.pk)
+        )
+        self.assertEqual(conflict.description, f"Salle {self.room.name} déjà occupée de 09:00:00 à 11:00:00")
+
+    def test_repeated_sweeps_keep_one_open_conflict(self):
+        sweep_double_bookings(self.MONDAY)
+        sweep_double_bookings(self.MONDAY)
+
+        self.assertEqual(self.room_conflicts(is_resolved=False).count(), 1)
+
+    def test_sweep_resolves_vanished_conflict(self):
+        sweep_double_bookings(self.MONDAY)
+
+        self.makeup.status = 'REJECTED'
+        self.makeup.save()
+        sweep_double_bookings(self.MONDAY)
+
+        conflict = self.room_conflicts().get()
+        self.assertTrue(conflict.is_resolved)
+        self.assertEqual(conflict.resolution_notes, AUTO_RESOLUTION_NOTES)
+
+    def test_sweep_ignores_makeups_outside_period(self):
+        self.assertEqual(sweep_double_bookings(self.MONDAY + timedelta(weeks=2)), 0)
+
+    def test_periodic_task_runs_the_sweep(self):
+        detect_schedule_conflicts()
+
+        self.assertTrue(self.room_conflicts(is_resolved=False).exists())
+
+
+class ReconcileScopeTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # First two weeks of the term
+        self.schedule = self.make_schedule(end_date=self.MONDAY + timedelta(days=13))
+
+    def open_conflict(self, **fields):
+        return ScheduleConflict.objects.create(**{
+            'schedule1': self.schedule,
+            'conflict_type': 'CAPACITY_EXCEEDED',
+            'description': "Salle trop petite",
+            **fields
+        })
+
+    def test_manual_conflict_is_not_auto_resolved(self):
+        conflict = self.open_conflict()
+
+        reconcile_conflicts('CAPACITY_EXCEEDED', 'MEDIUM', {})
+
+        conflict.refresh_from_db()
+        self.assertFalse(conflict.is_resolved)
+
+    def test_detected_conflict_outside_period_is_kept(self):
+        conflict = self.open_conflict(is_auto_detected=True)
+
+        reconcile_conflicts('CAPACITY_EXCEEDED', 'MEDIUM', {}, period=(self.MONDAY + timedelta(weeks=2), None))
+        conflict.refresh_from_db()
+        self.assertFalse(conflict.is_resolved)
+
+        reconcile_conflicts('CAPACITY_EXCEEDED', 'MEDIUM', {}, period=(self.MONDAY, None))
+        conflict.refresh_from_db()
+        self.assertTrue(conflict.is_resolved)
+
+    def test_detected_conflicts_are_flagged(self):
+        reconcile_conflicts('CAPACITY_EXCEEDED', 'MEDIUM', {(self.schedule.pk, None): "Salle trop petite"})
+
+        self.assertTrue(ScheduleConflict.objects.get().is_auto_detected)
@@ -0,0 +1,90 @@
+"""
+Tests for the weekly timetable views.
+"""
+from datetime import timedelta
+
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from scheduling.snapshots import TimetableSnapshot
+from core.tests.base import TimetableTestCase
+
+
+class WeeklyScheduleTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.program = self.make_program()
+        self.monday = self.make_schedule(programs=[self.program], time_slot=self.make_time_slot(0, (8, 0), (10, 0)))
+        self.wednesday = self.make_schedule(programs=[self.program], time_slot=self.make_time_slot(2, (14, 0), (16, 0)))
+        # Starts on the third week
+        self.make_schedule(
+            programs=[self.program], time_slot=self.make_time_slot(1),
+            start_date=self.MONDAY + timedelta(weeks=2)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.make_user(role='ADMIN'))
+        self.url = reverse('scheduling:weekly-schedule')
+
+    def week(self, **params):
+        response = self.client.get(self.url, {'week_start': self.MONDAY.isoformat(), **params})
+        self.assertEqual(response.status_code, 200)
+        return {
+            day: [schedule['id'] for schedule in data['schedules']]
+            for day, data in response.data['schedule'].items()
+        }
+
+    def test_schedules_bucketed_by_day_within_their_dates(self):
+        week = self.week()
+
+        self.assertEqual(week[0], [self.monday.pk])
+        self.assertEqual(week[1], [])
+        self.assertEqual(week[2], [self.wednesday.pk])
+
+    def test_query_count_does_not_grow_with_the_week(self):
+        with self.assertNumQueries(2):
+            self.week()
+
+        for day in range(3, 5):
+            self.make_schedule(programs=[self.program], time_slot=self.make_time_slot(day))
+        with self.assertNumQueries(2):
+            week = self.week()
+        self.assertEqual(sum(len(ids) for ids in week.values()), 4)
+
+
+class ConditionalScheduleTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.schedule = self.make_schedule()
+        self.client = APIClient()
+        self.client.force_authenticate(self.schedule.teacher.user)
+        self.url = reverse('scheduling:teacher-schedule')
+        self.params = {'start_date': self.MONDAY.isoformat(), 'end_date': (self.MONDAY + timedelta(days=6)).isoformat()}
+
+    def touch_teacher(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            TimetableSnapshot.touch([('teacher', self.schedule.teacher_id)])
+
+    def test_unchanged_schedule_answers_304(self):
+        response = self.client.get(self.url, self.params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['schedules']), 1)
+
+        response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_within_the_same_second_is_served(self):
+        etag = self.client.get(self.url, self.params)['ETag']
+        self.touch_teacher()
+
+        response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since_alone_never_answers_304(self):
+        response = self.client.get(self.url, self.params)
+        self.assertNotIn('Last-Modified', response)
+
+        response = self.client.get(self.url, self.params, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,64 @@
+"""
+Tests for the teacher unavailability conflict detection.
+"""
+from datetime import time, timedelta
+
+from scheduling.conflicts import find_unavailable_teacher_schedules, sweep_unavailable_teachers
+from scheduling.models import ScheduleConflict, TeacherUnavailability
+from core.tests.base import TimetableTestCase
+
+
+class UnavailableTeacherTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Mondays 8-10 over the first four weeks
+        self.schedule = self.make_schedule(time_slot=self.make_time_slot(0, (8, 0), (10, 0)))
+        self.teacher = self.schedule.teacher
+
+    def unavailable(self, start_date, end_date, **fields):
+        return TeacherUnavailability.objects.create(**{
+            'teacher': self.teacher,
+            'start_date': start_date,
+            'end_date': end_date,
+            'unavailability_type': 'CONFERENCE',
+            'reason': "Colloque",
+            **fields
+        })
+
+    def found(self):
+        return [row[0] for row in find_unavailable_teacher_schedules(None, None)]
+
+    def test_all_day_unavailability_on_a_class_day(self):
+        self.unavailable(self.MONDAY + timedelta(weeks=1), self.MONDAY + timedelta(weeks=1, days=2))
+
+        self.assertEqual(self.found(), [self.schedule.pk])
+
+    def test_unavailability_between_class_days_is_ignored(self):
+        self.unavailable(self.MONDAY + timedelta(days=1), self.MONDAY + timedelta(days=5))
+
+        self.assertEqual(self.found(), [])
+
+    def test_partial_unavailability_needs_overlapping_times(self):
+        self.unavailable(self.MONDAY, self.MONDAY, is_all_day=False, start_time=time(10), end_time=time(12))
+        self.assertEqual(self.found(), [])
+
+        self.unavailable(self.MONDAY, self.MONDAY, is_all_day=False, start_time=time(9), end_time=time(11))
+        self.assertEqual(self.found(), [self.schedule.pk])
+
+    def test_sweep_records_and_resolves(self):
+        unavailability = self.unavailable(self.MONDAY, self.MONDAY + timedelta(weeks=4))
+
+        self.assertEqual(sweep_unavailable_teachers(self.MONDAY), 1)
+        conflict = ScheduleConflict.objects.get(conflict_type='TEACHER_UNAVAILABLE', is_resolved=False)
+        self.assertEqual(conflict.schedule1_id, self.schedule.pk)
+        self.assertEqual(
+            conflict.description,
+            f"Enseignant indisponible du {self.MONDAY:%d/%m/%Y} au "
+            f"{self.MONDAY + timedelta(weeks=4):%d/%m/%Y} (Conférence)"
+        )
+
+        unavailability.is_active = False
+        unavailability.save()
+        self.assertEqual(sweep_unavailable_teachers(self.MONDAY), 0)
+        self.assertFalse(ScheduleConflict.objects.filter(is_resolved=False).exists())
@@ -15,7 +15,9 @@ urlpatterns = [
     path('schedules/<int:pk>/', views.ScheduleDetailView.as_view(), name='schedule-detail'),
     path('schedules/<int:schedule_id>/cancel/', views.cancel_schedule, name='cancel-schedule'),
     path('schedules/weekly/', views.weekly_schedule, name='weekly-schedule'),
+    path('schedules/range/', views.schedule_range, name='schedule-range'),
     path('schedules/conflicts/check/', views.check_conflicts, name='check-conflicts'),
+    path('schedules/conflicts/check-batch/', views.check_conflicts_batch, name='check-conflicts-batch'),
     
     # Teacher specific
     path('teacher/schedule/', views.teacher_schedule, name='teacher-schedule'),
@@ -24,6 +26,11 @@ urlpatterns = [
     # Student specific  
     path('student/schedule/', views.student_schedule, name='student-schedule'),
     
+    # Calendar feeds
+    path('calendar/subscribe/', views.calendar_subscription, name='calendar-subscription'),
+    path('calendar/subscribe/reset/', views.reset_calendar_subscription, name='calendar-subscription-reset'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar-feed'),
+    
     # Makeup Sessions
     path('makeup-sessions/', views.MakeupSessionListCreateView.as_view(), name='makeup-list'),
     path('makeup-sessions/<int:makeup_id>/approve/', views.approve_makeup_session, name='approve-makeup'),
@@ -1,22 +1,51 @@
 """
 Views for scheduling management.
 """
+from itertools import islice
 from rest_framework import generics, status, filters
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 from django_filters.rest_framework import DjangoFilterBackend
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_safe
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from datetime import datetime, timedelta
 from core.permissions import IsPedagogicalAdmin, IsDepartmentHead, IsProgramHead, IsTeacher
 
-from .models import TimeSlot, Schedule, TeacherUnavailability, MakeupSession, ScheduleConflict
+from .models import (
+    TimeSlot, Schedule, ScheduleOccurrence, TeacherUnavailability, MakeupSession, ScheduleConflict
+)
 from .serializers import (
-    TimeSlotSerializer, ScheduleSerializer, ScheduleDetailSerializer,
+    TimeSlotSerializer, ScheduleSerializer, ScheduleDetailSerializer, ScheduleOccurrenceSerializer,
     TeacherUnavailabilitySerializer, MakeupSessionSerializer, 
-    ScheduleConflictSerializer, ScheduleCreateSerializer
+    ScheduleConflictSerializer, ScheduleCreateSerializer, ConflictCandidateSerializer
+)
+from .conflicts import check_placements
+from .occupancy import RoomOccupancy
+from .snapshots import TimetableSnapshot, SCOPE_LOOKUPS
+from .ical import feed_token, read_feed_token, cached_feed
+from .compact import (
+    COMPACT_RENDERER_CLASSES, SCHEDULE_COLUMNS, OCCURRENCE_COLUMNS, OCCURRENCE_FIELDS,
+    CompactTables, is_compact
 )
 
 
+# Longest period served by schedule_range, and rows fetched per round trip
+RANGE_MAX_DAYS = 366
+RANGE_CHUNK_SIZE = 500
+
+# ScheduleOccurrence lookup selecting the sessions of each scope
+OCCURRENCE_SCOPE_LOOKUPS = {
+    'program': 'program_ids__contains',
+    'teacher': 'teacher_id',
+    'room': 'room_id',
+}
+
+
 class TimeSlotListCreateView(generics.ListCreateAPIView):
     """
     List all time slots or create a new time slot.
@@ -187,9 +216,13 @@ class ScheduleConflictListView(generics.ListAPIView):
 
 @api_view(['GET'])
 @permission_classes([IsDepartmentHead])
+@renderer_classes(COMPACT_RENDERER_CLASSES)
 def weekly_schedule(request):
     """
     Get weekly schedule for a specific week.
+    
+    With ``?format=compact``, schedules are encoded as rows of
+    ``SCHEDULE_COLUMNS`` referencing entity tables sent once.
     """
     week_start = request.GET.get('week_start')
     program_id = request.GET.get('program_id')
@@ -205,43 +238,61 @@ def weekly_schedule(request):
     
     week_end = week_start + timedelta(days=6)
     
-    # Base queryset
-    queryset = Schedule.objects.filter(
-        is_active=True,
-        is_cancelled=False,
-        start_date__lte=week_end,
-        end_date__gte=week_start
-    )
+    scopes = [
+        (scope, int(object_id))
+        for scope, object_id in (('program', program_id), ('teacher', teacher_id), ('room', room_id))
+        if object_id
+    ]
     
-    # Apply filters
-    if program_id:
-        queryset = queryset.filter(programs=program_id)
-    if teacher_id:
-        queryset = queryset.filter(teacher_id=teacher_id)
-    if room_id:
-        queryset = queryset.filter(room_id=room_id)
+    if len(scopes) == 1 and week_start.weekday() == 0:
+        # A single program, teacher or room: use its cached week
+        rows = [
+            (day, data) for day, data in TimetableSnapshot.get(*scopes[0], week_start)
+            if not data['is_cancelled']
+        ]
+    else:
+        queryset = Schedule.objects.filter(
+            is_active=True,
+            is_cancelled=False,
+            start_date__lte=week_end,
+            end_date__gte=week_start
+        )
+        for scope, object_id in scopes:
+            queryset = queryset.filter(**{SCOPE_LOOKUPS[scope]: object_id})
+        
+        # Fetch the whole week at once
+        queryset = ScheduleSerializer.setup_eager_loading(queryset).order_by('time_slot__start_time')
+        rows = [
+            (schedule.time_slot.day_of_week, data)
+            for schedule, data in zip(queryset, ScheduleSerializer(queryset, many=True).data)
+        ]
     
     # Organize by day and time
     weekly_data = {}
     for day in range(7):  # Monday to Sunday
         day_date = week_start + timedelta(days=day)
-        day_schedules = queryset.filter(
-            time_slot__day_of_week=day,
-            start_date__lte=day_date,
-            end_date__gte=day_date
-        ).order_by('time_slot__start_time')
-        
         weekly_data[day] = {
             'date': day_date.isoformat(),
             'day_name': day_date.strftime('%A'),
-            'schedules': ScheduleSerializer(day_schedules, many=True).data
+            'schedules': []
         }
     
-    return Response({
+    tables = CompactTables() if is_compact(request) else None
+    for day, data in rows:
+        day_date = weekly_data[day]['date']
+        if data['start_date'] <= day_date <= data['end_date']:
+            weekly_data[day]['schedules'].append(tables.schedule_row(data) if tables else data)
+    
+    payload = {
         'week_start': week_start.isoformat(),
         'week_end': week_end.isoformat(),
         'schedule': weekly_data
-    })
+    }
+    if tables:
+        payload['columns'] = SCHEDULE_COLUMNS
+        payload.update(tables.tables)
+    
+    return Response(payload)
 
 
 @api_view(['POST'])
@@ -252,20 +303,40 @@ def check_conflicts(request):
     """
     schedule_data = request.data
     
+    try:
+        time_slot = TimeSlot.objects.get(id=schedule_data.get('time_slot'))
+    except (TimeSlot.DoesNotExist, ValueError, TypeError):
+        return Response(
+            {'error': 'Créneau horaire non trouvé'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
     conflicts = []
     
-    # Check room conflicts
-    room_conflicts = Schedule.objects.filter(
-        room_id=schedule_data.get('room'),
-        time_slot_id=schedule_data.get('time_slot'),
-        start_date__lte=schedule_data.get('end_date'),
-        end_date__gte=schedule_data.get('start_date'),
+    try:
+        start_date = datetime.strptime(schedule_data.get('start_date'), '%Y-%m-%d').date()
+        end_date = datetime.strptime(schedule_data.get('end_date'), '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        return Response(
+            {'error': 'Dates invalides. Format attendu: AAAA-MM-JJ'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Any schedule sharing an occurrence of an overlapping time slot
+    overlapping = Schedule.objects.filter(
+        weekly_time_range__overlap=time_slot.weekly_range(),
+        date_range__overlap=time_slot.occurrence_range(start_date, end_date),
         is_active=True,
         is_cancelled=False
-    )
+    ).select_related(
+        'subject', 'teacher__user', 'room', 'time_slot'
+    ).prefetch_related('scheduleprogram_set__program')
     
     if schedule_data.get('id'):
-        room_conflicts = room_conflicts.exclude(id=schedule_data['id'])
+        overlapping = overlapping.exclude(id=schedule_data['id'])
+    
+    # Check room conflicts
+    room_conflicts = overlapping.filter(room_id=schedule_data.get('room'))
     
     if room_conflicts.exists():
         conflicts.append({
@@ -275,17 +346,7 @@ def check_conflicts(request):
         })
     
     # Check teacher conflicts
-    teacher_conflicts = Schedule.objects.filter(
-        teacher_id=schedule_data.get('teacher'),
-        time_slot_id=schedule_data.get('time_slot'),
-        start_date__lte=schedule_data.get('end_date'),
-        end_date__gte=schedule_data.get('start_date'),
-        is_active=True,
-        is_cancelled=False
-    )
-    
-    if schedule_data.get('id'):
-        teacher_conflicts = teacher_conflicts.exclude(id=schedule_data['id'])
+    teacher_conflicts = overlapping.filter(teacher_id=schedule_data.get('teacher'))
     
     if teacher_conflicts.exists():
         conflicts.append({
@@ -300,6 +361,33 @@ def check_conflicts(request):
     })
 
 
+@api_view(['POST'])
+@permission_classes([IsDepartmentHead])
+def check_conflicts_batch(request):
+    """
+    Check a batch of candidate placements for overlap-based conflicts.
+    
+    Expects ``{"candidates": [{room, teacher, programs, time_slot,
+    start_date, end_date, id?}, ...]}`` and answers every candidate from a
+    fixed number of queries, including conflicts between candidates.
+    """
+    if not isinstance(request.data, dict):
+        return Response(
+            {'error': 'Corps de requête invalide. Attendu: {"candidates": [...]}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    serializer = ConflictCandidateSerializer(data=request.data.get('candidates', []), many=True)
+    serializer.is_valid(raise_exception=True)
+    
+    results = check_placements(serializer.validated_data)
+    
+    return Response({
+        'has_conflicts': any(result['has_conflicts'] for result in results),
+        'results': results
+    })
+
+
 @api_view(['POST'])
 @permission_classes([IsDepartmentHead])
 def approve_makeup_session(request, makeup_id):
@@ -307,10 +395,24 @@ def approve_makeup_session(request, makeup_id):
     Approve or reject a makeup session.
     """
     try:
-        makeup = MakeupSession.objects.get(id=makeup_id, is_active=True)
+        makeup = MakeupSession.objects.select_related(
+            'proposed_room', 'proposed_time_slot'
+        ).get(id=makeup_id, is_active=True)
         action = request.data.get('action')  # 'approve' or 'reject'
         
         if action == 'approve':
+            # The proposed room must still be free at that time
+            time_slot = makeup.proposed_time_slot
+            occupancy = RoomOccupancy.build(makeup.proposed_date, makeup.proposed_date)
+            if makeup.status != 'APPROVED' and not occupancy.is_free(
+                makeup.proposed_room_id, makeup.proposed_date, time_slot.start_time, time_slot.end_time
+            ):
+                return Response(
+                    {'error': f'Salle {makeup.proposed_room.name} déjà occupée le '
+                              f'{makeup.proposed_date.strftime("%d/%m/%Y")} sur ce créneau'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
             makeup.status = 'APPROVED'
             makeup.approved_by = request.user
             makeup.approval_date = timezone.now()
@@ -338,6 +440,28 @@ def approve_makeup_session(request, makeup_id):
         )
 
 
+def _schedule_etag(scope, object_id, start_date, end_date):
+    """
+    ETag of a personal schedule over a period, derived from the version
+    stamp of its scope without querying it.
+    """
+    version = TimetableSnapshot.version(scope, object_id)
+    return quote_etag(f'{scope}-{object_id}-{start_date:%Y%m%d}-{end_date:%Y%m%d}-{version}')
+
+
+def _set_validators(response, etag):
+    """
+    Attach the ETag so that clients revalidate on every poll.
+    
+    No Last-Modified is sent: it only has a one-second resolution, so a
+    change made within the second of the previous one would be answered
+    with 304 to clients sending If-Modified-Since.
+    """
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([IsTeacher])
 def teacher_schedule(request):
@@ -360,12 +484,23 @@ def teacher_schedule(request):
             start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
         
-        schedules = Schedule.objects.filter(
-            teacher=teacher,
-            start_date__lte=end_date,
-            end_date__gte=start_date,
-            is_active=True
-        ).order_by('time_slot__day_of_week', 'time_slot__start_time')
+        # Answer unchanged schedules before loading anything
+        etag = _schedule_etag('teacher', teacher.pk, start_date, end_date)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return _set_validators(not_modified, etag)
+        
+        rows = TimetableSnapshot.for_period('teacher', teacher.pk, start_date, end_date)
+        if rows is not None:
+            schedules_data = [data for day, data in rows]
+        else:
+            schedules = Schedule.objects.filter(
+                teacher=teacher,
+                start_date__lte=end_date,
+                end_date__gte=start_date,
+                is_active=True
+            ).order_by('time_slot__day_of_week', 'time_slot__start_time')
+            schedules_data = ScheduleSerializer(ScheduleSerializer.setup_eager_loading(schedules), many=True).data
         
         # Get unavailabilities
         unavailabilities = TeacherUnavailability.objects.filter(
@@ -375,14 +510,14 @@ def teacher_schedule(request):
             is_active=True
         )
         
-        return Response({
-            'schedules': ScheduleSerializer(schedules, many=True).data,
+        return _set_validators(Response({
+            'schedules': schedules_data,
             'unavailabilities': TeacherUnavailabilitySerializer(unavailabilities, many=True).data,
             'period': {
                 'start_date': start_date.isoformat(),
                 'end_date': end_date.isoformat()
             }
-        })
+        }), etag)
     
     except:
         return Response(
@@ -412,16 +547,27 @@ def student_schedule(request):
             start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
         
-        schedules = Schedule.objects.filter(
-            programs=student.program,
-            start_date__lte=end_date,
-            end_date__gte=start_date,
-            is_active=True,
-            is_cancelled=False
-        ).order_by('time_slot__day_of_week', 'time_slot__start_time')
+        # Answer unchanged schedules before loading anything
+        etag = _schedule_etag('program', student.program_id, start_date, end_date)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return _set_validators(not_modified, etag)
         
-        return Response({
-            'schedules': ScheduleSerializer(schedules, many=True).data,
+        rows = TimetableSnapshot.for_period('program', student.program_id, start_date, end_date)
+        if rows is not None:
+            schedules_data = [data for day, data in rows if not data['is_cancelled']]
+        else:
+            schedules = Schedule.objects.filter(
+                programs=student.program,
+                start_date__lte=end_date,
+                end_date__gte=start_date,
+                is_active=True,
+                is_cancelled=False
+            ).order_by('time_slot__day_of_week', 'time_slot__start_time')
+            schedules_data = ScheduleSerializer(ScheduleSerializer.setup_eager_loading(schedules), many=True).data
+        
+        return _set_validators(Response({
+            'schedules': schedules_data,
             'program': {
                 'id': student.program.id,
                 'name': student.program.name,
@@ -431,7 +577,7 @@ def student_schedule(request):
                 'start_date': start_date.isoformat(),
                 'end_date': end_date.isoformat()
             }
-        })
+        }), etag)
     
     except:
         return Response(
@@ -440,6 +586,217 @@ def student_schedule(request):
         )
 
 
+def _own_scope(user):
+    """
+    ``(scope, object_id)`` of a student's or teacher's own schedule, or None.
+    """
+    if user.role == 'STUDENT' and hasattr(user, 'student_profile'):
+        program_id = user.student_profile.program_id
+        return ('program', program_id) if program_id else None
+    if user.role == 'TEACHER' and hasattr(user, 'teacher_profile'):
+        return ('teacher', user.teacher_profile.pk)
+    return None
+
+
+def _resolve_scope(user, scopes):
+    """
+    Check the requested ``(scope, object_id)`` pairs against the user's
+    role and return ``(scope, error_response)``.
+    
+    Students and teachers get their own schedule by default and cannot
+    request another one; staff must name exactly one scope.
+    """
+    if user.role in ['STUDENT', 'TEACHER']:
+        own_scope = _own_scope(user)
+        if own_scope is None or scopes not in ([], [own_scope]):
+            return (None, None), Response(
+                {'error': 'Vous ne pouvez consulter que votre propre emploi du temps'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return own_scope, None
+    
+    if len(scopes) != 1:
+        return (None, None), Response(
+            {'error': 'Indiquez un seul paramètre parmi program_id, teacher_id et room_id'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return scopes[0], None
+
+
+@api_view(['GET'])
+@renderer_classes(COMPACT_RENDERER_CLASSES)
+def schedule_range(request):
+    """
+    Stream every session of a program, teacher or room between two dates.
+    
+    Students and teachers get their own schedule by default and cannot
+    request another one; staff must pass one of ``program_id``,
+    ``teacher_id`` or ``room_id``. Sessions are read through a server-side
+    cursor and written out as they are serialized, so memory use does not
+    grow with the period.
+    
+    With ``?format=compact``, sessions are read as plain values and encoded
+    as rows of ``OCCURRENCE_COLUMNS``; the entity tables they reference
+    follow them.
+    """
+    try:
+        start_date = datetime.strptime(request.GET.get('start_date', ''), '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.GET.get('end_date', ''), '%Y-%m-%d').date()
+        scopes = [
+            (scope, int(request.GET[f'{scope}_id']))
+            for scope in OCCURRENCE_SCOPE_LOOKUPS if request.GET.get(f'{scope}_id')
+        ]
+    except ValueError:
+        return Response(
+            {'error': 'Paramètres invalides. Requis: start_date et end_date (AAAA-MM-JJ), '
+                      'program_id, teacher_id ou room_id entiers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if end_date < start_date:
+        return Response(
+            {'error': 'La date de fin doit être postérieure à la date de début.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if (end_date - start_date).days >= RANGE_MAX_DAYS:
+        return Response(
+            {'error': f'La période ne peut pas dépasser {RANGE_MAX_DAYS} jours'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    (scope, object_id), error = _resolve_scope(request.user, scopes)
+    if error is not None:
+        return error
+    
+    queryset = ScheduleOccurrence.objects.filter(
+        date__range=(start_date, end_date),
+        schedule__is_active=True,
+        **{OCCURRENCE_SCOPE_LOOKUPS[scope]: [object_id] if scope == 'program' else object_id}
+    )
+    queryset = ScheduleOccurrenceSerializer.setup_eager_loading(queryset).order_by('date', 'start_datetime')
+    
+    header = {
+        'scope': {'type': scope, 'id': object_id},
+        'period': {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat()
+        }
+    }
+    
+    def stream():
+        encoder = JSONEncoder()
+        yield encoder.encode(header)[:-1] + ', "occurrences": ['
+        
+        rows = queryset.iterator(chunk_size=RANGE_CHUNK_SIZE)
+        separator = ''
+        while True:
+            batch = list(islice(rows, RANGE_CHUNK_SIZE))
+            if not batch:
+                break
+            for data in ScheduleOccurrenceSerializer(batch, many=True).data:
+                yield separator + encoder.encode(data)
+                separator = ','
+        
+        yield ']}'
+    
+    def stream_compact():
+        encoder = JSONEncoder()
+        tables = CompactTables()
+        yield encoder.encode({**header, 'columns': OCCURRENCE_COLUMNS})[:-1] + ', "occurrences": ['
+        
+        separator = ''
+        for values in queryset.values_list(*OCCURRENCE_FIELDS).iterator(chunk_size=RANGE_CHUNK_SIZE):
+            yield separator + encoder.encode(tables.occurrence_row(values))
+            separator = ','
+        
+        yield '], ' + encoder.encode(tables.resolve())[1:]
+    
+    return StreamingHttpResponse(
+        stream_compact() if is_compact(request) else stream(),
+        content_type='application/json'
+    )
+
+
+@api_view(['GET'])
+def calendar_subscription(request):
+    """
+    Get the iCalendar feed URL of a program, teacher or room.
+    
+    Without parameters, students and teachers get a personal feed that
+    follows their current program or their own classes.
+    """
+    try:
+        scopes = [
+            (scope, int(request.GET[f'{scope}_id']))
+            for scope in OCCURRENCE_SCOPE_LOOKUPS if request.GET.get(f'{scope}_id')
+        ]
+    except ValueError:
+        return Response(
+            {'error': 'Paramètres invalides. program_id, teacher_id ou room_id doivent être entiers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if not scopes and _own_scope(request.user) is not None:
+        token = feed_token(request.user, 'user', request.user.pk)
+    else:
+        (scope, object_id), error = _resolve_scope(request.user, scopes)
+        if error is not None:
+            return error
+        token = feed_token(request.user, scope, object_id)
+    
+    return Response({
+        'url': request.build_absolute_uri(reverse('scheduling:calendar-feed', args=[token]))
+    })
+
+
+@api_view(['POST'])
+def reset_calendar_subscription(request):
+    """
+    Revoke every calendar feed URL handed out to the user.
+    
+    Students and teachers get the new URL of their personal feed.
+    """
+    request.user.reset_calendar_feed_key()
+    
+    data = {'message': 'Les anciens liens de calendrier ont été révoqués'}
+    if _own_scope(request.user) is not None:
+        token = feed_token(request.user, 'user', request.user.pk)
+        data['url'] = request.build_absolute_uri(reverse('scheduling:calendar-feed', args=[token]))
+    return Response(data)
+
+
+@require_safe
+def calendar_feed(request, token):
+    """
+    Serve an iCalendar feed on its signed URL, without authentication so
+    that calendar apps can subscribe to it.
+    
+    Feeds are cached per version of their scope and polls of an unchanged
+    feed are answered with 304.
+    """
+    feed = read_feed_token(token)
+    if feed is None:
+        raise Http404("Calendrier non trouvé")
+    
+    scope, object_id, user = feed
+    if scope == 'user':
+        own_scope = _own_scope(user)
+        if own_scope is None:
+            raise Http404("Calendrier non trouvé")
+        scope, object_id = own_scope
+    
+    version = TimetableSnapshot.version(scope, object_id)
+    etag = quote_etag(f'ical-{scope}-{object_id}-{version}')
+    
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return _set_validators(not_modified, etag)
+    
+    response = HttpResponse(cached_feed(scope, object_id, version), content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = f'inline; filename="{scope}-{object_id}.ics"'
+    return _set_validators(response, etag)
+
+
 @api_view(['POST'])
 @permission_classes([IsTeacher])
 def cancel_schedule(request, schedule_id):
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:23
+
+from django.db import migrations, models
+import uuid
+
+
+def generate_feed_keys(apps, schema_editor):
+    # One key per existing user; AddField would give them all the same one
+    User = apps.get_model('users', 'User')
+    for user in User.objects.only('pk'):
+        User.objects.filter(pk=user.pk).update(calendar_feed_key=uuid.uuid4())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_student_program'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='calendar_feed_key',
+            field=models.UUIDField(null=True, editable=False),
+        ),
+        migrations.RunPython(generate_feed_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='calendar_feed_key',
+            field=models.UUIDField(default=uuid.uuid4, editable=False),
+        ),
+    ]
@@ -1,8 +1,13 @@
 """
 User models for authentication and role management.
 """
+import uuid
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import DEFERRED
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from core.models import BaseModel
 
 class User(AbstractUser):
@@ -22,6 +27,8 @@ class User(AbstractUser):
     phone = models.CharField(max_length=20, blank=True)
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
     is_email_verified = models.BooleanField(default=False)
+    # Part of the signed calendar feed URLs handed out to the user
+    calendar_feed_key = models.UUIDField(default=uuid.uuid4, editable=False)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -37,6 +44,13 @@ class User(AbstractUser):
     def get_role_display_french(self):
         return dict(self.ROLE_CHOICES).get(self.role, self.role)
 
+    def reset_calendar_feed_key(self):
+        """
+        Revoke every calendar feed URL handed out to the user.
+        """
+        self.calendar_feed_key = uuid.uuid4()
+        self.save(update_fields=['calendar_feed_key'])
+
     @property
     def is_admin(self):
         return self.role == 'ADMIN'
@@ -90,6 +104,13 @@ class Student(BaseModel):
     """
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='student_profile')
     student_id = models.CharField(max_length=20, unique=True)
+    program = models.ForeignKey(
+        'academic.Program',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='students'
+    )
     enrollment_year = models.PositiveIntegerField()
     current_semester = models.PositiveIntegerField(default=1)
 
@@ -98,9 +119,35 @@ class Student(BaseModel):
         verbose_name = 'Étudiant'
         verbose_name_plural = 'Étudiants'
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Read through __dict__ so that deferred fields are not fetched here
+        self._loaded_program_id = self.__dict__.get('program_id', DEFERRED)
+        self._loaded_is_active = self.__dict__.get('is_active', DEFERRED)
+
     def __str__(self):
         return f"{self.user.get_full_name()} ({self.student_id})"
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if not adding and DEFERRED in (self._loaded_program_id, self._loaded_is_active):
+            self._loaded_program_id, self._loaded_is_active = (
+                Student.objects.filter(pk=self.pk).values_list('program_id', 'is_active').get()
+            )
+        super().save(*args, **kwargs)
+
+        # A student counts towards their program while active: enrolling,
+        # deactivating or transferring them moves the program counters
+        from academic.models import Program
+        previous = self._loaded_program_id if not adding and self._loaded_is_active else None
+        current = self.program_id if self.is_active else None
+        if previous != current:
+            Program.shift_students_count(previous, -1)
+            Program.shift_students_count(current, 1)
+            Program.invalidate_enrollment_counts([previous, current])
+        self._loaded_program_id = self.program_id
+        self._loaded_is_active = self.is_active
+
     @property
     def academic_year(self):
         from datetime import datetime
@@ -108,6 +155,18 @@ class Student(BaseModel):
         return current_year - self.enrollment_year + 1
 
 
+@receiver(post_delete, sender=Student)
+def release_program_seat(sender, instance, **kwargs):
+    """
+    Take a deleted active student off their program's count. Runs for the
+    cascade deletions of users too, which do not call Student.delete.
+    """
+    from academic.models import Program
+    if instance._loaded_is_active is True:
+        Program.shift_students_count(instance._loaded_program_id, -1)
+        Program.invalidate_enrollment_counts([instance._loaded_program_id])
+
+
 class UserPreferences(BaseModel):
     """
     User preferences for UI customization.
@@ -0,0 +1,70 @@
+"""
+Tests for the program enrollment counters kept by students.
+"""
+from academic.models import Program
+from academic.tasks import refresh_students_counts
+from users.models import Student
+from core.tests.base import TimetableTestCase
+
+
+class StudentsCountTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.program = self.make_program()
+        self.other = self.make_program()
+        self.student = self.make_student(self.program)
+
+    def counts(self):
+        return (
+            Program.objects.get(pk=self.program.pk).students_count,
+            Program.objects.get(pk=self.other.pk).students_count,
+        )
+
+    def test_enrolling_counts_the_student(self):
+        self.make_student(self.program)
+        self.make_student(self.other, is_active=False)
+
+        self.assertEqual(self.counts(), (2, 0))
+        self.assertEqual(Program.enrollment_counts([self.program.pk]), {self.program.pk: 2})
+
+    def test_deactivating_and_reactivating(self):
+        self.student.is_active = False
+        self.student.save()
+        self.assertEqual(self.counts(), (0, 0))
+
+        self.student.is_active = True
+        self.student.save()
+        self.assertEqual(self.counts(), (1, 0))
+
+    def test_transfer_moves_the_student(self):
+        self.student.program = self.other
+        self.student.save()
+
+        self.assertEqual(self.counts(), (0, 1))
+
+    def test_saving_a_deferred_student(self):
+        # Loading does not fetch the deferred fields
+        with self.assertNumQueries(1):
+            student = Student.objects.only('id', 'current_semester').get(pk=self.student.pk)
+        student.current_semester = 2
+        student.save()
+        self.assertEqual(self.counts(), (1, 0))
+
+        student = Student.objects.defer('program').get(pk=self.student.pk)
+        student.program = self.other
+        student.save()
+        self.assertEqual(self.counts(), (0, 1))
+
+    def test_deleting_the_user_releases_the_seat(self):
+        self.student.user.delete()
+        self.assertEqual(self.counts(), (0, 0))
+
+        self.make_student(self.program).delete()
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_nightly_refresh_repairs_bulk_changes(self):
+        Student.objects.filter(pk=self.student.pk).update(program=self.other)
+
+        refresh_students_counts()
+        self.assertEqual(self.counts(), (0, 1))
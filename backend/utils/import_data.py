@@ -6,7 +6,8 @@ from django.core.exceptions import ValidationError
 from django.db import transaction
 from users.models import User, Teacher, Student
 from academic.models import Department, Program, Subject, Room
-from scheduling.models import TimeSlot, Schedule
+from scheduling.models import TimeSlot, Schedule, ScheduleProgram
+from core.intervals import ScheduleIndex
 
 
 class ExcelImporter:
@@ -145,7 +146,8 @@ class ExcelImporter:
             if missing_columns:
                 raise ValidationError(f"Colonnes manquantes: {', '.join(missing_columns)}")
             
-            with transaction.atomic():
+            # Conflict checks for every imported row share one in-memory index
+            with transaction.atomic(), ScheduleIndex.build().activate():
                 for index, row in df.iterrows():
                     try:
                         # Get related objects
@@ -176,7 +178,9 @@ class ExcelImporter:
                             for code in program_codes:
                                 try:
                                     program = Program.objects.get(code=code.strip())
-                                    schedule.programs.add(program)
+                                    # Saved one by one so that the sessions, cached
+                                    # timetables and conflicts follow the new program
+                                    ScheduleProgram.objects.get_or_create(schedule=schedule, program=program)
                                 except Program.DoesNotExist:
                                     self.warnings.append(f"Ligne {index + 2}: Filière {code.strip()} non trouvée")
                         
@@ -0,0 +1,69 @@
+"""
+Tests for the Excel schedule importer.
+"""
+import os
+import tempfile
+from datetime import timedelta
+
+import pandas as pd
+
+from scheduling.models import ScheduleOccurrence, ScheduleProgram
+from scheduling.snapshots import TimetableSnapshot
+from utils.import_data import ExcelImporter
+from core.tests.base import TimetableTestCase
+
+
+class ImportSchedulesTests(TimetableTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.program = self.make_program()
+        self.subject = self.make_subject()
+        self.teacher = self.make_teacher()
+        self.room = self.make_room()
+
+    def import_schedules(self, **row):
+        row = {
+            'subject_code': self.subject.code,
+            'teacher_email': self.teacher.user.email,
+            'room_code': self.room.code,
+            'day_of_week': 0,
+            'start_time': '08:00:00',
+            'end_time': '10:00:00',
+            'start_date': self.MONDAY.isoformat(),
+            'end_date': (self.MONDAY + timedelta(days=13)).isoformat(),
+            'program_codes': self.program.code,
+            **row
+        }
+        handle, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        pd.DataFrame([row]).to_excel(path, index=False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = ExcelImporter().import_schedules(path)
+        self.assertEqual(result['errors'], [])
+        return result
+
+    def test_programs_are_linked_through_schedule_program(self):
+        self.import_schedules()
+
+        link = ScheduleProgram.objects.get(program=self.program)
+        self.assertEqual(link.schedule.room, self.room)
+
+    def test_program_timetable_shows_imported_schedule(self):
+        self.assertEqual(TimetableSnapshot.get('program', self.program.pk, self.MONDAY), [])
+
+        self.import_schedules()
+
+        rows = TimetableSnapshot.get('program', self.program.pk, self.MONDAY)
+        self.assertEqual([(day, data['room']) for day, data in rows], [(0, self.room.pk)])
+
+    def test_occurrences_carry_the_imported_programs(self):
+        self.import_schedules()
+
+        occurrences = ScheduleOccurrence.objects.filter(room=self.room)
+        self.assertEqual(
+            list(occurrences.values_list('date', 'program_ids')),
+            [(self.MONDAY, [self.program.pk]), (self.MONDAY + timedelta(weeks=1), [self.program.pk])]
+        )
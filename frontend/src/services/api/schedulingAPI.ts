@@ -1,5 +1,5 @@
 import axios from 'axios'
-import { Schedule, TimeSlot, WeeklySchedule, TeacherUnavailability, MakeupSession } from '../../types/scheduling'
+import { Schedule, TimeSlot, WeeklySchedule, ScheduleRange, TeacherUnavailability, MakeupSession } from '../../types/scheduling'
 
 const API_BASE_URL = '/api/scheduling'
 
@@ -67,6 +67,25 @@ export const getWeeklySchedule = async (params: {
   return response.data
 }
 
+export const getScheduleRange = async (params: {
+  startDate: string
+  endDate: string
+  programId?: number
+  teacherId?: number
+  roomId?: number
+}): Promise<ScheduleRange> => {
+  const response = await schedulingAPI.get('/schedules/range/', {
+    params: {
+      start_date: params.startDate,
+      end_date: params.endDate,
+      program_id: params.programId,
+      teacher_id: params.teacherId,
+      room_id: params.roomId
+    }
+  })
+  return response.data
+}
+
 export const checkConflicts = async (scheduleData: any) => {
   const response = await schedulingAPI.post('/schedules/conflicts/check/', scheduleData)
   return response.data
@@ -109,6 +128,22 @@ export const getStudentSchedule = async (params?: {
   return response.data
 }
 
+// Calendar feeds
+export const getCalendarSubscription = async (params?: {
+  program_id?: number
+  teacher_id?: number
+  room_id?: number
+}): Promise<{ url: string }> => {
+  const response = await schedulingAPI.get('/calendar/subscribe/', { params })
+  return response.data
+}
+
+// Revokes every feed URL handed out before; returns the new personal URL if any
+export const resetCalendarSubscription = async (): Promise<{ message: string; url?: string }> => {
+  const response = await schedulingAPI.post('/calendar/subscribe/reset/')
+  return response.data
+}
+
 // Makeup Sessions
 export const getMakeupSessions = async (): Promise<MakeupSession[]> => {
   const response = await schedulingAPI.get('/makeup-sessions/')
@@ -59,6 +59,7 @@ export interface Room {
   building: string
   floor: string
   equipment?: string
+  equipment_tags?: string[]
   department?: number
   department_name?: string
   is_available: boolean
@@ -49,6 +49,37 @@ export interface WeeklySchedule {
   }
 }
 
+export interface ScheduleOccurrence {
+  id: number
+  schedule: number
+  date: string
+  start_datetime: string
+  end_datetime: string
+  status: 'SCHEDULED' | 'CANCELLED'
+  title: string
+  subject: number
+  subject_name: string
+  teacher: number
+  teacher_name: string
+  room: number
+  room_name: string
+  time_slot: number
+  time_slot_display: string
+  program_ids: number[]
+}
+
+export interface ScheduleRange {
+  scope: {
+    type: 'program' | 'teacher' | 'room'
+    id: number
+  }
+  period: {
+    start_date: string
+    end_date: string
+  }
+  occurrences: ScheduleOccurrence[]
+}
+
 export interface TeacherUnavailability {
   id: number
   teacher: number